@@ -0,0 +1,122 @@
+# benchmarks/bench_client.py
+
+"""
+Submits converted documents to a local stub of the Papermill API. The stub
+adds latency, fails a share of requests with 503 and counts the
+connections it accepts. The run compares one request at a time, without a
+session, against PapermillClient.
+
+    python benchmarks/bench_client.py --documents 200 --latency-ms 50 --fail-rate 0.1 --in-flight 16
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from papermill_markdown.client import PapermillClient, build_payload  # noqa: E402
+from papermill_markdown.converter import MarkdownToPapermill  # noqa: E402
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, latency: float, fail_rate: float):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.connections = 0
+        self.requests = 0
+        self.failures = 0
+        self.lock = threading.Lock()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self) -> None:
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self) -> None:
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        time.sleep(self.server.latency)
+        with self.server.lock:
+            self.server.requests += 1
+            fail = random.random() < self.server.fail_rate
+            self.server.failures += fail
+        if fail:
+            body, status = b'{"error": "busy"}', 503
+        else:
+            body, status = json.dumps({"id": payload["layoutId"], "blocks": len(payload["documentContent"])}).encode(), 200
+        self.send_response(status)
+        if fail:
+            self.send_header("Retry-After", "0")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+def serve(latency: float, fail_rate: float) -> StubServer:
+    server = StubServer(latency, fail_rate)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--documents", type=int, default=200, help="Documents to submit.")
+    parser.add_argument("--copies", type=int, default=1, help="Copies of data/test.md per document.")
+    parser.add_argument("--latency-ms", type=float, default=50, help="Stub response time.")
+    parser.add_argument("--fail-rate", type=float, default=0.1, help="Share of requests answered with 503.")
+    parser.add_argument("--in-flight", type=int, default=16, help="PapermillClient max_in_flight.")
+    args = parser.parse_args()
+
+    with open(os.path.join(os.path.dirname(__file__), "..", "data", "test.md"), encoding="utf-8") as f:
+        text = "\n\n".join([f.read()] * args.copies)
+    document = MarkdownToPapermill(schema_output=True).convert(text)
+
+    server = serve(args.latency_ms / 1000, 0.0)
+    url = f"http://127.0.0.1:{server.server_port}/documents"
+    start = time.perf_counter()
+    for i in range(args.documents):
+        requests.post(url, json=build_payload(document, f"layout-{i}"), timeout=60).raise_for_status()
+    serial = time.perf_counter() - start
+    print(f"one at a time, no retries: {args.documents / serial:.1f} docs/s, {server.connections} connections")
+    server.shutdown()
+
+    server = serve(args.latency_ms / 1000, args.fail_rate)
+    url = f"http://127.0.0.1:{server.server_port}/documents"
+    jobs = ({"document_content": document, "layout_id": f"layout-{i}"} for i in range(args.documents))
+    with PapermillClient(url, "stub-key", max_in_flight=args.in_flight, backoff=0.01) as client:
+        start = time.perf_counter()
+        results = list(client.submit_many(jobs))
+        elapsed = time.perf_counter() - start
+    failed = [result for result in results if result.error]
+    in_order = all(result.key == i and result.body["id"] == f"layout-{i}" for i, result in enumerate(results)
+                   if not result.error)
+    requests_ms = sorted(1000 * result.timings["request"] for result in results)
+    print(f"PapermillClient, {args.in_flight} in flight: {args.documents / elapsed:.1f} docs/s, "
+          f"{len(failed)} failed, {server.failures} 503s retried, {server.connections} connections, "
+          f"results in order: {in_order}")
+    print(f"  request time p50 {requests_ms[len(requests_ms) // 2]:.1f} ms, max {requests_ms[-1]:.1f} ms; "
+          f"body {results[0].timings['bytes']} bytes; serialise {1000 * results[0].timings['serialise']:.1f} ms")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# benchmarks/bench_lint.py
+
+"""
+Compares MarkdownLinter's "full" and "fast" modes on data/test.md repeated
+to the requested size, both as written (which needs mdformat, so the fast mode
+only adds the cost of its check) and after one pass of the linter (already
+formatted, so the fast mode skips mdformat). It then times IncrementalLinter
+re-linting the document after a one-line edit in the middle.
+
+    python benchmarks/bench_lint.py --copies 200 --repeat 3
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from papermill_markdown.linter import IncrementalLinter, MarkdownLinter  # noqa: E402
+
+
+def best_time(text: str, mode: str, repeat: int):
+    best = None
+    for _ in range(repeat):
+        linter = MarkdownLinter(text, mode=mode)
+        start = time.perf_counter()
+        result = linter.lint()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, linter.path, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--copies", type=int, default=100, help="Times data/test.md is repeated.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the best is reported.")
+    args = parser.parse_args()
+
+    path = os.path.join(os.path.dirname(__file__), "..", "data", "test.md")
+    with open(path, "r", encoding="utf-8") as f:
+        sample = f.read()
+    raw = "\n\n".join([sample] * args.copies)
+    formatted = MarkdownLinter(raw).lint()[2]
+
+    print(f"{args.copies} copies of data/test.md, best of {args.repeat}")
+    for label, text in (("as written", raw), ("pre-formatted", formatted)):
+        full, _, full_result = best_time(text, "full", args.repeat)
+        fast, fast_path, fast_result = best_time(text, "fast", args.repeat)
+        same = full_result[:2] == fast_result[:2]
+        print(
+            f"  {label:14} {len(text) / 1e6:6.2f} MB  full {full:7.3f}s  "
+            f"fast {fast:7.3f}s ({fast_path})  speedup {full / fast:6.1f}x  same issues: {same}"
+        )
+
+    incremental = IncrementalLinter(raw)
+    start = time.perf_counter()
+    incremental.lint()
+    first = time.perf_counter() - start
+    line = len(raw.splitlines()) // 2
+    best = None
+    for n in range(args.repeat):
+        incremental.edit(line, line - 1, f"An edited paragraph {n} with $x$.\n")
+        start = time.perf_counter()
+        result = incremental.lint()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    same = result == MarkdownLinter(incremental.text).lint()
+    print(
+        f"  incremental    first lint {first:7.3f}s  after a one-line edit {best:7.3f}s "
+        f"({incremental.report['rebuilt']} of {incremental.report['blocks']} blocks)  same result: {same}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# benchmarks/bench_pathological.py
+
+"""
+Worst-case growth of convert() with inline_engine="linear" on a corpus of
+adversarial documents: long runs of unclosed delimiters in paragraphs,
+headings, lists, tables and image lines. Each entry is converted at size n
+and 4n, and fails if time(4n) / time(n) exceeds the threshold (a linear
+conversion gives about 4). Exits with status 1 on a failure, so it can run
+in CI.
+
+    python benchmarks/bench_pathological.py
+    python benchmarks/bench_pathological.py --n 4000 --max-ratio 6 --engine scanner
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from papermill_markdown.converter import MarkdownToPapermill  # noqa: E402
+
+# name: document of roughly n repetitions of the hostile pattern
+CORPUS = {
+    "unclosed *": lambda n: "a " + "*" * n,
+    "unclosed * words": lambda n: "*a " * n,
+    "unclosed **": lambda n: "**a " * n,
+    "unclosed $": lambda n: "$a " * n,
+    "unclosed ~": lambda n: "~a " * n,
+    "unclosed ^": lambda n: "^a " * n,
+    "unclosed __": lambda n: "__a " * n,
+    "unclosed [": lambda n: "[" * n,
+    "unclosed [](": lambda n: "[a](" * n,
+    "unclosed [ref:": lambda n: "[ref:" * n,
+    "unclosed [ref: label=": lambda n: "[ref:a label=" * n,
+    "unclosed <sup>": lambda n: "<sup>" * n,
+    "unclosed <sub>": lambda n: "<sub>" * n,
+    "footnote refs": lambda n: "[^" * n,
+    "list item": lambda n: "- " + "*a " * n,
+    "table cell": lambda n: "| a | b |\n|---|---|\n| " + "[a](" * n + " | b |",
+    "heading [ref:": lambda n: "# " + "[ref:" * n,
+    "heading [ref: label=": lambda n: "# " + "[ref:a label=" * n,
+    "image title spaces": lambda n: "![x](http://a" + " " * n + "b)",
+    "image title quotes": lambda n: '![x](http://a' + ' "' * n + '")',
+    "image unclosed ![": lambda n: "![" * n + "(http://a)",
+    "image unclosed (": lambda n: "![x]" + "(" * n,
+    "table separator": lambda n: "| a |\n| " + "-" * n + " x",
+    "caption": lambda n: "Table 1" + " -" * n + "\n| a |\n|---|\n| b |",
+}
+
+
+def best_time(converter: MarkdownToPapermill, text: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        converter.convert(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--n", type=int, default=2000, help="Base size of each document (default: 2000).")
+    parser.add_argument("--max-ratio", type=float, default=6.0,
+                        help="Largest allowed time(4n) / time(n) (default: 6).")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per size; the fastest is used.")
+    parser.add_argument("--engine", choices=MarkdownToPapermill.INLINE_ENGINES, default="linear")
+    args = parser.parse_args()
+
+    converter = MarkdownToPapermill(inline_engine=args.engine)
+    failures = []
+    for name, build in CORPUS.items():
+        small = best_time(converter, build(args.n), args.repeat)
+        large = best_time(converter, build(4 * args.n), args.repeat)
+        # Below a millisecond the ratio is mostly noise.
+        ratio = large / max(small, 1e-3)
+        status = "ok" if ratio <= args.max_ratio else "SUPERLINEAR"
+        if status != "ok":
+            failures.append(name)
+        print(f"{name:24} n {1000 * small:8.2f} ms  4n {1000 * large:8.2f} ms  x{ratio:5.1f}  {status}")
+
+    if failures:
+        print(f"Superlinear growth in: {', '.join(failures)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
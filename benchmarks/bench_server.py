@@ -0,0 +1,99 @@
+# benchmarks/bench_server.py
+
+"""
+Load-tests the conversion service on this machine against one process per
+document, the way the jobs ran before. The service is started in-process on
+a free port and hit by concurrent HTTP clients; nothing leaves the box.
+
+    python benchmarks/bench_server.py --requests 2000 --clients 32 --workers 1 4
+"""
+
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SRC = os.path.join(os.path.dirname(__file__), "..", "src")
+sys.path.insert(0, SRC)
+
+from papermill_markdown.server import ConversionService, make_server  # noqa: E402
+
+ONE_SHOT = """
+import sys
+from papermill_markdown.converter import MarkdownToPapermill
+from papermill_markdown.validator import DocumentContent
+DocumentContent.model_validate(MarkdownToPapermill(schema_output=True).convert(sys.stdin.read()))
+"""
+
+
+def make_documents(count: int):
+    return [
+        f"# Report {i}\n\nFindings for **site {i}** with $x_{i}$ and a note[^1].\n\n"
+        f"- load {i} kN\n- span *{i % 9} m*\n\n| A | B |\n|---|---|\n| {i} | `code` |\n\n[^1]: Checked {i}.\n"
+        for i in range(count)
+    ]
+
+
+def bench_one_shot(documents, count: int) -> float:
+    env = dict(os.environ, PYTHONPATH=SRC)
+    start = time.perf_counter()
+    for text in documents[:count]:
+        subprocess.run([sys.executable, "-c", ONE_SHOT], input=text, text=True, check=True, env=env)
+    return (time.perf_counter() - start) / count
+
+
+def bench_service(documents, clients: int, workers: int, max_batch: int):
+    service = ConversionService(workers=workers, max_batch=max_batch)
+    server = make_server(service, port=0, quiet=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    local = threading.local()
+
+    def post(text: str) -> int:
+        if not hasattr(local, "connection"):
+            local.connection = http.client.HTTPConnection("127.0.0.1", server.server_port)
+        local.connection.request("POST", "/convert", text.encode("utf-8"), {"Content-Type": "text/markdown"})
+        response = local.connection.getresponse()
+        response.read()
+        return response.status
+
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            statuses = list(pool.map(post, documents))
+        elapsed = time.perf_counter() - start
+        metrics = service.snapshot()
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.close()
+    return elapsed, sum(status != 200 for status in statuses), metrics
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000, help="Documents sent to the service.")
+    parser.add_argument("--clients", type=int, default=32, help="Concurrent HTTP clients.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4], help="Service worker counts to try.")
+    parser.add_argument("--max-batch", type=int, default=32, help="Largest batch.")
+    parser.add_argument("--one-shot", type=int, default=10, help="Documents converted one process each.")
+    args = parser.parse_args()
+
+    documents = make_documents(args.requests)
+    if args.one_shot:
+        per_doc = bench_one_shot(documents, args.one_shot)
+        print(f"one process per document: {1000 * per_doc:.0f} ms/doc, {1 / per_doc:.1f} docs/s")
+    for workers in args.workers:
+        elapsed, failed, metrics = bench_service(documents, args.clients, workers, args.max_batch)
+        print(f"service, {workers} worker(s): {len(documents) / elapsed:.0f} docs/s, {failed} failed, "
+              f"p50 {metrics['latency_p50_ms']} ms, p99 {metrics['latency_p99_ms']} ms, "
+              f"mean batch {metrics['mean_batch_size']}")
+        print("  " + json.dumps(metrics))
+
+
+if __name__ == "__main__":
+    main()
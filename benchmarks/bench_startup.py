@@ -0,0 +1,117 @@
+# benchmarks/bench_startup.py
+
+"""
+Cold-start cost of common entry points, each run in a fresh interpreter.
+Time is reported above a bare `python -c pass` on the same machine. Each
+scenario must stay under its threshold and must not import the heavy
+dependencies it has no use for. `python -X importtime` names the slowest
+package imports. Exits with status 1 on a regression, so it can run in CI.
+
+    python benchmarks/bench_startup.py --runs 15
+    python benchmarks/bench_startup.py --max-convert-ms 60 --max-pipeline-ms 400
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+HEAVY = ("pydantic", "mdformat", "markdown_it", "requests", "asyncio")
+
+DOCUMENT = "# Title\\n\\nSome **bold** text and $x$ with a note[^1].\\n\\n- a\\n- b\\n\\n[^1]: A note.\\n"
+
+SCENARIOS = {
+    # name: (code, heavy modules it may import)
+    "import": ("import papermill_markdown", ()),
+    "convert": (
+        "from papermill_markdown import MarkdownToPapermill\n"
+        f"MarkdownToPapermill().convert('{DOCUMENT}')",
+        (),
+    ),
+    "fast lint + convert": (
+        "from papermill_markdown import MarkdownToPapermill, lint_and_convert\n"
+        f"lint_and_convert('{DOCUMENT}', MarkdownToPapermill(), 'fast')",
+        (),
+    ),
+    "pipeline": (
+        "from papermill_markdown import DocumentContent, MarkdownToPapermill, lint_and_convert\n"
+        f"_, _, document = lint_and_convert('{DOCUMENT}', MarkdownToPapermill(schema_output=True))\n"
+        "DocumentContent.model_validate(document)",
+        ("pydantic", "mdformat", "markdown_it"),
+    ),
+}
+
+
+def run(code: str, *flags: str) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONPATH=SRC)
+    return subprocess.run([sys.executable, *flags, "-c", code], env=env, capture_output=True, text=True,
+                          check=True)
+
+
+def wall_time(code: str, runs: int) -> float:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        run(code)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def import_profile(code: str):
+    """Top-level modules imported by code, with their cumulative import time in ms."""
+    modules = {}
+    for line in run(code, "-X", "importtime").stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            # The outermost import of a package carries its whole cost.
+            top = name.strip().split(".")[0]
+            modules[top] = max(modules.get(top, 0), int(cumulative) / 1000)
+    return modules
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=15, help="Interpreter starts per scenario (median is used).")
+    parser.add_argument("--max-import-ms", type=float, default=30, help="Threshold for `import papermill_markdown`.")
+    parser.add_argument("--max-convert-ms", type=float, default=80, help="Threshold for convert-only usage.")
+    parser.add_argument("--max-pipeline-ms", type=float, default=500, help="Threshold for lint + convert + validate.")
+    args = parser.parse_args()
+    thresholds = {"import": args.max_import_ms, "convert": args.max_convert_ms,
+                  "fast lint + convert": args.max_convert_ms, "pipeline": args.max_pipeline_ms}
+
+    # Warm the .pyc files so every scenario measures a normal cold start.
+    for code, _ in SCENARIOS.values():
+        run(code)
+    baseline = wall_time("pass", args.runs)
+    preloaded = import_profile("pass")
+    print(f"python -c pass: {1000 * baseline:.0f} ms")
+
+    failures = []
+    for name, (code, allowed) in SCENARIOS.items():
+        overhead = 1000 * (wall_time(code, args.runs) - baseline)
+        modules = {m: ms for m, ms in import_profile(code).items() if m not in preloaded}
+        unexpected = [m for m in HEAVY if m in modules and m not in allowed]
+        slowest = sorted(modules.items(), key=lambda item: -item[1])[:4]
+        status = "ok"
+        if overhead > thresholds[name]:
+            status = f"SLOW (> {thresholds[name]:.0f} ms)"
+        if unexpected:
+            status = f"imports {', '.join(unexpected)}"
+        if status != "ok":
+            failures.append(name)
+        print(f"{name:20} +{overhead:6.0f} ms  {status:24} slowest: "
+              + ", ".join(f"{module} {ms:.0f} ms" for module, ms in slowest))
+
+    if failures:
+        print(f"Startup regression in: {', '.join(failures)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
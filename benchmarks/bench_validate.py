@@ -0,0 +1,92 @@
+# benchmarks/bench_validate.py
+
+"""
+Compares DocumentContent validation against the same schema with plain
+(undiscriminated) unions, on a converted payload made of data/test.md
+repeated with extra tables of inline-formatted cells.
+
+    python benchmarks/bench_validate.py --copies 200 --rows 50 --repeat 3
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import List, Union
+
+from pydantic import RootModel
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from papermill_markdown.converter import MarkdownToPapermill  # noqa: E402
+from papermill_markdown.validator import (  # noqa: E402
+    Break, Code, CrossReference, DocumentContent, DocumentList, Equation, Footnote,
+    FormattedText, Heading, Image, Paragraph, ReferenceInline, Table,
+)
+
+# The schema as it was before the unions were discriminated.
+PlainTextContent = Union[str, FormattedText, CrossReference, Footnote, Code, Equation, ReferenceInline]
+PlainCellContent = Union[str, PlainTextContent, List[PlainTextContent]]
+
+
+class PlainParagraph(Paragraph):
+    text: Union[str, List[PlainTextContent]]
+
+
+class PlainTable(Table):
+    header: List[PlainCellContent]
+    body: List[List[PlainCellContent]]
+    caption: Union[str, List[PlainTextContent], None] = None
+
+
+class PlainDocumentList(DocumentList):
+    items: List[Union[str, List[PlainTextContent]]]
+
+
+class PlainDocumentContent(RootModel[List[Union[
+    Heading, PlainParagraph, Image, PlainTable, PlainDocumentList, Equation, Code, Break
+]]]):
+    pass
+
+
+def build_markdown(copies: int, rows: int) -> str:
+    path = os.path.join(os.path.dirname(__file__), "..", "data", "test.md")
+    with open(path, "r", encoding="utf-8") as f:
+        sample = f.read()
+    table = ["| Item | **Value** | Note |", "|---|---|---|"]
+    table += [f"| Row {i} | $x_{i}$ | *see* `code` and **bold** |" for i in range(rows)]
+    return "\n\n".join([sample, "\n".join(table)] * copies)
+
+
+def best_time(model, payload, repeat: int):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = model.model_validate(payload).model_dump()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--copies", type=int, default=100, help="Times data/test.md and the extra table are repeated.")
+    parser.add_argument("--rows", type=int, default=50, help="Rows in each extra table.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the best is reported.")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    payload = MarkdownToPapermill(numbered=True).convert(build_markdown(args.copies, args.rows))
+    convert = time.perf_counter() - start
+
+    plain, plain_result = best_time(PlainDocumentContent, payload, args.repeat)
+    tagged, tagged_result = best_time(DocumentContent, payload, args.repeat)
+    print(f"{len(payload)} blocks, best of {args.repeat}")
+    print(f"  convert                 {convert:7.3f}s")
+    print(f"  validate, plain unions  {plain:7.3f}s")
+    print(f"  validate, tagged unions {tagged:7.3f}s  speedup {plain / tagged:5.1f}x  "
+          f"same output: {plain_result == tagged_result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# benchmarks/stress_threads.py
+
+"""
+Stress check for sharing one MarkdownToPapermill between threads and asyncio
+tasks. Documents that differ in footnotes, images and inline content are
+converted concurrently on a single converter, and every result and report is
+compared with a serial conversion on a fresh converter.
+
+    python benchmarks/stress_threads.py --docs 200 --threads 16 --rounds 5
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from papermill_markdown.converter import MarkdownToPapermill  # noqa: E402
+
+
+def make_documents(count: int, image_dir: str):
+    documents = []
+    for i in range(count):
+        image = os.path.join(image_dir, f"image{i % 7}.png")
+        lines = [f"# Document {i}", ""]
+        for j in range(1 + i % 5):
+            lines += [f"Paragraph {j} of {i} with **bold {i}** and $x_{i}$ and a note[^{j + 1}].", ""]
+        lines += [f"![Figure {i}]({image})", "", f"![Again]({image})", ""]
+        lines += ["| A | B |", "|---|---|", f"| {i} | *{j}* |", ""]
+        lines += [f"[^{j + 1}]: Footnote {j + 1} of document {i}." for j in range(1 + i % 5)]
+        documents.append("\n".join(lines))
+    return documents
+
+
+def convert_with_reports(converter: MarkdownToPapermill, text: str):
+    return converter.convert(text), dict(converter.footnotes), converter.image_report, converter.compact_report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--docs", type=int, default=200, help="Number of distinct documents.")
+    parser.add_argument("--threads", type=int, default=16, help="Threads sharing the converter.")
+    parser.add_argument("--rounds", type=int, default=5, help="Times every document is converted concurrently.")
+    args = parser.parse_args()
+    # Switch threads as often as possible to provoke interleaving.
+    sys.setswitchinterval(1e-6)
+
+    options = {"compact": True, "image_workers": 2}
+    with tempfile.TemporaryDirectory() as image_dir:
+        for k in range(7):
+            with open(os.path.join(image_dir, f"image{k}.png"), "wb") as f:
+                f.write(bytes([k]) * (100 + k))
+        documents = make_documents(args.docs, image_dir)
+        expected = [convert_with_reports(MarkdownToPapermill(**options), text) for text in documents]
+
+        shared = MarkdownToPapermill(**options)
+        work = documents * args.rounds
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            results = list(pool.map(lambda text: convert_with_reports(shared, text), work))
+        elapsed = time.perf_counter() - start
+        mismatches = sum(result != expected[i % len(documents)] for i, result in enumerate(results))
+        print(f"threads: {len(work)} conversions on {args.threads} threads in {elapsed:.2f}s, "
+              f"{mismatches} mismatches")
+
+        async def run_async():
+            with ThreadPoolExecutor(max_workers=args.threads) as pool:
+                return await asyncio.gather(*(shared.convert_async(text, pool) for text in work))
+
+        start = time.perf_counter()
+        outputs = asyncio.run(run_async())
+        elapsed = time.perf_counter() - start
+        async_mismatches = sum(output != expected[i % len(documents)][0] for i, output in enumerate(outputs))
+        print(f"asyncio: {len(work)} conversions in {elapsed:.2f}s, {async_mismatches} mismatches")
+
+    if mismatches or async_mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
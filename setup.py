@@ -12,15 +12,25 @@ setup(
     url="https://github.com/CivilEngineerUK/papermill-markdown",
     package_dir={"": "src"},
     install_requires=[
-        "pydantic",
+        "pydantic>=2.5",
         "requests",
         "python-dotenv",
-        "mdformat"
+        "mdformat",
+        "markdown-it-py"
     ],
+    entry_points={
+        "console_scripts": [
+            "papermill-markdown=papermill_markdown.cli:main",
+            "papermill-markdown-server=papermill_markdown.server:main",
+        ],
+    },
+    extras_require={
+        "images": ["Pillow"],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
         "Operating System :: OS Independent",
     ],
-    python_requires='>=3.6',
+    python_requires='>=3.9',
 )
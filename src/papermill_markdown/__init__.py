@@ -0,0 +1,43 @@
+# src/papermill_markdown/__init__.py
+
+"""
+Markdown to Papermill JSON conversion. The names below can be imported from
+the package directly; each module is only imported when one of its names is
+first used, so `from papermill_markdown import MarkdownToPapermill` does not
+load mdformat, pydantic or requests.
+"""
+
+import importlib
+
+_EXPORTS = {
+    "MarkdownToPapermill": "converter",
+    "MarkdownLinter": "linter",
+    "IncrementalLinter": "linter",
+    "lint_and_convert": "pipeline",
+    "DocumentContent": "validator",
+    "DocumentModel": "validator",
+    "validate_documents": "validator",
+    "StreamingConverter": "streaming",
+    "IncrementalConverter": "incremental",
+    "write_json": "writer",
+    "ImageCache": "images",
+    "PipelineStats": "stats",
+    "ConversionService": "server",
+    "PapermillClient": "client",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    try:
+        module = _EXPORTS[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
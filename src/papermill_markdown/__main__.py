@@ -0,0 +1,7 @@
+# src/papermill_markdown/__main__.py
+
+import sys
+
+from .cli import main
+
+sys.exit(main())
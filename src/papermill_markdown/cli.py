@@ -0,0 +1,258 @@
+# src/papermill_markdown/cli.py
+
+"""
+Command line entry point for batch conversion of Markdown files into
+Papermill JSON. Each file goes through lint -> convert -> validate -> write
+on a pool of worker processes; a failure in one file is reported without
+stopping the others.
+
+    papermill-markdown docs/ "reports/**/*.md" -o build/json -j 8
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .converter import MarkdownToPapermill
+from .linter import MarkdownLinter
+from .pipeline import lint_and_convert
+from .stats import PipelineStats
+
+# Per-process pipeline state, set up once by _init_worker.
+_OPTIONS = None
+_CONVERTER = None
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = _parse_args(argv)
+    try:
+        tasks = _collect_tasks(args.inputs, args.output_dir)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    if not tasks:
+        print("No Markdown files found.", file=sys.stderr)
+        return 2
+
+    options = {
+        "lint": args.lint,
+        "lint_mode": args.lint_mode,
+        "validate": args.validate,
+        "numbered": args.numbered,
+        "inline_engine": args.inline_engine,
+        "indent": args.indent,
+        "stats": bool(args.stats),
+    }
+    workers = args.workers or os.cpu_count() or 1
+    chunksize = args.chunksize or max(1, len(tasks) // (workers * 4))
+
+    stats_file = open(args.stats, "w", encoding="utf-8") if args.stats else None
+    start = time.perf_counter()
+    try:
+        if workers == 1:
+            _init_worker(options)
+            results = map(_process_file, tasks)
+            summary = _summarise(results, args.quiet, stats_file)
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(options,)) as pool:
+                results = _survive_broken_pool(pool.map(_process_file, tasks, chunksize=chunksize), tasks)
+                summary = _summarise(results, args.quiet, stats_file)
+    finally:
+        if stats_file is not None:
+            stats_file.close()
+    elapsed = time.perf_counter() - start
+
+    _print_summary(summary, elapsed, workers)
+    return 1 if summary["failed"] else 0
+
+
+def _parse_args(argv: Optional[Sequence[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="papermill-markdown",
+        description="Convert Markdown files into Papermill JSON document content."
+    )
+    parser.add_argument("inputs", nargs="+",
+                        help="Markdown files, directories (searched recursively for *.md) or glob patterns.")
+    parser.add_argument("-o", "--output-dir",
+                        help="Directory for the JSON files. Defaults to next to each input file.")
+    parser.add_argument("-j", "--workers", type=int, default=0,
+                        help="Number of worker processes (default: number of CPUs; 1 runs in-process).")
+    parser.add_argument("--chunksize", type=int, default=0,
+                        help="Files handed to a worker at a time (default: files / (4 * workers)).")
+    parser.add_argument("--no-lint", dest="lint", action="store_false",
+                        help="Skip MarkdownLinter before conversion.")
+    parser.add_argument("--lint-mode", choices=MarkdownLinter.LINT_MODES, default="full",
+                        help="'fast' skips mdformat for files that are already well formed (default: full).")
+    parser.add_argument("--no-validate", dest="validate", action="store_false",
+                        help="Skip DocumentContent validation of the output.")
+    parser.add_argument("--no-numbered", dest="numbered", action="store_false",
+                        help="Do not number headings.")
+    parser.add_argument("--inline-engine", choices=MarkdownToPapermill.INLINE_ENGINES, default="scanner",
+                        help="Inline formatting engine (default: scanner).")
+    parser.add_argument("--indent", type=int, default=None,
+                        help="Indent the JSON output by this many spaces.")
+    parser.add_argument("--stats", metavar="FILE",
+                        help="Write per-stage timings of each document to FILE as JSON lines.")
+    parser.add_argument("-q", "--quiet", action="store_true",
+                        help="Only print the summary.")
+    return parser.parse_args(argv)
+
+
+def _collect_tasks(inputs: List[str], output_dir: Optional[str]) -> List[Tuple[str, str]]:
+    """
+    Expands the inputs into (source, destination) pairs. Files found under a
+    directory argument, or matched by a glob pattern, keep their path
+    relative to the directory (or the pattern's leading directories without
+    wildcards) inside output_dir. Raises ValueError if two files would be
+    written to the same destination.
+    """
+    found = {}
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, files in os.walk(item):
+                for name in files:
+                    if name.lower().endswith(".md"):
+                        path = os.path.join(root, name)
+                        found.setdefault(os.path.normpath(path), os.path.relpath(path, item))
+        elif glob.has_magic(item):
+            base = os.path.dirname(item)
+            while glob.has_magic(base):
+                base = os.path.dirname(base)
+            for path in glob.glob(item, recursive=True):
+                if os.path.isfile(path):
+                    found.setdefault(os.path.normpath(path), os.path.relpath(path, base or os.curdir))
+        else:
+            found.setdefault(os.path.normpath(item), os.path.basename(item))
+
+    tasks = []
+    sources = {}
+    for path in sorted(found):
+        if output_dir:
+            dst = os.path.join(output_dir, os.path.splitext(found[path])[0] + ".json")
+        else:
+            dst = os.path.splitext(path)[0] + ".json"
+        key = os.path.normcase(os.path.abspath(dst))
+        if key in sources:
+            raise ValueError(f"{sources[key]} and {path} would both be written to {dst}")
+        sources[key] = path
+        tasks.append((path, dst))
+    return tasks
+
+
+def _init_worker(options: Dict) -> None:
+    global _OPTIONS, _CONVERTER
+    _OPTIONS = options
+    _CONVERTER = MarkdownToPapermill(numbered=options["numbered"], inline_engine=options["inline_engine"],
+                                     schema_output=True)
+
+
+def _process_file(task: Tuple[str, str]) -> Dict:
+    """
+    Runs the pipeline for one file. Exceptions are caught and returned, so
+    one bad document never takes down the batch.
+    """
+    src, dst = task
+    result = _new_result(src)
+    stats = _CONVERTER.stats = PipelineStats() if _OPTIONS["stats"] else None
+    try:
+        start = time.perf_counter()
+        with open(src, "r", encoding="utf-8") as f:
+            text = f.read()
+        result["bytes"] = len(text.encode("utf-8"))
+        if stats is not None:
+            stats.record("read", time.perf_counter() - start, result["bytes"])
+
+        if _OPTIONS["lint"]:
+            open_issues, _, content = lint_and_convert(text, _CONVERTER, _OPTIONS["lint_mode"])
+            result["open_issues"] = len(open_issues)
+        else:
+            content = _CONVERTER.convert(text)
+
+        if _OPTIONS["validate"]:
+            # The converter already writes the dumped form; this only checks it.
+            from .validator import DocumentContent
+            start = time.perf_counter()
+            DocumentContent.model_validate(content)
+            if stats is not None:
+                stats.record("validate", time.perf_counter() - start)
+
+        start = time.perf_counter()
+        out_dir = os.path.dirname(dst)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        with open(dst, "w", encoding="utf-8") as f:
+            json.dump(content, f, indent=_OPTIONS["indent"])
+            size = f.tell()
+        if stats is not None:
+            stats.record("write", time.perf_counter() - start, size)
+        result["output"] = dst
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    if stats is not None:
+        result["stats"] = stats.to_dict()
+    return result
+
+
+def _new_result(src: str, error: Optional[str] = None) -> Dict:
+    return {"source": src, "output": None, "bytes": 0, "open_issues": 0, "error": error, "stats": None}
+
+
+def _survive_broken_pool(results, tasks: List[Tuple[str, str]]):
+    """
+    Passes on the results of pool.map over tasks. If a worker process dies
+    (e.g. killed for running out of memory) the pool can run nothing more,
+    so every file without a result yet is reported as failed instead of
+    aborting the batch.
+    """
+    done = 0
+    try:
+        for result in results:
+            done += 1
+            yield result
+    except BrokenProcessPool as e:
+        for src, _ in tasks[done:]:
+            yield _new_result(src, f"BrokenProcessPool: {e}")
+
+
+def _summarise(results, quiet: bool, stats_file=None) -> Dict:
+    summary = {"converted": 0, "failed": 0, "bytes": 0, "open_issues": 0, "failures": []}
+    for result in results:
+        if stats_file is not None:
+            stats = result["stats"] or {"stages": {}, "blocks": {}}
+            stats_file.write(json.dumps({"source": result["source"], "error": result["error"], **stats}) + "\n")
+        summary["bytes"] += result["bytes"]
+        summary["open_issues"] += result["open_issues"]
+        if result["error"]:
+            summary["failed"] += 1
+            summary["failures"].append((result["source"], result["error"]))
+            if not quiet:
+                print(f"FAILED {result['source']}: {result['error']}", file=sys.stderr)
+        else:
+            summary["converted"] += 1
+            if not quiet:
+                print(f"{result['source']} -> {result['output']}")
+    return summary
+
+
+def _print_summary(summary: Dict, elapsed: float, workers: int) -> None:
+    total = summary["converted"] + summary["failed"]
+    elapsed = max(elapsed, 1e-9)
+    print(
+        f"{summary['converted']}/{total} converted, {summary['failed']} failed, "
+        f"{summary['open_issues']} open lint issues in {elapsed:.2f}s with {workers} worker(s): "
+        f"{total / elapsed:.1f} docs/s, {summary['bytes'] / elapsed / 1e6:.2f} MB/s"
+    )
+    if summary["failures"]:
+        print("Failures:", file=sys.stderr)
+        for src, error in summary["failures"]:
+            print(f"  {src}: {error}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,304 @@
+# src/papermill_markdown/client.py
+
+"""
+Submission of converted documents to the Papermill API. Payloads are
+{"layoutId", "placeholders", "documentContent"} envelopes (see
+DocumentModel). PapermillClient sends many of them concurrently over one
+pool of keep-alive connections. In-flight requests are bounded, failures
+are retried with backoff, and request bodies are streamed from a spooled
+file.
+
+    with PapermillClient(url, api_key) as client:
+        for result in client.submit_many({"document_content": doc, "layout_id": layout} for doc in docs):
+            print(result.key, result.status, result.timings)
+"""
+
+import asyncio
+import io
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, NamedTuple, Optional, Sequence, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .writer import write_json
+
+RETRY_STATUSES = (408, 429, 500, 502, 503, 504)
+
+
+class SubmitResult(NamedTuple):
+    key: Any  # the key passed to submit(), or the job's index in submit_many()
+    status: Optional[int]  # HTTP status of the last attempt, None if no response
+    body: Any  # parsed JSON response, or the raw bytes if it is not JSON
+    error: Optional[str]  # None on a 2xx response
+    attempts: int
+    timings: Dict[str, float]  # seconds: wait, serialise, request, backoff, total; and bytes sent
+
+
+def build_payload(document_content: Iterable[Dict], layout_id: str, placeholders: Optional[Dict] = None,
+                  references: Optional[Dict] = None, validate: bool = True) -> Dict:
+    """
+    The request envelope for document_content. With validate=True the
+    content and references are checked against DocumentModel and dumped in
+    its form, so an invalid document fails here rather than at the API.
+    Documents holding ImageReference or token objects must be sent with
+    validate=False (write_payload serialises them).
+    """
+    document_content = list(document_content)
+    if validate:
+        from .validator import DocumentModel
+        model = DocumentModel.model_validate({"references": references, "documentContent": document_content})
+        dumped = model.model_dump()
+        document_content, references = dumped["documentContent"], dumped["references"]
+    payload = {"layoutId": layout_id, "placeholders": placeholders or {}}
+    if references is not None:
+        payload["references"] = references
+    payload["documentContent"] = document_content
+    return payload
+
+
+def write_payload(payload: Dict, fp) -> None:
+    """
+    Writes a payload from build_payload() (or one built by hand) to the text
+    file fp. documentContent goes through writer.write_json, so lazy images
+    are base64-encoded straight into fp.
+    """
+    fp.write("{")
+    for name, value in payload.items():
+        if name == "documentContent":
+            continue
+        fp.write(f"{json.dumps(name)}: {json.dumps(value)}, ")
+    fp.write('"documentContent": ')
+    write_json(payload["documentContent"], fp)
+    fp.write("}")
+
+
+class _Body:
+    """
+    A spooled request body with a known length, sent in chunks and re-read
+    from the start on every attempt.
+    """
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, spool, size: int):
+        self._spool = spool
+        self._size = size
+        spool.seek(0)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def read(self, size: int = -1) -> bytes:
+        return self._spool.read(size)
+
+    def __iter__(self) -> Iterator[bytes]:
+        return iter(lambda: self._spool.read(self.CHUNK_SIZE), b"")
+
+
+class PapermillClient:
+    """
+    Thread-safe client submitting payloads to the Papermill API.
+
+    url: the API endpoint documents are POSTed to; defaults to the
+        PAPERMILL_API_URL environment variable.
+    api_key: sent as "Authorization: Bearer <api_key>"; defaults to
+        PAPERMILL_API_KEY, read from the environment or a .env file.
+        Use headers to send it differently.
+    max_in_flight: requests sent concurrently. submit() blocks while this
+        many are in flight, so a producer cannot run ahead of the API.
+    pool_size: keep-alive connections kept open (default: max_in_flight).
+    timeout: seconds to connect and to wait for each read.
+    retries: extra attempts after a connection error, timeout or a status
+        in retry_statuses. Attempts are spaced by exponential backoff with
+        full jitter, starting at backoff seconds and capped at max_backoff,
+        or by the response's Retry-After header.
+    validate: check each document against DocumentModel before sending.
+    spool_bytes: request bodies are serialised into memory up to this size
+        and into a temporary file beyond it, then streamed from there.
+    """
+
+    def __init__(self, url: Optional[str] = None, api_key: Optional[str] = None, max_in_flight: int = 8,
+                 pool_size: Optional[int] = None, timeout: float = 60.0, retries: int = 3, backoff: float = 0.5,
+                 max_backoff: float = 30.0, retry_statuses: Sequence[int] = RETRY_STATUSES,
+                 validate: bool = True, spool_bytes: int = 8 * 1024 * 1024, headers: Optional[Dict] = None,
+                 session: Optional[requests.Session] = None):
+        if url is None or api_key is None:
+            _load_env()
+        url = url or os.environ.get("PAPERMILL_API_URL")
+        if not url:
+            raise ValueError("No API url given and PAPERMILL_API_URL is not set")
+        if max_in_flight < 1 or retries < 0:
+            raise ValueError("max_in_flight must be at least 1 and retries at least 0")
+        api_key = api_key or os.environ.get("PAPERMILL_API_KEY")
+
+        self.url = url
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_statuses = frozenset(retry_statuses)
+        self.validate = validate
+        self.spool_bytes = spool_bytes
+        self.headers = {"Content-Type": "application/json", "Accept": "application/json"}
+        if api_key:
+            self.headers["Authorization"] = f"Bearer {api_key}"
+        self.headers.update(headers or {})
+
+        self.session = session or requests.Session()
+        # Retries are handled here, with the body rewound, not by urllib3.
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size or max_in_flight, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="papermill-client")
+
+    def submit(self, document_content: Union[Iterable[Dict], Dict], layout_id: Optional[str] = None,
+               placeholders: Optional[Dict] = None, references: Optional[Dict] = None, key: Any = None) -> Future:
+        """
+        Sends one document in the background and returns a Future of its
+        SubmitResult; failures are reported in the result, not raised.
+        document_content may also be a complete payload dict, in which case
+        the other arguments are ignored. Blocks while max_in_flight requests
+        are already in flight.
+        """
+        waited = time.perf_counter()
+        self._slots.acquire()
+        return self._start(document_content, layout_id, placeholders, references, key, waited)
+
+    async def submit_async(self, document_content: Union[Iterable[Dict], Dict], layout_id: Optional[str] = None,
+                           placeholders: Optional[Dict] = None, references: Optional[Dict] = None,
+                           key: Any = None) -> SubmitResult:
+        """
+        submit() for asyncio: waits for a free slot and for the response
+        without blocking the event loop. Cancelling the task while it waits
+        for a slot does not leak the slot.
+        """
+        loop = asyncio.get_running_loop()
+        waited = time.perf_counter()
+        acquire = loop.run_in_executor(None, self._slots.acquire)
+        try:
+            await asyncio.shield(acquire)
+        except asyncio.CancelledError:
+            # The executor thread cannot be interrupted and still takes a
+            # slot when one frees up; give it back then.
+            acquire.add_done_callback(self._release_acquired)
+            raise
+        future = self._start(document_content, layout_id, placeholders, references, key, waited)
+        return await asyncio.wrap_future(future)
+
+    def submit_many(self, jobs: Iterable[Dict]) -> Iterator[SubmitResult]:
+        """
+        Submits each job (a dict of submit() arguments) and yields the
+        results in job order. jobs is consumed lazily, at most
+        2 * max_in_flight ahead of the results, so it can be a generator
+        converting documents as they are needed. A job without a key gets
+        its index.
+        """
+        pending = deque()
+        for index, job in enumerate(jobs):
+            job = dict(job)
+            job.setdefault("key", index)
+            pending.append(self.submit(**job))
+            while pending and (pending[0].done() or len(pending) >= 2 * self.max_in_flight):
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def close(self) -> None:
+        self._executor.shutdown()
+        self.session.close()
+
+    def __enter__(self) -> "PapermillClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _release_acquired(self, acquire: "asyncio.Future") -> None:
+        if not acquire.cancelled() and acquire.exception() is None:
+            self._slots.release()
+
+    def _start(self, document_content, layout_id, placeholders, references, key, waited: float) -> Future:
+        try:
+            future = self._executor.submit(self._send, document_content, layout_id, placeholders, references,
+                                           key, time.perf_counter() - waited)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _send(self, document_content, layout_id, placeholders, references, key, wait: float) -> SubmitResult:
+        start = time.perf_counter()
+        timings = {"wait": wait, "serialise": 0.0, "request": 0.0, "backoff": 0.0, "total": 0.0, "bytes": 0}
+        status, body, error, attempts = None, None, None, 0
+        with tempfile.SpooledTemporaryFile(max_size=self.spool_bytes) as spool:
+            try:
+                if isinstance(document_content, dict):
+                    payload = document_content
+                else:
+                    payload = build_payload(document_content, layout_id, placeholders, references, self.validate)
+                text = io.TextIOWrapper(spool, encoding="utf-8")
+                write_payload(payload, text)
+                text.flush()
+                text.detach()
+                timings["bytes"] = spool.tell()
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            timings["serialise"] = time.perf_counter() - start
+
+            retry_after = None
+            while error is None or attempts and attempts <= self.retries:
+                if attempts:
+                    pause = self._retry_delay(attempts, retry_after)
+                    time.sleep(pause)
+                    timings["backoff"] += pause
+                attempts += 1
+                sent = time.perf_counter()
+                try:
+                    response = self.session.post(self.url, data=_Body(spool, timings["bytes"]),
+                                                 headers=self.headers, timeout=self.timeout)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    timings["request"] += time.perf_counter() - sent
+                    status, body, error, retry_after = None, None, f"{type(e).__name__}: {e}", None
+                    continue
+                timings["request"] += time.perf_counter() - sent
+                status, body = response.status_code, _response_body(response)
+                if response.ok:
+                    error = None
+                    break
+                error = f"HTTP {status}: {response.reason}"
+                if status not in self.retry_statuses:
+                    break
+                retry_after = response.headers.get("Retry-After")
+        timings["total"] = time.perf_counter() - start
+        return SubmitResult(key, status, body, error, attempts, timings)
+
+    def _retry_delay(self, attempt: int, retry_after: Optional[str]) -> float:
+        if retry_after:
+            try:
+                return min(self.max_backoff, max(0.0, float(retry_after)))
+            except ValueError:
+                pass  # an HTTP date; fall back to backoff
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+
+
+def _response_body(response: requests.Response) -> Any:
+    try:
+        return response.json()
+    except ValueError:
+        return response.content
+
+
+def _load_env() -> None:
+    # PAPERMILL_API_URL / PAPERMILL_API_KEY may live in a .env file.
+    from dotenv import load_dotenv
+    load_dotenv()
@@ -0,0 +1,131 @@
+# src/papermill_markdown/compact.py
+
+"""
+Optional compaction of converted elements. Inline tokens are merged with
+their neighbours when they have the same formatting, formatted text without
+any formatting becomes a plain string, and token lists left with a single
+entry are collapsed wherever the schema accepts the entry on its own. The
+document renders the same, with fewer nodes to upload and validate.
+"""
+
+import json
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Elements whose inline content compaction rewrites; the rest are left as is.
+COMPACTED_TYPES = ("paragraph", "list", "table")
+
+
+def new_report() -> Dict[str, int]:
+    return {"nodes_before": 0, "nodes_after": 0, "bytes_before": 0, "bytes_after": 0}
+
+
+def compact_element(element: Dict, report: Optional[Dict[str, int]] = None) -> Dict:
+    """
+    Returns a compacted copy of a paragraph, list or table element, or the
+    element itself for any other type. The input is not modified.
+
+    report: optional dict from new_report(). The node count (the element
+    and every list, dict and string in its content) and JSON size in bytes
+    of the element before and after are added to it.
+    """
+    kind = element.get("type")
+    if kind not in COMPACTED_TYPES:
+        return element
+
+    out = dict(element)
+    if kind == "paragraph":
+        out["text"] = _rich_text(element["text"])
+    elif kind == "list":
+        out["items"] = [_rich_text(item) for item in element["items"]]
+    else:
+        out["header"] = [_cell(cell) for cell in element["header"]]
+        out["body"] = [[_cell(cell) for cell in row] for row in element["body"]]
+        if isinstance(element.get("caption"), list):
+            out["caption"] = _rich_text(element["caption"])
+
+    if report is not None:
+        report["nodes_before"] += _count_nodes(element)
+        report["nodes_after"] += _count_nodes(out)
+        report["bytes_before"] += _json_size(element)
+        report["bytes_after"] += _json_size(out)
+    return out
+
+
+def compact_document(elements: Iterable[Dict]) -> Tuple[List[Dict], Dict[str, int]]:
+    """
+    Compacts every element of a converted document. Returns the new list of
+    elements and a report of node counts and JSON bytes before and after,
+    over the paragraphs, lists and tables.
+    """
+    report = new_report()
+    return [compact_element(element, report) for element in elements], report
+
+
+def _rich_text(value: Any) -> Any:
+    # Paragraph text, list items and captions: a string or a list of tokens.
+    if not isinstance(value, list):
+        return value
+    tokens = _merge(value)
+    if not tokens:
+        return ""
+    if len(tokens) == 1 and isinstance(tokens[0], str):
+        return tokens[0]
+    return tokens
+
+
+def _cell(value: Any) -> Any:
+    # Table cells may also be a single token.
+    if isinstance(value, dict):
+        value = [value]
+    elif not isinstance(value, list):
+        return value
+    tokens = _merge(value)
+    if not tokens:
+        return ""
+    if len(tokens) == 1:
+        return tokens[0]
+    return tokens
+
+
+def _merge(tokens: List) -> List:
+    out = []
+    previous_flags = None  # formatting of out[-1] if it is untyped text
+    for token in tokens:
+        if isinstance(token, dict) and "type" not in token:
+            flags = _flags(token)
+            if not flags:
+                token = token["text"]
+        if isinstance(token, str):
+            if not token:
+                continue
+            if out and isinstance(out[-1], str):
+                out[-1] += token
+            else:
+                out.append(token)
+            previous_flags = None
+        elif "type" in token:
+            out.append(token)
+            previous_flags = None
+        elif flags == previous_flags:
+            out[-1] = {**out[-1], "text": out[-1]["text"] + token["text"]}
+        else:
+            out.append(token)
+            previous_flags = flags
+    return out
+
+
+def _flags(token: Dict) -> Tuple:
+    # Everything but the text that is set; unset schema fields are None.
+    return tuple(sorted((k, v) for k, v in token.items() if k != "text" and v is not None))
+
+
+def _count_nodes(value: Any) -> int:
+    if isinstance(value, list):
+        return 1 + sum(_count_nodes(item) for item in value)
+    if isinstance(value, dict):
+        return 1 + sum(_count_nodes(item) for item in value.values() if isinstance(item, (list, dict)))
+    return 1
+
+
+def _json_size(value: Any) -> int:
+    return len(json.dumps(value, ensure_ascii=False).encode("utf-8"))
@@ -1,12 +1,176 @@
 # src/papermill_markdown/converter.py
 
 import re
+import threading
+import time
 import unicodedata
 import os
-import base64
-from typing import List, Dict, Union, Tuple, Optional
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Callable, List, Dict, Union, Tuple, Optional, Iterable, Iterator
 from urllib.parse import unquote
 
+from .compact import compact_element, new_report as new_compact_report
+from .images import ImageCache, ImageDeduplicator, ImageOptimizer, ImageReference, encode_image_file
+from .stats import PipelineStats, text_bytes
+from . import tokens as inline_tokens
+
+
+class _DelimiterIndex:
+    """
+    Sorted start offsets of delimiters in a piece of text, built on first use,
+    so that finding the next occurrence at or after an offset is a bisect
+    rather than a rescan of the rest of the text.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self._starts = {}
+
+    def next(self, pattern: re.Pattern, pos: int) -> int:
+        starts = self._starts.get(pattern)
+        if starts is None:
+            starts = [m.start() for m in pattern.finditer(self.text)]
+            self._starts[pattern] = starts
+        k = bisect_left(starts, pos)
+        return starts[k] if k < len(starts) else -1
+
+
+# Requests exchanged with the MarkdownToPapermill._scan_blocks coroutine.
+_NEED_LINE = object()
+_END_OF_INPUT = object()
+
+
+class _LineReader:
+    """
+    Line source for MarkdownToPapermill._scan_blocks. Lines read ahead can be
+    pushed back to be replayed, and the last few lines are kept so a table
+    header can look behind it for a caption.
+    """
+
+    def __init__(self):
+        self.pending = deque()
+        self.recent = deque(maxlen=8)
+        self.count = 0
+        self.ended = False
+
+    def take(self):
+        """
+        Returns the next (index, line) pair, or None at the end of the input.
+        Use with "yield from" inside the scanner coroutine.
+        """
+        if self.pending:
+            return self.pending.popleft()
+        if self.ended:
+            return None
+        line = yield _NEED_LINE
+        if line is _END_OF_INPUT:
+            self.ended = True
+            return None
+        item = (self.count, line)
+        self.count += 1
+        self.recent.append(item)
+        return item
+
+    def push_back(self, items: List[Tuple[int, str]]) -> None:
+        self.pending.extendleft(reversed(items))
+
+    def line_at(self, idx: int) -> str:
+        for i, line in self.recent:
+            if i == idx:
+                return line
+        raise IndexError(f"Line {idx} is no longer available")
+
+
+class _FootnoteExtractor:
+    """
+    Applies MarkdownToPapermill._process_footnotes to a document one line at a
+    time. FOOTNOTE_DEF_PATTERN lets whitespace after "[^n]:" span lines, so a
+    line ending in an open definition is held until a line with text (or the
+    end of the input) shows where the definition ends.
+    """
+    OPEN_FOOTNOTE_DEF_PATTERN = re.compile(r'\[\^\d+\]:\s*$')
+
+    def __init__(self, converter: "MarkdownToPapermill"):
+        self.converter = converter
+        self.footnotes = {}
+        self._carry = []
+
+    def push(self, line: str) -> List[str]:
+        """
+        Takes one raw line and returns the processed lines now ready.
+        """
+        line = self.converter._normalize_text(line)
+        if not self._carry and "[^" not in line:
+            return [line]
+        waiting = bool(self._carry) and not line.strip()
+        self._carry.append(line)
+        if waiting or self.OPEN_FOOTNOTE_DEF_PATTERN.search(line):
+            return []
+        return self.flush()
+
+    def flush(self) -> List[str]:
+        if not self._carry:
+            return []
+        text, footnotes = self.converter._process_footnotes("\n".join(self._carry))
+        self._carry = []
+        self.footnotes.update(footnotes)
+        return text.split('\n')
+
+
+class _ConversionState(threading.local):
+    """
+    The state of the conversion running in the current thread: the
+    document's footnotes, image handling and the reports of the last
+    conversion. Keeping it per thread lets one converter serve many threads.
+    """
+
+    def __init__(self):
+        self.footnotes = {}
+        self.image_report = None
+        self.compact_report = None
+        self.image_pool = None
+        self.image_dedup = None
+
+
+def _state_property(name: str) -> property:
+    return property(
+        lambda self: getattr(self._state, name),
+        lambda self, value: setattr(self._state, name, value),
+    )
+
+
+def _raw_block_bytes(block: Tuple) -> int:
+    # Source size of a raw block from _scan_blocks, for PipelineStats.
+    size = 0
+    for part in block[1:]:
+        if isinstance(part, str):
+            size += text_bytes(part)
+        elif isinstance(part, list):
+            for item in part:
+                size += sum(map(text_bytes, item)) if isinstance(item, list) else text_bytes(item)
+    return size
+
+
+# Per-process converter used by MarkdownToPapermill._build_sections.
+_SECTION_CONVERTER = None
+
+
+def _init_section_worker(numbered: bool, inline_engine: str, schema_output: bool, compact: bool,
+                         token_objects: bool, footnotes: Dict[str, str]) -> None:
+    global _SECTION_CONVERTER
+    _SECTION_CONVERTER = MarkdownToPapermill(numbered=numbered, inline_engine=inline_engine,
+                                             schema_output=schema_output, compact=compact,
+                                             token_objects=token_objects)
+    _SECTION_CONVERTER.footnotes = footnotes
+
+
+def _build_section(blocks: List[Tuple]) -> Tuple[List[Dict], Optional[Dict[str, int]]]:
+    _SECTION_CONVERTER.compact_report = new_compact_report() if _SECTION_CONVERTER.compact else None
+    return [_SECTION_CONVERTER._build_block(block) for block in blocks], _SECTION_CONVERTER.compact_report
+
 
 class MarkdownToPapermill:
     # Regular expression patterns
@@ -26,6 +190,19 @@ class MarkdownToPapermill:
         re.compile(r'^\s*\[[A-Z][a-zA-Z\s,\.-]+(?:\s+et\s+al\.?)?,?\s*\d{4}\]')
     ]
     LIST_ITEM_PATTERN = re.compile(r'^(\d+\.)|^([-*])\s+')
+    TABLE_CAPTION_PREFIXES = ["Table", "Tab", "TABLE", "TAB"]
+
+    # Simple mojibake replacements applied after NFC normalization
+    MOJIBAKE_REPLACEMENTS = {
+        'Â£': '£',
+        'â€”': '—',
+        'â€“': '–',
+        'â€™': '’',
+        'â€˜': '‘',
+        'â€œ': '“',
+        'â€�': '”',
+        'â€¦': '…'
+    }
 
     # Patterns for inline formatting
     INLINE_FORMATTING_PATTERNS = {
@@ -56,90 +233,423 @@ class MarkdownToPapermill:
     BLOCK_MATH_END_PATTERN = re.compile(r'^\$\$\s*$')
     INLINE_MATH_PATTERN = re.compile(r'\$(.+?)\$')
 
-    def __init__(self, numbered: bool = True):
-        self.footnotes = {}
+    # Single alternation of every inline pattern, in the same priority order the
+    # legacy engine tries them, so one left-to-right pass finds every token.
+    INLINE_SCANNER_PATTERN = re.compile(
+        f'(?P<math>{INLINE_MATH_PATTERN.pattern})|(?P<reference>{REF_PATTERN.pattern})|'
+        + '|'.join(f'(?P<{fmt}>{pattern.pattern})' for fmt, pattern in INLINE_FORMATTING_PATTERNS.items())
+    )
+
+    # Characters that can start an inline token, and the (overlapping,
+    # zero-width) delimiter patterns the linear engine looks ahead for.
+    INLINE_TRIGGER_PATTERN = re.compile(r'[$\[*_^<~]')
+    DELIMITER_PATTERNS = {
+        'newline': re.compile(r'\n'),
+        'dollar': re.compile(r'\$'),
+        'triple_star': re.compile(r'(?=\*\*\*)'),
+        'double_star': re.compile(r'(?=\*\*)'),
+        'single_star': re.compile(r'(?<!\*)\*(?!\*)'),
+        'double_underscore': re.compile(r'(?=__)'),
+        'caret': re.compile(r'\^'),
+        'sup_close': re.compile(r'</sup>'),
+        'tilde': re.compile(r'~'),
+        'sub_close': re.compile(r'</sub>'),
+        'link_middle': re.compile(r'\]\('),
+        'close_paren': re.compile(r'\)'),
+        'close_bracket': re.compile(r'\]'),
+        'ref_end': re.compile(r'[\]\s]'),
+        'non_space': re.compile(r'\S'),
+    }
+
+    # Formatting flags set by each kind of inline match, as interned tuples
+    # for token_objects mode.
+    TOKEN_FLAGS = {
+        'bold_italic': inline_tokens.flags("bold", "italic"),
+        'bold': inline_tokens.flags("bold"),
+        'italic': inline_tokens.flags("italic"),
+        'underline': inline_tokens.flags("underline"),
+        'superscript_md': inline_tokens.flags("superscript"),
+        'superscript_html': inline_tokens.flags("superscript"),
+        'subscript_md': inline_tokens.flags("subscript"),
+        'subscript_html': inline_tokens.flags("subscript"),
+    }
+
+    # Per-conversion state, kept per thread (see _ConversionState).
+    footnotes = _state_property("footnotes")
+    image_report = _state_property("image_report")
+    compact_report = _state_property("compact_report")
+    _image_pool = _state_property("image_pool")
+    _image_dedup = _state_property("image_dedup")
+
+    INLINE_ENGINES = ("scanner", "legacy", "linear")
+    SECTION_SPLIT_KINDS = ("heading", "code", "equation")
+    SECTION_MIN_BLOCKS = 64
+
+    def __init__(self, numbered: bool = True, inline_engine: str = "scanner",
+                 image_cache: Optional[ImageCache] = None, image_workers: int = 0,
+                 lazy_images: bool = False, dedupe_images: Optional[str] = "path",
+                 image_optimizer: Optional[ImageOptimizer] = None, section_workers: int = 0,
+                 schema_output: bool = False, compact: bool = False, token_objects: bool = False,
+                 stats: Optional[PipelineStats] = None, local_images: bool = True, image_root: Optional[str] = None):
+        """
+        numbered: whether headings are numbered.
+        inline_engine: one of INLINE_ENGINES, see README.
+        image_cache: optional ImageCache shared across conversions, so local
+            images are read and base64-encoded once.
+        image_workers: if greater than 0, convert() reads and encodes local
+            images on a pool of this many threads while the document is
+            parsed, and fills in their URLs once parsing is done.
+        lazy_images: if True, local images are left as ImageReference objects
+            in the "url" field and only encoded when writer.write_json streams
+            them into the output. The cache, image_workers and
+            image_optimizer are not used.
+        dedupe_images: "path" or "content" to encode an image repeated within
+            one document once (see ImageDeduplicator), or None. After
+            convert(), image_report holds the number of images, duplicates
+            and bytes saved.
+        image_optimizer: optional ImageOptimizer that downscales and
+            recompresses local images before they are encoded.
+        section_workers: if greater than 1, convert() splits large documents
+            into sections at headings and code or maths fences and builds
+            them on a pool of this many processes. Images are still handled
+            in this process. Worth it for documents of thousands of blocks.
+        schema_output: if True, each element is emitted as
+            DocumentContent.model_validate(...).model_dump() would return it
+            (see validator.dump_element), so the validate/dump round trip can
+            be skipped. Validating the output still works as a debug check.
+        compact: if True, adjacent inline tokens with the same formatting
+            are merged and trivial lists and formatting collapsed (see
+            compact.compact_element). After convert(), compact_report holds
+            the node counts and JSON bytes of the compacted elements before
+            and after.
+        token_objects: if True, inline tokens are slotted objects from the
+            tokens module instead of dicts, which take a fraction of the
+            memory. writer.write_json serialises them as the same JSON;
+            use tokens.to_dicts() to get the dict form, e.g. to validate.
+            Cannot be combined with schema_output or compact, which
+            produce dicts.
+        stats: optional PipelineStats that records the time, calls and
+            bytes of each conversion stage and block type (see the stats
+            module). Blocks built by section_workers processes are only
+            counted as a whole.
+        local_images: if False, an image that is not an http(s) or data:
+            URL raises PermissionError instead of being read.
+        image_root: if set, local image paths are resolved against this
+            directory, and a path that resolves outside it (absolute, with
+            "..", or through a symlink) raises PermissionError. Use both
+            when converting untrusted Markdown, so it cannot embed arbitrary
+            files.
+        """
+        if inline_engine not in self.INLINE_ENGINES:
+            raise ValueError(
+                f"Unknown inline engine '{inline_engine}', expected one of {self.INLINE_ENGINES}"
+            )
+        if token_objects and (schema_output or compact):
+            raise ValueError("token_objects cannot be combined with schema_output or compact")
+        self._state = _ConversionState()
         self.numbered = numbered
+        self.inline_engine = inline_engine
+        self.image_cache = image_cache
+        self.image_workers = image_workers
+        self.lazy_images = lazy_images
+        self.dedupe_images = dedupe_images
+        self.image_optimizer = image_optimizer
+        self.section_workers = section_workers
+        self.schema_output = schema_output
+        self.compact = compact
+        self.token_objects = token_objects
+        self.stats = stats
+        self.local_images = local_images
+        self.image_root = image_root
+
+    def __getstate__(self) -> Dict:
+        state = dict(self.__dict__)
+        del state["_state"]
+        # Statistics stay with the converter they were collected in.
+        state["stats"] = None
+        return state
+
+    def __setstate__(self, state: Dict) -> None:
+        self.__dict__.update(state)
+        self._state = _ConversionState()
 
     def convert(self, markdown_text: str) -> List[Dict]:
-        # Normalize Unicode and apply simple replacements.
-        markdown_text = unicodedata.normalize('NFC', markdown_text)
-        replacements = {
-            'Â£': '£',
-            'â€”': '—',
-            'â€“': '–',
-            'â€™': '’',
-            'â€˜': '‘',
-            'â€œ': '“',
-            'â€�': '”',
-            'â€¦': '…'
-        }
-        for k, v in replacements.items():
-            markdown_text = markdown_text.replace(k, v)
+        """
+        Converts a Markdown document into a list of Papermill elements.
+
+        The document's state (footnotes, image deduplication, reports) is
+        kept per thread, so one converter can run conversions in several
+        threads at once. footnotes, image_report and compact_report then
+        describe the last conversion in the calling thread.
+        """
+        return self._convert_text(markdown_text, self._build_blocks)
+
+    def _convert_text(self, markdown_text: str, build_blocks: Callable[[List[str]], List[Dict]]) -> List[Dict]:
+        """
+        convert() with the elements built by build_blocks(lines), e.g. from
+        memoised blocks by IncrementalConverter. Normalisation, footnotes,
+        image handling, reports and stats are the same for every caller.
+        """
+        stats = self.stats
+        if stats is not None:
+            size = text_bytes(markdown_text)
+            start = time.perf_counter()
+        markdown_text = self._normalize_text(markdown_text)
+        if stats is not None:
+            normalized = time.perf_counter()
+            stats.record("normalize", normalized - start, size)
 
         # Process footnotes
         markdown_text, self.footnotes = self._process_footnotes(markdown_text)
-        lines = markdown_text.split('\n')
-        result = []
-        buffer = []
-        skip_lines = set()
+        if stats is not None:
+            stats.record("footnotes", time.perf_counter() - normalized, size)
+        return self._convert_lines(markdown_text.split('\n'), build_blocks)
 
-        # Identify lines that look like captions and skip them
-        for idx, line in enumerate(lines):
-            if self.CAPTION_PATTERN.match(line.strip()) or self.FIGURE_PATTERN.match(line.strip()):
-                skip_lines.add(idx)
+    async def convert_async(self, markdown_text: str, executor=None) -> List[Dict]:
+        """
+        convert() run on an executor, so the event loop is not blocked while
+        the document is converted. executor defaults to the loop's default
+        thread pool.
+
+        footnotes, image_report and compact_report are copied from the
+        worker thread onto the calling thread when the conversion finishes,
+        so they hold this conversion's reports, as after convert(). Other
+        coroutines on the same loop overwrite them, so read them before the
+        caller's next await.
+        """
+        import asyncio
+        loop = asyncio.get_running_loop()
+        content, footnotes, image_report, compact_report = await loop.run_in_executor(
+            executor, self._convert_with_state, markdown_text)
+        self.footnotes = footnotes
+        self.image_report = image_report
+        self.compact_report = compact_report
+        return content
+
+    def _convert_with_state(self, markdown_text: str) -> Tuple[List[Dict], Dict, Optional[Dict], Optional[Dict]]:
+        content = self.convert(markdown_text)
+        return content, self.footnotes, self.image_report, self.compact_report
+
+    def convert_lines(self, lines: Iterable[str]) -> List[Dict]:
+        """
+        convert() for a document that is already split into lines, e.g. the
+        output of MarkdownLinter.lint_lines(). Gives the same result as
+        convert("\\n".join(lines)) without joining and re-splitting the text.
+        """
+        start = time.perf_counter()
+        extractor = _FootnoteExtractor(self)
+        processed = []
+        for line in lines:
+            processed.extend(extractor.push(line))
+        processed.extend(extractor.flush())
+        if not processed:
+            processed = [""]
+        self.footnotes = extractor.footnotes
+        if self.stats is not None:
+            size = sum(text_bytes(line) + 1 for line in processed) - 1
+            self.stats.record("footnotes", time.perf_counter() - start, size)
+        return self._convert_lines(processed)
+
+    def _convert_lines(self, lines: List[str],
+                       build_blocks: Optional[Callable[[List[str]], List[Dict]]] = None) -> List[Dict]:
+        build_blocks = build_blocks or self._build_blocks
+        if self.stats is None:
+            return self._convert_lines_untimed(lines, build_blocks)
+        start = time.perf_counter()
+        try:
+            return self._convert_lines_untimed(lines, build_blocks)
+        finally:
+            size = sum(text_bytes(line) + 1 for line in lines) - 1
+            self.stats.record("convert", time.perf_counter() - start, size)
+
+    def _convert_lines_untimed(self, lines: List[str], build_blocks: Callable[[List[str]], List[Dict]]) -> List[Dict]:
+        self._image_dedup = self._new_image_deduplicator()
+        if self.compact:
+            self.compact_report = new_compact_report()
+        try:
+            if not self.image_workers:
+                return build_blocks(lines)
+
+            with ThreadPoolExecutor(max_workers=self.image_workers) as pool:
+                self._image_pool = pool
+                try:
+                    result = build_blocks(lines)
+                finally:
+                    self._image_pool = None
+                return self._resolve_images(result)
+        finally:
+            if self._image_dedup is not None:
+                self.image_report = self._image_dedup.report()
+            self._image_dedup = None
+
+    def _build_blocks(self, lines: List[str]) -> List[Dict]:
+        if self.section_workers > 1:
+            blocks = list(self._iter_raw_blocks(lines))
+            if len(blocks) >= 2 * self.SECTION_MIN_BLOCKS:
+                return self._build_sections(blocks)
+            return [self._build_block(block) for block in blocks]
+        return [self._build_block(block) for block in self._iter_raw_blocks(lines)]
+
+    def _build_sections(self, blocks: List[Tuple]) -> List[Dict]:
+        """
+        Builds raw blocks on a process pool, one section per task, and
+        stitches the results back together in document order. Block
+        boundaries, captions and breaks are already settled by the sequential
+        scan, and every worker gets the document-wide footnotes. Image blocks
+        are built here so the cache, deduplication and image_workers apply.
+        """
+        from concurrent.futures import ProcessPoolExecutor
+        sections = self._split_sections(blocks)
+        initargs = (self.numbered, self.inline_engine, self.schema_output, self.compact, self.token_objects,
+                    self.footnotes)
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=self.section_workers,
+                                 initializer=_init_section_worker, initargs=initargs) as pool:
+            futures = [pool.submit(_build_section, [b for b in section if b[0] != "image"])
+                       for section in sections]
+            images = {id(b): self._build_block(b) for b in blocks if b[0] == "image"}
+            result = []
+            for section, future in zip(sections, futures):
+                built, report = future.result()
+                built = iter(built)
+                if report is not None:
+                    for key, value in report.items():
+                        self.compact_report[key] += value
+                for block in section:
+                    result.append(images[id(block)] if block[0] == "image" else next(built))
+        if self.stats is not None:
+            self.stats.record("sections", time.perf_counter() - start)
+        return result
 
+    def _split_sections(self, blocks: List[Tuple]) -> List[List[Tuple]]:
+        """
+        Cuts the raw blocks into about four sections per worker, each starting
+        at a heading, code or equation block.
+        """
+        target = max(self.SECTION_MIN_BLOCKS, -(-len(blocks) // (self.section_workers * 4)))
+        sections = [[]]
+        for block in blocks:
+            if len(sections[-1]) >= target and block[0] in self.SECTION_SPLIT_KINDS:
+                sections.append([])
+            sections[-1].append(block)
+        return sections
+
+    def _new_image_deduplicator(self, max_bytes: Optional[int] = None) -> Optional[ImageDeduplicator]:
+        return ImageDeduplicator(self.dedupe_images, max_bytes) if self.dedupe_images else None
+
+    def _resolve_images(self, result: List[Dict]) -> List[Dict]:
+        """
+        Replaces the futures left in image URLs by a parallel conversion with
+        their data: URIs, in document order, so the first failing image raises.
+        """
+        for block in result:
+            if block.get("type") == "image" and isinstance(block.get("url"), Future):
+                block["url"] = block["url"].result()
+        return result
+
+    def iter_convert(self, source) -> Iterator[Dict]:
+        """
+        Generator version of convert() over a file path, a text stream or an
+        iterable of lines, yielding one block element at a time. See
+        streaming.iter_convert for how each kind of source is read.
+        """
+        from .streaming import iter_convert
+        return iter_convert(source, self)
+
+    def _normalize_text(self, text: str) -> str:
+        """
+        Normalizes Unicode and applies simple mojibake replacements. Neither
+        step crosses a newline, so it can be applied to a whole document or
+        one line at a time.
+        """
+        if text.isascii():
+            return text
+        text = unicodedata.normalize('NFC', text)
+        for k, v in self.MOJIBAKE_REPLACEMENTS.items():
+            text = text.replace(k, v)
+        return text
+
+    def _iter_raw_blocks(self, lines: Iterable[str]) -> Iterator[Tuple]:
+        """
+        Drives _scan_blocks over an iterable of lines, yielding raw blocks.
+        """
+        lines = iter(lines)
+        scanner = self._scan_blocks()
+        try:
+            request = next(scanner)
+            while True:
+                if request is _NEED_LINE:
+                    request = scanner.send(next(lines, _END_OF_INPUT))
+                else:
+                    yield request
+                    request = next(scanner)
+        except StopIteration:
+            return
+
+    def _scan_blocks(self):
+        """
+        Coroutine that splits lines into raw blocks without doing any inline
+        processing, so the same logic serves whole documents and streamed
+        input. It yields _NEED_LINE when it wants the next line (send the
+        line, or _END_OF_INPUT once there are none) and a raw block tuple,
+        e.g. ("paragraph", text), whenever one is complete. Raw blocks are
+        turned into Papermill elements by _build_block.
+        """
+        reader = _LineReader()
+        buffer = []
         empty_count = 0
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
+
+        item = yield from reader.take()
+        while item is not None:
+            line = item[1].strip()
 
             # Block math
             if self.BLOCK_MATH_START_PATTERN.match(line):
                 if buffer:
-                    result.append(self._process_paragraph(" ".join(buffer)))
+                    yield ("paragraph", " ".join(buffer))
                     buffer = []
-                i += 1
                 block_lines = []
-                while i < len(lines) and not self.BLOCK_MATH_END_PATTERN.match(lines[i].strip()):
-                    block_lines.append(lines[i])
-                    i += 1
-                i += 1  # skip the closing $$
+                item = yield from reader.take()
+                while item is not None and not self.BLOCK_MATH_END_PATTERN.match(item[1].strip()):
+                    block_lines.append(item[1])
+                    item = yield from reader.take()
                 eq_text = "\n".join(block_lines).strip()
                 if eq_text:
-                    result.append({"type": "equation", "equation": eq_text})
+                    yield ("equation", eq_text)
                 empty_count = 0
+                item = yield from reader.take()  # skip the closing $$
                 continue
 
             # Code blocks
             if line.startswith("```"):
                 if buffer:
-                    result.append(self._process_paragraph(" ".join(buffer)))
+                    yield ("paragraph", " ".join(buffer))
                     buffer = []
-                i += 1
                 code_lines = []
-                while i < len(lines) and not lines[i].strip().startswith("```"):
-                    code_lines.append(lines[i])
-                    i += 1
-                i += 1  # skip closing ```
-                result.append({"type": "code", "text": "\n".join(code_lines)})
+                item = yield from reader.take()
+                while item is not None and not item[1].strip().startswith("```"):
+                    code_lines.append(item[1])
+                    item = yield from reader.take()
+                yield ("code", "\n".join(code_lines))
                 empty_count = 0
+                item = yield from reader.take()  # skip closing ```
                 continue
 
             # Skip caption lines
-            if i in skip_lines:
-                i += 1
+            if self.CAPTION_PATTERN.match(line) or self.FIGURE_PATTERN.match(line):
+                item = yield from reader.take()
                 continue
 
             # Empty line -> possible paragraph break or final break
             if not line:
                 if buffer:
-                    result.append(self._process_paragraph(" ".join(buffer)))
+                    yield ("paragraph", " ".join(buffer))
                     buffer = []
                 empty_count += 1
                 if empty_count >= 3:
-                    result.append({"type": "break"})
+                    yield ("break",)
                     empty_count = 0
-                i += 1
+                item = yield from reader.take()
                 continue
             else:
                 empty_count = 0
@@ -147,46 +657,202 @@ class MarkdownToPapermill:
             # Heading
             if self.HEADING_PATTERN.match(line):
                 if buffer:
-                    result.append(self._process_paragraph(" ".join(buffer)))
+                    yield ("paragraph", " ".join(buffer))
                     buffer = []
-                result.append(self._process_heading(line))
-                i += 1
+                yield ("heading", line)
+                item = yield from reader.take()
                 continue
 
             # Lists
             if self.LIST_ITEM_PATTERN.match(line):
                 if buffer:
-                    result.append(self._process_paragraph(" ".join(buffer)))
+                    yield ("paragraph", " ".join(buffer))
                     buffer = []
-                i = self._process_list(lines, i, result)
+                block, item = yield from self._scan_list(reader, item)
+                yield block
                 continue
 
             # Images
             if line.startswith("!["):
                 if buffer:
-                    result.append(self._process_paragraph(" ".join(buffer)))
+                    yield ("paragraph", " ".join(buffer))
                     buffer = []
-                image_obj, i = self._process_image(line, lines, i)
-                result.append(image_obj)
+                yield ("image", line)
+                item = yield from reader.take()
                 continue
 
             # Tables
             if line.startswith("|"):
                 if buffer:
-                    result.append(self._process_paragraph(" ".join(buffer)))
+                    yield ("paragraph", " ".join(buffer))
                     buffer = []
-                i = self._process_table(lines, i, result)
+                block, item = yield from self._scan_table(reader, item)
+                if block:
+                    yield block
                 continue
 
             # Otherwise treat as normal paragraph text
             buffer.append(line)
-            i += 1
+            item = yield from reader.take()
 
         # Any leftover text becomes a paragraph
         if buffer:
-            result.append(self._process_paragraph(" ".join(buffer)))
+            yield ("paragraph", " ".join(buffer))
 
-        return result
+    def _scan_list(self, reader: "_LineReader", item: Tuple[int, str]):
+        """
+        Collects list items starting at item. Returns the raw list block and
+        the first line that is not part of the list.
+        """
+        first_line = item[1].strip()
+        # Determine bullet vs number
+        is_numbered = bool(first_line and first_line[0].isdigit())
+        items = []
+
+        while item is not None:
+            line = item[1].strip()
+            if not line:
+                break
+            m = self.LIST_ITEM_PATTERN.match(line)
+            if m:
+                if is_numbered and m.group(1):
+                    text = line[line.find('.') + 1:].strip()
+                elif not is_numbered and m.group(2):
+                    text = line[2:].strip()
+                else:
+                    break
+                items.append(text)
+                item = yield from reader.take()
+            else:
+                break
+
+        return ("list", is_numbered, items), item
+
+    def _scan_table(self, reader: "_LineReader", item: Tuple[int, str]):
+        """
+        Collects a table starting at item, looking up to two lines above and
+        below it for a caption. Returns the raw table block (or None if a
+        caption below the first line is not followed by a table) and the next
+        line to process.
+        """
+        caption = self._caption_above(reader, item[0])
+        if caption is None:
+            caption, item = yield from self._caption_below(reader, item)
+            if caption is not None and (item is None or not item[1].strip().startswith("|")):
+                return None, item
+
+        # header line
+        header_line = item[1].strip()
+        header_cells = [c.strip() for c in header_line.split("|")[1:-1]]
+        item = yield from reader.take()
+
+        # skip separator line if present (e.g. |---|---|)
+        if item is not None and re.match(r'^\|(?:\s*[-:]+\s*\|)+', item[1].strip()):
+            item = yield from reader.take()
+
+        # table body
+        body_raw = []
+        while item is not None:
+            line = item[1].strip()
+            if not line.startswith("|"):
+                break
+            cells = [cell.strip() for cell in line.split("|")[1:-1]]
+            body_raw.append(cells)
+            item = yield from reader.take()
+
+        # trailing caption if not found previously
+        if not caption:
+            end = item[0] if item is not None else reader.count
+            caption = self._caption_above(reader, end)
+            if caption is None and item is not None:
+                caption, item = yield from self._caption_below(reader, item)
+
+        return ("table", caption, header_cells, body_raw), item
+
+    def _caption_above(self, reader: "_LineReader", start_idx: int) -> Optional[str]:
+        # check a couple lines above
+        for idx in range(max(0, start_idx - 2), start_idx):
+            line = reader.line_at(idx).strip()
+            if self._is_caption(line, self.TABLE_CAPTION_PREFIXES):
+                return self._clean_caption(line)
+        return None
+
+    def _caption_below(self, reader: "_LineReader", item: Tuple[int, str]):
+        """
+        Checks the two lines after item for a caption. If one is found, the
+        lines up to and including it are consumed and the line after it is
+        returned; otherwise item is returned and the lines read ahead are
+        replayed.
+        """
+        ahead = []
+        for _ in range(2):
+            nxt = yield from reader.take()
+            if nxt is None:
+                break
+            ahead.append(nxt)
+        for k, (idx, raw) in enumerate(ahead):
+            line = raw.strip()
+            if self._is_caption(line, self.TABLE_CAPTION_PREFIXES):
+                reader.push_back(ahead[k + 1:])
+                item = yield from reader.take()
+                return self._clean_caption(line), item
+        reader.push_back(ahead)
+        return None, item
+
+    def _is_caption(self, line: str, prefixes: List[str]) -> bool:
+        for p in prefixes:
+            if re.match(fr'^{p}\.?\s*\d+', line, re.IGNORECASE):
+                return True
+        return False
+
+    def _build_block(self, block: Tuple) -> Dict:
+        """
+        Converts a raw block from _scan_blocks into a Papermill element.
+        """
+        if self.stats is not None:
+            return self._build_block_timed(block)
+        element = self._build_element(block)
+        if self.compact:
+            element = compact_element(element, self.compact_report)
+        if self.schema_output:
+            from .validator import dump_element
+            return dump_element(element)
+        return element
+
+    def _build_block_timed(self, block: Tuple) -> Dict:
+        stats = self.stats
+        start = time.perf_counter()
+        element = self._build_element(block)
+        built = time.perf_counter()
+        stats.record_block(block[0], built - start, _raw_block_bytes(block))
+        if self.compact:
+            element = compact_element(element, self.compact_report)
+            compacted = time.perf_counter()
+            stats.record("compact", compacted - built)
+            built = compacted
+        if self.schema_output:
+            from .validator import dump_element
+            element = dump_element(element)
+            stats.record("schema_dump", time.perf_counter() - built)
+        return element
+
+    def _build_element(self, block: Tuple) -> Dict:
+        kind = block[0]
+        if kind == "paragraph":
+            return self._process_paragraph(block[1])
+        if kind == "heading":
+            return self._process_heading(block[1])
+        if kind == "list":
+            return self._process_list(block[1], block[2])
+        if kind == "image":
+            return self._process_image(block[1])
+        if kind == "table":
+            return self._process_table(block[1], block[2], block[3])
+        if kind == "equation":
+            return {"type": "equation", "equation": block[1]}
+        if kind == "code":
+            return {"type": "code", "text": block[1]}
+        return {"type": "break"}
 
     def _process_heading(self, line: str) -> Dict:
         m = self.HEADING_PATTERN.match(line)
@@ -196,12 +862,15 @@ class MarkdownToPapermill:
         level = min(len(hashes), 5)
 
         ref = None
-        # If heading ends with [ref:something], remove that and store
-        ref_m = self.REF_PATTERN.search(text)
-        if ref_m:
-            ref = ref_m.group("ref").strip()
-            # strip out the [ref:xxx ...]
-            text = self.REF_PATTERN.sub("", text).strip()
+        if self.inline_engine == "linear":
+            text, ref = self._strip_refs_linear(text)
+        else:
+            # If heading ends with [ref:something], remove that and store
+            ref_m = self.REF_PATTERN.search(text)
+            if ref_m:
+                ref = ref_m.group("ref").strip()
+                # strip out the [ref:xxx ...]
+                text = self.REF_PATTERN.sub("", text).strip()
 
         heading_obj = {
             "type": "heading",
@@ -213,63 +882,90 @@ class MarkdownToPapermill:
             heading_obj["ref"] = ref
         return heading_obj
 
-    def _process_list(self, lines: List[str], start_idx: int, result: List) -> int:
-        items = []
-        i = start_idx
-        first_line = lines[i].strip()
-        # Determine bullet vs number
-        is_numbered = bool(first_line and first_line[0].isdigit())
-
-        while i < len(lines):
-            line = lines[i].strip()
-            if not line:
-                break
-            m = self.LIST_ITEM_PATTERN.match(line)
-            if m:
-                if is_numbered and m.group(1):
-                    text = line[line.find('.') + 1:].strip()
-                elif not is_numbered and m.group(2):
-                    text = line[2:].strip()
-                else:
-                    break
-                tokens = self._process_inline_math_and_formatting(text)
-                items.append(tokens if isinstance(tokens, list) else [tokens])
-                i += 1
-            else:
+    def _strip_refs_linear(self, text: str) -> Tuple[str, Optional[str]]:
+        """
+        REF_PATTERN.search and REF_PATTERN.sub("") for the linear engine:
+        returns the text without its references (stripped if there were any)
+        and the id of the first one. Each "[ref:" is decided with the
+        delimiter index instead of a rescan of the rest of the heading.
+        """
+        index = _DelimiterIndex(text)
+        pieces = []
+        ref = None
+        pos = last = 0
+        while True:
+            start = text.find('[ref:', pos)
+            if start < 0:
                 break
+            end = self._linear_ref_end(text, start, index)
+            if end < 0:
+                pos = start + 1
+                continue
+            if ref is None:
+                ref = text[start + 5:index.next(self.DELIMITER_PATTERNS['ref_end'], start + 5)]
+            pieces.append(text[last:start])
+            pos = last = end
+        if ref is None:
+            return text, None
+        pieces.append(text[last:])
+        return "".join(pieces).strip(), ref
+
+    def _process_list(self, is_numbered: bool, item_texts: List[str]) -> Dict:
+        items = []
+        for text in item_texts:
+            tokens = self._process_inline_math_and_formatting(text)
+            items.append(tokens if isinstance(tokens, list) else [tokens])
 
-        result.append({
+        return {
             "type": "list",
             "style": "number" if is_numbered else "bullet",
             "items": items
-        })
-        return i
+        }
 
-    def _process_image(self, line: str, lines: List[str], idx: int) -> Tuple[Dict, int]:
-        alt_m = re.search(r'!\[(.*?)\]', line)
-        url_m = re.search(r'\((.*?)\)', line)
+    def _process_image(self, line: str) -> Dict:
         image_obj = {"type": "image"}
-        if not alt_m or not url_m:
-            return image_obj, idx + 1
-
-        alt_text = alt_m.group(1).strip()
-        url_title = url_m.group(1).strip()
-
-        title_m = re.search(r'^(.*?)\s+"(.*?)"$', url_title)
-        if title_m:
-            image_url = title_m.group(1).strip()
-            title_str = title_m.group(2).strip()
+        if self.inline_engine == "linear":
+            parts = self._split_image_line_linear(line)
+            if parts is None:
+                return image_obj
+            alt_text, url_title = parts
+            image_url, title_str = self._split_image_title_linear(url_title)
         else:
-            image_url = url_title
-            title_str = None
-
-        image_obj["url"] = self._handle_image_url(image_url)
+            alt_m = re.search(r'!\[(.*?)\]', line)
+            url_m = re.search(r'\((.*?)\)', line)
+            if not alt_m or not url_m:
+                return image_obj
+
+            alt_text = alt_m.group(1).strip()
+            url_title = url_m.group(1).strip()
+
+            title_m = re.search(r'^(.*?)\s+"(.*?)"$', url_title)
+            if title_m:
+                image_url = title_m.group(1).strip()
+                title_str = title_m.group(2).strip()
+            else:
+                image_url = url_title
+                title_str = None
+
+        # parse comma-delimited attributes: e.g. caption=..., ref=..., width=...
+        attrs = [a.strip() for a in title_str.split(',')] if title_str else []
+
+        # The requested width lets an image optimizer size the image to fit.
+        width = None
+        for attr in attrs:
+            if '=' in attr:
+                k, v = [s.strip() for s in attr.split('=', 1)]
+                if k == 'width':
+                    width = v
+            elif attr == "fullWidth" and width is None:
+                width = "100"
+
+        image_obj["url"] = self._handle_image_url(image_url, width)
         if alt_text:
             image_obj["caption"] = alt_text
 
-        if title_str:
-            # parse comma-delimited attributes: e.g. caption=..., ref=..., width=...
-            for attr in [a.strip() for a in title_str.split(',')]:
+        if attrs:
+            for attr in attrs:
                 if '=' in attr:
                     k, v = [s.strip() for s in attr.split('=', 1)]
                     if k == 'caption':
@@ -281,31 +977,94 @@ class MarkdownToPapermill:
                 elif attr == "fullWidth":
                     image_obj["fullWidth"] = True
 
-        return image_obj, idx + 1
+        return image_obj
 
-    def _handle_image_url(self, url: str) -> str:
+    def _split_image_line_linear(self, line: str) -> Optional[Tuple[str, str]]:
+        """
+        The stripped alt text and "url title" that the lazy searches in
+        _process_image find, or None, located with str.find so that a line of
+        unclosed "![" or "(" is not rescanned from each of them. If the first
+        "![" (or "(") is not closed, no later one is either.
+        """
+        alt_start = line.find('![')
+        alt_end = line.find(']', alt_start + 2) if alt_start >= 0 else -1
+        url_start = line.find('(')
+        url_end = line.find(')', url_start + 1) if url_start >= 0 else -1
+        if alt_end < 0 or url_end < 0:
+            return None
+        return line[alt_start + 2:alt_end].strip(), line[url_start + 1:url_end].strip()
+
+    def _split_image_title_linear(self, url_title: str) -> Tuple[str, Optional[str]]:
+        """
+        ^(.*?)\\s+"(.*?)"$ without backtracking: the title runs from the first
+        quote that follows whitespace, other than the closing one, to the
+        closing quote at the end.
+        """
+        if url_title.endswith('"'):
+            quote = url_title.find('"')
+            while 0 <= quote < len(url_title) - 1:
+                if quote > 0 and url_title[quote - 1].isspace():
+                    return url_title[:quote].strip(), url_title[quote + 1:-1].strip()
+                quote = url_title.find('"', quote + 1)
+        return url_title, None
+
+    def _handle_image_url(self, url: str, width: Optional[str] = None) -> Union[str, ImageReference, Future]:
         if url.startswith("http") or url.startswith("data:image/"):
             return url
 
-        local = unquote(url)
+        name = unquote(url)
+        if not self.local_images:
+            raise PermissionError(f"Image '{name}' is a local file and local images are disabled")
+        local = name if self.image_root is None else self._resolve_in_image_root(name)
         if os.path.exists(local) and os.path.isfile(local):
-            ext = os.path.splitext(local.lower())[1]
-            mime_types = {
-                ".png": "image/png",
-                ".jpg": "image/jpeg",
-                ".jpeg": "image/jpeg",
-                ".gif": "image/gif",
-                ".bmp": "image/bmp",
-                ".webp": "image/webp"
-            }
-            mime = mime_types.get(ext, "image/png")
-
-            with open(local, "rb") as f:
-                data = f.read()
-            b64 = base64.b64encode(data).decode("utf-8")
-            return f"data:{mime};base64,{b64}"
-
-        raise FileNotFoundError(f"Image file '{local}' not found")
+            if self._image_dedup is not None:
+                return self._image_dedup.get(
+                    local, lambda path: self._local_image_value(path, width), self._image_variant(width)
+                )
+            return self._local_image_value(local, width)
+
+        raise FileNotFoundError(f"Image file '{name}' not found")
+
+    def _resolve_in_image_root(self, local: str) -> str:
+        root = os.path.realpath(self.image_root)
+        path = os.path.realpath(os.path.join(root, local))
+        try:
+            inside = os.path.commonpath([root, path]) == root
+        except ValueError:  # different drives
+            inside = False
+        if not inside:
+            raise PermissionError(f"Image '{local}' is outside the image root")
+        return path
+
+    def _local_image_value(self, local: str, width: Optional[str] = None) -> Union[str, ImageReference, Future]:
+        if self.lazy_images:
+            return ImageReference(local)
+        if self._image_pool is not None:
+            return self._image_pool.submit(self._encode_local_image, local, width)
+        return self._encode_local_image(local, width)
+
+    def _encode_local_image(self, local: str, width: Optional[str] = None) -> str:
+        if self.stats is None:
+            return self._encode_local_image_untimed(local, width)
+        start = time.perf_counter()
+        uri = self._encode_local_image_untimed(local, width)
+        self.stats.record("image_encode", time.perf_counter() - start, len(uri))
+        return uri
+
+    def _encode_local_image_untimed(self, local: str, width: Optional[str] = None) -> str:
+        if self.image_optimizer is not None:
+            encode = partial(self.image_optimizer.encode, width=width)
+        else:
+            encode = encode_image_file
+        if self.image_cache is not None:
+            return self.image_cache.data_uri(local, self._image_variant(width), encode)
+        return encode(local)
+
+    def _image_variant(self, width: Optional[str]) -> str:
+        # Distinguishes encodings of the same source in caches and deduplication.
+        if self.image_optimizer is None or self.lazy_images:
+            return ""
+        return self.image_optimizer.variant(width)
 
     def _maybe_listify(self, item: Union[str, Dict, List]) -> Union[str, Dict, List]:
         if isinstance(item, list):
@@ -314,34 +1073,7 @@ class MarkdownToPapermill:
             return item
         return item
 
-    def _process_table(self, lines: List[str], start_idx: int, result: List) -> int:
-        caption, i = self._find_caption(lines, start_idx, ["Table", "Tab", "TABLE", "TAB"])
-        if i >= len(lines) or not lines[i].strip().startswith("|"):
-            return i
-
-        # header line
-        header_line = lines[i].strip()
-        header_cells = [c.strip() for c in header_line.split("|")[1:-1]]
-        i += 1
-
-        # skip separator line if present (e.g. |---|---|)
-        if i < len(lines) and re.match(r'^\|(?:\s*[-:]+\s*\|)+', lines[i].strip()):
-            i += 1
-
-        # table body
-        body_raw = []
-        while i < len(lines):
-            line = lines[i].strip()
-            if not line.startswith("|"):
-                break
-            cells = [cell.strip() for cell in line.split("|")[1:-1]]
-            body_raw.append(cells)
-            i += 1
-
-        # trailing caption if not found previously
-        if not caption:
-            caption, i = self._find_caption(lines, i, ["Table", "Tab", "TABLE", "TAB"])
-
+    def _process_table(self, caption: Optional[str], header_cells: List[str], body_raw: List[List[str]]) -> Dict:
         # convert all cells
         header_processed = [
             self._maybe_listify(self._process_inline_math_and_formatting(h))
@@ -355,29 +1087,12 @@ class MarkdownToPapermill:
                 processed_row.append(self._maybe_listify(cell_content))
             body_processed.append(processed_row)
 
-        table_obj = {
+        return {
             "type": "table",
             "header": header_processed,
             "body": body_processed,
             "caption": caption or ""
         }
-        result.append(table_obj)
-        return i
-
-    def _find_caption(self, lines: List[str], start_idx: int, prefixes: List[str]) -> Tuple[Optional[str], int]:
-        # check a couple lines above
-        for idx in range(max(0, start_idx - 2), start_idx):
-            l = lines[idx].strip()
-            for p in prefixes:
-                if re.match(fr'^{p}\.?\s*\d+', l, re.IGNORECASE):
-                    return self._clean_caption(l), start_idx
-        # check a couple lines below
-        for idx in range(start_idx + 1, min(len(lines), start_idx + 3)):
-            l = lines[idx].strip()
-            for p in prefixes:
-                if re.match(fr'^{p}\.?\s*\d+', l, re.IGNORECASE):
-                    return self._clean_caption(l), idx + 1
-        return None, start_idx
 
     def _clean_caption(self, text: str) -> str:
         m = re.match(
@@ -408,7 +1123,10 @@ class MarkdownToPapermill:
             if "__" in part:
                 # part looks like "12__ some text here"
                 fid, rem = part.split("__", 1)
-                content.append({"type": "footnote", "text": self.footnotes.get(fid, "")})
+                if self.token_objects:
+                    content.append(inline_tokens.Footnote(self.footnotes.get(fid, "")))
+                else:
+                    content.append({"type": "footnote", "text": self.footnotes.get(fid, "")})
                 if rem:
                     tokens = self._process_inline_math_and_formatting(rem.strip())
                     if isinstance(tokens, list):
@@ -429,13 +1147,28 @@ class MarkdownToPapermill:
         Finds inline math ($...$), splits them out, and processes
         each non‐math segment for additional formatting.
         """
+        if self.stats is None:
+            return self._inline_math_and_formatting(text)
+        start = time.perf_counter()
+        tokens = self._inline_math_and_formatting(text)
+        self.stats.record("inline", time.perf_counter() - start, text_bytes(text))
+        return tokens
+
+    def _inline_math_and_formatting(self, text: str) -> Union[str, List]:
         segments = []
         last = 0
-        for m in self.INLINE_MATH_PATTERN.finditer(text):
+        if self.inline_engine == "linear":
+            math_matches = self._iter_inline_math_linear(text)
+        else:
+            math_matches = self.INLINE_MATH_PATTERN.finditer(text)
+        for m in math_matches:
             if m.start() > last:
                 segments.append(self._process_inline_formatting(text[last:m.start()]))
             # This is an equation
-            segments.append({"type": "equation", "equation": m.group(1).strip()})
+            if self.token_objects:
+                segments.append(inline_tokens.Equation(m.group(1).strip()))
+            else:
+                segments.append({"type": "equation", "equation": m.group(1).strip()})
             last = m.end()
         if last < len(text):
             segments.append(self._process_inline_formatting(text[last:]))
@@ -456,9 +1189,300 @@ class MarkdownToPapermill:
 
     def _process_inline_formatting(self, text: str) -> Union[str, List]:
         """
-        Recursively processes all inline formatting
-        (bold, italic, underline, etc.), as well as
-        [ref: ...] patterns for references or crossReferences.
+        Processes all inline formatting (bold, italic, underline, etc.), as well
+        as [ref: ...] patterns, using the engine selected at construction.
+        """
+        if self.inline_engine == "legacy":
+            return self._process_inline_formatting_legacy(text)
+        if self.inline_engine == "linear":
+            return self._process_inline_formatting_linear(text)
+        return self._process_inline_formatting_scanner(text)
+
+    def _process_inline_formatting_scanner(self, text: str) -> Union[str, List]:
+        """
+        Tokenizes the text in a single pass with INLINE_SCANNER_PATTERN.
+        Text between matches is emitted as plain strings, so the text is no
+        longer rescanned by every pattern after each token. The lazy patterns
+        still look ahead to the end of the text from every unmatched opening
+        delimiter, so input such as thousands of unclosed "[" or "<sup>" is
+        quadratic; the linear engine bounds that case.
+        """
+        tokens = []
+        pos = 0
+        for m in self.INLINE_SCANNER_PATTERN.finditer(text):
+            if m.start() > pos:
+                tokens.append(text[pos:m.start()])
+            kind = m.lastgroup
+            if kind == "math":
+                pattern = self.INLINE_MATH_PATTERN
+            elif kind == "reference":
+                pattern = self.REF_PATTERN
+            else:
+                pattern = self.INLINE_FORMATTING_PATTERNS[kind]
+            # Re-match the originating pattern to get its own groups.
+            self._append_match_tokens(tokens, kind, pattern.match(text, m.start()))
+            pos = m.end()
+        if pos < len(text):
+            tokens.append(text[pos:])
+
+        # Remove empty strings
+        tokens = [t for t in tokens if t != ""]
+        if len(tokens) == 1:
+            return tokens[0]
+        return tokens
+
+    def _process_inline_formatting_linear(self, text: str) -> Union[str, List]:
+        """
+        Produces the same tokens as the scanner engine with a bounded worst case.
+
+        The lazy patterns (e.g. italic, ~, ^, <sup>, hyperlinks) rescan to the
+        end of the text from every unmatched opening delimiter, which is
+        quadratic on input such as thousands of unclosed "[" or "<sup>". Here
+        each candidate opening is decided with a bisect over the delimiter
+        offsets in a _DelimiterIndex, and the regex is only run once the match
+        is known to succeed. Every call is O(n log n) in the length of the
+        text, and nesting depth is bounded by the number of formatting kinds,
+        since no kind can match inside itself.
+        """
+        index = _DelimiterIndex(text)
+        tokens = []
+        pos = 0
+        last = 0
+        while True:
+            trigger = self.INLINE_TRIGGER_PATTERN.search(text, pos)
+            if not trigger:
+                break
+            start = trigger.start()
+            kind = self._linear_match_kind(text, start, index)
+            if kind is None:
+                pos = start + 1
+                continue
+            if kind == "math":
+                pattern = self.INLINE_MATH_PATTERN
+            elif kind == "reference":
+                pattern = self.REF_PATTERN
+            else:
+                pattern = self.INLINE_FORMATTING_PATTERNS[kind]
+            m = pattern.match(text, start)
+            if start > last:
+                tokens.append(text[last:start])
+            self._append_match_tokens(tokens, kind, m)
+            pos = last = m.end()
+        if last < len(text):
+            tokens.append(text[last:])
+
+        # Remove empty strings
+        tokens = [t for t in tokens if t != ""]
+        if len(tokens) == 1:
+            return tokens[0]
+        return tokens
+
+    def _iter_inline_math_linear(self, text: str):
+        """
+        Yields the same matches as INLINE_MATH_PATTERN.finditer(text), deciding
+        each "$" with the delimiter index instead of a rescan.
+        """
+        index = _DelimiterIndex(text)
+        pos = 0
+        while True:
+            start = index.next(self.DELIMITER_PATTERNS['dollar'], pos)
+            if start < 0:
+                return
+            if self._linear_closes(index, 'dollar', start + 2, start + 1) >= 0:
+                m = self.INLINE_MATH_PATTERN.match(text, start)
+                yield m
+                pos = m.end()
+            else:
+                pos = start + 1
+
+    def _linear_closes(self, index: _DelimiterIndex, delimiter: str, pos: int, inner_start: int) -> int:
+        """
+        Returns the offset of the first closing delimiter at or after pos when
+        no newline lies between inner_start and it (the patterns use "."), or -1.
+        """
+        end = index.next(self.DELIMITER_PATTERNS[delimiter], pos)
+        if end < 0:
+            return -1
+        newline = index.next(self.DELIMITER_PATTERNS['newline'], inner_start)
+        if 0 <= newline < end:
+            return -1
+        return end
+
+    def _linear_match_kind(self, text: str, i: int, index: _DelimiterIndex) -> Optional[str]:
+        """
+        Returns the kind of the first pattern, in scanner priority order, that
+        matches at offset i, or None.
+        """
+        c = text[i]
+        if c == '$':
+            return "math" if self._linear_closes(index, 'dollar', i + 2, i + 1) >= 0 else None
+
+        if c == '[':
+            if text.startswith('ref:', i + 1):
+                return "reference" if self._linear_ref_matches(text, i, index) else None
+            if text.startswith('^', i + 1):
+                return None
+            middle = self._linear_closes(index, 'link_middle', i + 2, i + 1)
+            if middle >= 0 and self._linear_closes(index, 'close_paren', middle + 3, middle + 2) >= 0:
+                return "hyperlink"
+            return None
+
+        if c == '*':
+            if text.startswith('***', i) and self._linear_closes(index, 'triple_star', i + 4, i + 3) >= 0:
+                return "bold_italic"
+            if text.startswith('**', i) and self._linear_closes(index, 'double_star', i + 3, i + 2) >= 0:
+                return "bold"
+            isolated = (i == 0 or text[i - 1] != '*') and i + 1 < len(text) and text[i + 1] != '*'
+            if isolated and self._linear_closes(index, 'single_star', i + 2, i + 1) >= 0:
+                return "italic"
+            return None
+
+        if c == '_':
+            if text.startswith('__', i) and self._linear_closes(index, 'double_underscore', i + 3, i + 2) >= 0:
+                return "underline"
+            return None
+
+        if c == '^':
+            return "superscript_md" if self._linear_closes(index, 'caret', i + 2, i + 1) >= 0 else None
+
+        if c == '<':
+            if text.startswith('<sup>', i) and self._linear_closes(index, 'sup_close', i + 6, i + 5) >= 0:
+                return "superscript_html"
+            if text.startswith('<sub>', i) and self._linear_closes(index, 'sub_close', i + 6, i + 5) >= 0:
+                return "subscript_html"
+            return None
+
+        if c == '~':
+            return "subscript_md" if self._linear_closes(index, 'tilde', i + 2, i + 1) >= 0 else None
+
+        return None
+
+    def _linear_ref_matches(self, text: str, i: int, index: _DelimiterIndex) -> bool:
+        return self._linear_ref_end(text, i, index) >= 0
+
+    def _linear_ref_end(self, text: str, i: int, index: _DelimiterIndex) -> int:
+        """
+        Decides REF_PATTERN at offset i (known to start with "[ref:") without
+        backtracking, returning the end of the match or -1: the id runs to the
+        first "]" or whitespace, optionally followed by whitespace, "label="
+        and a label running to the next "]".
+        """
+        id_start = i + 5
+        id_end = index.next(self.DELIMITER_PATTERNS['ref_end'], id_start)
+        if id_end <= id_start:
+            return -1
+        if text[id_end] == ']':
+            return id_end + 1
+        label_key = index.next(self.DELIMITER_PATTERNS['non_space'], id_end)
+        if label_key < 0 or not text.startswith('label=', label_key):
+            return -1
+        label_start = label_key + 6
+        label_end = index.next(self.DELIMITER_PATTERNS['close_bracket'], label_start)
+        return label_end + 1 if label_end > label_start else -1
+
+    def _append_match_tokens(self, tokens: List, kind: str, m: re.Match) -> None:
+        """
+        Appends the tokens for a single inline match of the given kind
+        ("math", "reference" or a key of INLINE_FORMATTING_PATTERNS).
+        """
+        if self.token_objects:
+            self._append_match_token_objects(tokens, kind, m)
+            return
+
+        if kind == "math":
+            tokens.append({"type": "equation", "equation": m.group(1).strip()})
+            return
+
+        if kind == "reference":
+            ref_id = m.group("ref")
+            label = m.group("label")
+            if label:
+                # Cross reference
+                tokens.append({
+                    "type": "crossReference",
+                    "ref": ref_id,
+                    "label": label
+                })
+            else:
+                # In-line reference to a bibliography entry
+                tokens.append({
+                    "type": "reference",
+                    "ref": ref_id
+                })
+            return
+
+        if kind == "hyperlink":
+            # group(1) is link text, group(2) is url
+            # We'll store as FormattedText with a url
+            tokens.append({
+                "text": m.group(1),
+                "url": m.group(2)
+            })
+            return
+
+        inner_tokens = self._process_inline_formatting(m.group(1))
+        flag = {}
+        if kind == "bold_italic":
+            flag["bold"] = True
+            flag["italic"] = True
+        elif kind == "bold":
+            flag["bold"] = True
+        elif kind == "italic":
+            flag["italic"] = True
+        elif kind == "underline":
+            flag["underline"] = True
+        elif kind in ["superscript_md", "superscript_html"]:
+            flag["superscript"] = True
+        elif kind in ["subscript_md", "subscript_html"]:
+            flag["subscript"] = True
+
+        # Merge the flags with the inner tokens
+        if isinstance(inner_tokens, list):
+            for token in inner_tokens:
+                if isinstance(token, dict):
+                    merged = dict(flag)
+                    merged.update(token)
+                    tokens.append(merged)
+                else:
+                    tokens.append({**flag, "text": token})
+        else:
+            if isinstance(inner_tokens, dict):
+                merged = dict(flag)
+                merged.update(inner_tokens)
+                tokens.append(merged)
+            else:
+                tokens.append({**flag, "text": inner_tokens})
+
+    def _append_match_token_objects(self, tokens: List, kind: str, m: re.Match) -> None:
+        """
+        _append_match_tokens for token_objects mode.
+        """
+        if kind == "math":
+            tokens.append(inline_tokens.Equation(m.group(1).strip()))
+        elif kind == "reference":
+            label = m.group("label")
+            if label:
+                tokens.append(inline_tokens.CrossReference(m.group("ref"), label))
+            else:
+                tokens.append(inline_tokens.Reference(m.group("ref")))
+        elif kind == "hyperlink":
+            tokens.append(inline_tokens.Text(m.group(1), url=m.group(2)))
+        else:
+            flag = self.TOKEN_FLAGS[kind]
+            inner_tokens = self._process_inline_formatting(m.group(1))
+            if not isinstance(inner_tokens, list):
+                inner_tokens = [inner_tokens]
+            for token in inner_tokens:
+                if isinstance(token, inline_tokens.InlineToken):
+                    tokens.append(token.with_flags(flag))
+                else:
+                    tokens.append(inline_tokens.Text(token, flag))
+
+    def _process_inline_formatting_legacy(self, text: str) -> Union[str, List]:
+        """
+        Original engine: at every position tries each pattern in turn and,
+        for plain text, searches ahead with every pattern to find the next
+        boundary. Kept for comparison with the scanner engine.
         """
         tokens = []
         pos = 0
@@ -466,28 +1490,14 @@ class MarkdownToPapermill:
             # 1) Check for inline math at current position
             math_match = self.INLINE_MATH_PATTERN.match(text, pos)
             if math_match:
-                tokens.append({"type": "equation", "equation": math_match.group(1).strip()})
+                self._append_match_tokens(tokens, "math", math_match)
                 pos = math_match.end()
                 continue
 
             # 2) Check for [ref: ...] at current position
             ref_match = self.REF_PATTERN.match(text, pos)
             if ref_match:
-                ref_id = ref_match.group("ref")
-                label = ref_match.group("label")
-                if label:
-                    # Cross reference
-                    tokens.append({
-                        "type": "crossReference",
-                        "ref": ref_id,
-                        "label": label
-                    })
-                else:
-                    # In-line reference to a bibliography entry
-                    tokens.append({
-                        "type": "reference",
-                        "ref": ref_id
-                    })
+                self._append_match_tokens(tokens, "reference", ref_match)
                 pos = ref_match.end()
                 continue
 
@@ -496,56 +1506,10 @@ class MarkdownToPapermill:
             for fmt, pattern in self.INLINE_FORMATTING_PATTERNS.items():
                 m = pattern.match(text, pos)
                 if m:
-                    inner_text = m.group(1)
-                    inner_tokens = self._process_inline_formatting(inner_text)
-                    flag = {}
-                    if fmt == "bold_italic":
-                        flag["bold"] = True
-                        flag["italic"] = True
-                    elif fmt == "bold":
-                        flag["bold"] = True
-                    elif fmt == "italic":
-                        flag["italic"] = True
-                    elif fmt == "underline":
-                        flag["underline"] = True
-                    elif fmt in ["superscript_md", "superscript_html"]:
-                        flag["superscript"] = True
-                    elif fmt in ["subscript_md", "subscript_html"]:
-                        flag["subscript"] = True
-                    elif fmt == "hyperlink":
-                        # group(1) is link text, group(2) is url
-                        # We'll store as FormattedText with a url
-                        link_text = inner_text
-                        link_url = m.group(2)
-                        tokens.append({
-                            "text": link_text,
-                            "url": link_url
-                        })
-                        pos = m.end()
-                        match_found = True
-                        break
-
-                    # If not a hyperlink, we merge the flags with the inner tokens
-                    if fmt != "hyperlink":
-                        if isinstance(inner_tokens, list):
-                            for token in inner_tokens:
-                                if isinstance(token, dict):
-                                    merged = dict(flag)
-                                    merged.update(token)
-                                    tokens.append(merged)
-                                else:
-                                    tokens.append({**flag, "text": token})
-                        else:
-                            if isinstance(inner_tokens, dict):
-                                merged = dict(flag)
-                                merged.update(inner_tokens)
-                                tokens.append(merged)
-                            else:
-                                tokens.append({**flag, "text": inner_tokens})
-
-                        pos = m.end()
-                        match_found = True
-                        break
+                    self._append_match_tokens(tokens, fmt, m)
+                    pos = m.end()
+                    match_found = True
+                    break
 
             if match_found:
                 continue
@@ -0,0 +1,440 @@
+# src/papermill_markdown/images.py
+
+"""
+Encoding of local images into base64 data: URIs for the Papermill payload,
+with an optional cache so images reused across documents (logos, diagrams,
+charts) are read and encoded once.
+"""
+
+import base64
+import hashlib
+import io
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional, TextIO
+
+MIME_TYPES = {
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".gif": "image/gif",
+    ".bmp": "image/bmp",
+    ".webp": "image/webp"
+}
+
+
+def image_mime_type(path: str) -> str:
+    ext = os.path.splitext(path.lower())[1]
+    return MIME_TYPES.get(ext, "image/png")
+
+
+def encode_image_file(path: str, data: Optional[bytes] = None) -> str:
+    """
+    Returns the data: URI for a local image. data may be passed if the file
+    has already been read.
+    """
+    if data is None:
+        with open(path, "rb") as f:
+            data = f.read()
+    b64 = base64.b64encode(data).decode("utf-8")
+    return f"data:{image_mime_type(path)};base64,{b64}"
+
+
+class ImageReference:
+    """
+    Stands in for the data: URI of a local image until the document is
+    serialised, so the encoded image is never held in memory. writer.write_json
+    streams it into the output; data_uri() materializes it when a string is
+    needed.
+    """
+    # A multiple of 3 bytes, so each chunk encodes without padding.
+    CHUNK_SIZE = 3 * 64 * 1024
+
+    def __init__(self, path: str):
+        self.path = path
+        self.mime = image_mime_type(path)
+
+    def data_uri(self) -> str:
+        return encode_image_file(self.path)
+
+    def write_data_uri(self, fp: TextIO, chunk_size: int = CHUNK_SIZE) -> int:
+        """
+        Writes the data: URI to fp, base64-encoding the file chunk by chunk.
+        Returns the number of characters written.
+        """
+        if chunk_size % 3:
+            raise ValueError("chunk_size must be a multiple of 3")
+        prefix = f"data:{self.mime};base64,"
+        fp.write(prefix)
+        written = len(prefix)
+        with open(self.path, "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                encoded = base64.b64encode(chunk).decode("ascii")
+                fp.write(encoded)
+                written += len(encoded)
+        return written
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, ImageReference) and other.path == self.path
+
+    def __hash__(self) -> int:
+        return hash(self.path)
+
+    def __repr__(self) -> str:
+        return f"ImageReference({self.path!r})"
+
+
+class ImageDeduplicator:
+    """
+    Shares one encoded value (data: URI, pending future or ImageReference)
+    between all occurrences of the same image within one conversion, so a
+    repeated logo or icon is read and encoded once and held in memory once.
+
+    Images are matched by resolved path (mode="path") or by a SHA-256 of
+    their content (mode="content", which reads every image once to hash it).
+    The Papermill schema has no way to reference an image twice, so the
+    serialised payload still repeats the URI. report() gives the number of
+    bytes of encoding work and memory saved.
+
+    With max_bytes, the encoded URIs kept for sharing are bounded by their
+    total size and the least recently used are forgotten first, so a stream
+    of distinct images does not accumulate in memory. A forgotten image that
+    occurs again is encoded again.
+    """
+    MODES = ("path", "content")
+
+    def __init__(self, mode: str = "path", max_bytes: Optional[int] = None):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown dedupe mode '{mode}', expected one of {self.MODES}")
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.images = 0
+        self.bytes = 0
+        self._entries = OrderedDict()  # key -> [value, path, occurrences, bytes held]
+        self._evicted_unique = 0
+        self._evicted_saved = 0
+        self._lock = threading.Lock()
+
+    def get(self, path: str, create: Callable[[str], object], variant: str = "") -> object:
+        """
+        Returns the value for the image at path, calling create(path) only
+        for the first occurrence of the image. variant distinguishes
+        different encodings of the same source.
+        """
+        key = f"{self._key(path)}:{variant}"
+        with self._lock:
+            self.images += 1
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry[2] += 1
+                self._entries.move_to_end(key)
+                return entry[0]
+        value = create(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                size = len(value) if isinstance(value, str) else 0
+                entry = self._entries[key] = [value, path, 0, size]
+                self.bytes += size
+                self._evict()
+            entry[2] += 1
+            return entry[0]
+
+    def report(self) -> Dict[str, int]:
+        with self._lock:
+            entries = list(self._entries.values())
+            unique = len(entries) + self._evicted_unique
+            saved = self._evicted_saved
+        saved += sum((count - 1) * _encoded_length(value, path) for value, path, count, _ in entries)
+        return {
+            "images": self.images,
+            "unique": unique,
+            "duplicates": self.images - unique,
+            "bytes_saved": saved,
+        }
+
+    def _evict(self) -> None:
+        # The newest entry is kept even if it alone exceeds max_bytes.
+        while self.max_bytes is not None and self.bytes > self.max_bytes and len(self._entries) > 1:
+            _, (value, path, count, size) = self._entries.popitem(last=False)
+            self.bytes -= size
+            self._evicted_unique += 1
+            self._evicted_saved += (count - 1) * _encoded_length(value, path)
+
+    def _key(self, path: str) -> str:
+        if self.mode == "path":
+            return os.path.realpath(path)
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(ImageReference.CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return f"{digest.hexdigest()}:{image_mime_type(path)}"
+
+
+class ImageOptimizer:
+    """
+    Downscales and recompresses local images before they are embedded, so
+    phone photos and high-DPI scans do not inflate the payload. Requires
+    Pillow (pip install "papermill-markdown[images]").
+
+    max_size: longest side, in pixels, of any embedded image.
+    content_width: pixels across the full content width. An image with a
+        width attribute (a percentage of the content width, e.g. width=40)
+        is limited to that share of it.
+    quality: JPEG/WebP quality used when recompressing.
+    format: "JPEG", "PNG" or "WEBP" to convert to, or None to keep the
+        source format. Images with transparency, bilevel and palette images
+        are not converted to JPEG, and every image is converted to a mode
+        the output format can store (e.g. CMYK to RGB for PNG).
+
+    Images are turned upright according to their EXIF orientation, which
+    is otherwise lost on saving. Animated images are left untouched, and the
+    source bytes (with their EXIF) are kept whenever recompression does not
+    make them smaller. Use with an
+    ImageCache (ideally key="content") to optimise each source once.
+    """
+    FORMAT_MIME_TYPES = {
+        "JPEG": "image/jpeg",
+        "PNG": "image/png",
+        "WEBP": "image/webp",
+        "GIF": "image/gif",
+        "BMP": "image/bmp",
+    }
+    WIDTH_PATTERN = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*%?\s*$')
+    LOSSLESS_MODES = ("1", "P")
+    PNG_MODES = ("1", "L", "LA", "P", "RGB", "RGBA", "I", "I;16")
+
+    def __init__(self, max_size: int = 2000, content_width: int = 2000, quality: int = 85,
+                 format: Optional[str] = None):
+        try:
+            import PIL  # noqa: F401
+        except ImportError:
+            raise ImportError(
+                'ImageOptimizer requires Pillow: pip install "papermill-markdown[images]"'
+            ) from None
+        if format is not None and format.upper() not in ("JPEG", "PNG", "WEBP"):
+            raise ValueError(f"Unsupported output format '{format}'")
+        self.max_size = max_size
+        self.content_width = content_width
+        self.quality = quality
+        self.format = format.upper() if format else None
+
+    def max_width(self, width: Optional[str]) -> int:
+        """
+        Returns the largest width in pixels for an image with the given
+        width attribute.
+        """
+        m = self.WIDTH_PATTERN.match(width) if width else None
+        if not m:
+            return self.max_size
+        share = min(float(m.group(1)), 100.0) / 100.0
+        return max(1, min(self.max_size, math.ceil(self.content_width * share)))
+
+    def variant(self, width: Optional[str]) -> str:
+        return f"optimized:{self.max_width(width)}x{self.max_size}:q{self.quality}:{self.format}"
+
+    def encode(self, path: str, data: Optional[bytes] = None, width: Optional[str] = None) -> str:
+        """
+        Returns the data: URI of the optimised image, with the same signature
+        as encode_image_file plus the image's width attribute.
+        """
+        from PIL import Image, ImageOps
+
+        if data is None:
+            with open(path, "rb") as f:
+                data = f.read()
+
+        with Image.open(io.BytesIO(data)) as img:
+            # Phone cameras save JPEGs with extra frames (depth maps,
+            # previews) that Pillow opens as MPO; the first frame is the photo.
+            source_format = "JPEG" if img.format == "MPO" else img.format
+            if source_format != "JPEG" and getattr(img, "is_animated", False):
+                return encode_image_file(path, data)
+            has_alpha = img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info
+            fmt = self._output_format(source_format, img.mode, has_alpha)
+
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((self.max_width(width), self.max_size))
+            options = {"optimize": True}
+            if fmt in ("JPEG", "WEBP"):
+                options["quality"] = self.quality
+            buf = io.BytesIO()
+            try:
+                self._output_image(img, fmt, has_alpha).save(buf, format=fmt, **options)
+            except (OSError, ValueError):
+                # A mode Pillow cannot convert or write; embed the source.
+                return encode_image_file(path, data)
+            out = buf.getvalue()
+
+        if len(out) >= len(data):
+            return encode_image_file(path, data)
+        b64 = base64.b64encode(out).decode("utf-8")
+        return f"data:{self.FORMAT_MIME_TYPES[fmt]};base64,{b64}"
+
+    def _output_format(self, source_format: Optional[str], mode: str, has_alpha: bool) -> str:
+        fmt = self.format or source_format or "PNG"
+        if fmt not in self.FORMAT_MIME_TYPES:
+            fmt = "PNG"
+        # JPEG suits photographs. Transparent, bilevel and palette images
+        # (diagrams, scans, icons) keep their lossless source format, which
+        # is usually far smaller than the JPEG of the same pixels.
+        if fmt == "JPEG" and (has_alpha or mode in self.LOSSLESS_MODES):
+            fmt = source_format if source_format in self.FORMAT_MIME_TYPES else "PNG"
+        return fmt
+
+    def _output_image(self, img, fmt: str, has_alpha: bool):
+        """
+        Converts img to a mode the output format can write: RGB or L for
+        JPEG, RGB or RGBA for WebP, and for PNG any mode it stores natively
+        (so bilevel, grey and palette images stay compact), else RGB or RGBA.
+        """
+        if fmt == "JPEG":
+            modes = ("RGB", "L")
+        elif fmt == "PNG":
+            modes = self.PNG_MODES
+        elif fmt == "WEBP":
+            modes = ("RGB", "RGBA")
+        else:
+            return img
+        if img.mode in modes:
+            return img
+        return img.convert("RGBA" if has_alpha and fmt != "JPEG" else "RGB")
+
+
+def _encoded_length(value: object, path: str) -> int:
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, Future) and value.done() and not value.exception():
+        return len(value.result())
+    # Not encoded yet: a data: URI is its prefix plus 4 characters per 3 bytes.
+    size = os.path.getsize(path)
+    return len(f"data:{image_mime_type(path)};base64,") + 4 * ((size + 2) // 3)
+
+
+class ImageCache:
+    """
+    LRU cache of encoded data: URIs, bounded by the total size of the URIs
+    held in memory, optionally backed by a directory on disk that persists
+    between processes.
+
+    Entries are keyed either by the file's path, modification time and size
+    (key="stat", the default, which needs no read on a hit) or by a SHA-256
+    of its content (key="content", which also shares entries between copies
+    of the same image at different paths). The cache is thread safe.
+    """
+    KEYS = ("stat", "content")
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, directory: Optional[str] = None, key: str = "stat"):
+        if key not in self.KEYS:
+            raise ValueError(f"Unknown cache key '{key}', expected one of {self.KEYS}")
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.key = key
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def data_uri(self, path: str, variant: str = "",
+                 encode: Callable[[str, Optional[bytes]], str] = encode_image_file) -> str:
+        """
+        Returns the data: URI for the image at path, calling encode(path, data)
+        on a miss. variant distinguishes different encodings of the same
+        source, e.g. ImageOptimizer.variant().
+        """
+        data = None
+        if self.key == "content":
+            with open(path, "rb") as f:
+                data = f.read()
+            key = f"content:{hashlib.sha256(data).hexdigest()}:{image_mime_type(path)}"
+        else:
+            st = os.stat(path)
+            key = f"stat:{os.path.abspath(path)}:{st.st_mtime_ns}:{st.st_size}"
+        if variant:
+            key = f"{key}:{variant}"
+
+        uri = self._get(key)
+        if uri is None:
+            uri = encode(path, data)
+            self._put(key, uri)
+            if self.directory:
+                self._write_disk(key, uri)
+        return uri
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+            }
+
+    def clear(self) -> None:
+        """
+        Empties the in-memory cache. Files in the cache directory are kept.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._lock:
+            uri = self._entries.get(key)
+            if uri is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return uri
+        uri = self._read_disk(key) if self.directory else None
+        with self._lock:
+            if uri is None:
+                self.misses += 1
+            else:
+                self.disk_hits += 1
+        if uri is not None:
+            self._put(key, uri)
+        return uri
+
+    def _put(self, key: str, uri: str) -> None:
+        size = len(uri)
+        with self._lock:
+            if key in self._entries or size > self.max_bytes:
+                return
+            self._entries[key] = uri
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= len(evicted)
+                self.evictions += 1
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".uri")
+
+    def _read_disk(self, key: str) -> Optional[str]:
+        try:
+            with open(self._disk_path(key), "r", encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _write_disk(self, key: str, uri: str) -> None:
+        # Write to a temporary file first so readers never see a partial entry.
+        path = self._disk_path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(uri)
+        os.replace(tmp, path)
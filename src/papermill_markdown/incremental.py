@@ -0,0 +1,96 @@
+# src/papermill_markdown/incremental.py
+
+"""
+Re-conversion of a document that changes a little at a time, e.g. in an
+editor preview. Converted blocks are memoised by their source, so after an
+edit only the blocks that changed are parsed again.
+"""
+
+from collections import OrderedDict
+from typing import List, Dict, Optional, Tuple
+
+from .converter import MarkdownToPapermill
+
+
+class IncrementalConverter:
+    def __init__(self, converter: Optional[MarkdownToPapermill] = None, max_blocks: int = 4096):
+        """
+        converter: the MarkdownToPapermill whose options are used; a default
+            one is created if none is given.
+        max_blocks: number of converted blocks kept, least recently used
+            first out.
+
+        Elements returned for reused blocks are the same objects as in the
+        previous result, so treat them as read-only.
+        """
+        self.converter = converter or MarkdownToPapermill()
+        self.max_blocks = max_blocks
+        self.report = None
+        self._memo = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def convert(self, markdown_text: str) -> List[Dict]:
+        """
+        Same result as MarkdownToPapermill.convert(). Afterwards, report holds
+        the number of blocks, how many were reused from earlier conversions
+        and the indices of those reused. The converter's reports and stats
+        cover this conversion, counting only the blocks that were rebuilt.
+        """
+        reused = []
+        result = self.converter._convert_text(markdown_text, lambda lines: self._build_blocks(lines, reused))
+        self.report = {
+            "blocks": len(result),
+            "reused": len(reused),
+            "rebuilt": len(result) - len(reused),
+            "reused_blocks": reused,
+        }
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "blocks": len(self._memo),
+            "hits": self._hits,
+            "misses": self._misses,
+        }
+
+    def clear(self) -> None:
+        self._memo.clear()
+        self._hits = 0
+        self._misses = 0
+
+    def _build_blocks(self, lines: List[str], reused: List[int]) -> List[Dict]:
+        converter = self.converter
+        result = []
+        for i, block in enumerate(converter._iter_raw_blocks(lines)):
+            # Images depend on file contents, which ImageCache already tracks.
+            if block[0] == "image":
+                result.append(converter._build_block(block))
+                continue
+            key = self._key(block)
+            element = self._memo.get(key)
+            if element is None:
+                self._misses += 1
+                element = converter._build_block(block)
+                self._memo[key] = element
+                if len(self._memo) > self.max_blocks:
+                    self._memo.popitem(last=False)
+            else:
+                self._hits += 1
+                self._memo.move_to_end(key)
+                reused.append(i)
+            result.append(element)
+        return result
+
+    def _key(self, block: Tuple) -> Tuple:
+        converter = self.converter
+        footnotes = ()
+        if block[0] == "paragraph":
+            # The footnote texts a paragraph resolves, as in _process_paragraph.
+            footnotes = tuple(
+                converter.footnotes.get(part.split("__", 1)[0], "")
+                for part in block[1].split("__FOOTNOTE__") if "__" in part
+            )
+        options = (converter.numbered, converter.inline_engine, converter.schema_output, converter.compact,
+                   converter.token_objects)
+        return options, repr(block), footnotes
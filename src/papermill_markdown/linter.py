@@ -6,10 +6,16 @@ with the Papermill converter. This module uses mdformat to reformat Markdown
 and then applies additional linting rules. In this example, we check for table
 caption positioning: captions that appear below a table are moved above it,
 and an issue is reported.
+
+In "fast" mode the mdformat pass is skipped when a cheap line scan finds
+nothing it would need to normalise. IncrementalLinter re-lints only the
+blocks around each edit of a document.
 """
 
+import bisect
 import re
-import mdformat
+import time
+from typing import Iterator, List, Optional, Tuple
 
 
 class MarkdownLinter:
@@ -17,15 +23,61 @@ class MarkdownLinter:
     TABLE_CAPTION_PATTERN = re.compile(r'^(Table|Tab|TABLE|TAB)\.?\s*\d+', re.IGNORECASE)
     # Pattern for figure captions can be added similarly if needed.
     FIGURE_CAPTION_PATTERN = re.compile(r'^(Figure|Fig|FIGURE|FIG)\.?\s*\d+', re.IGNORECASE)
+    DOLLAR_PATTERN = re.compile(r'(?<!\\)\$')
+    ESCAPED_FOOTNOTE_OPEN_PATTERN = re.compile(r'\\\[\^')
+    ESCAPED_FOOTNOTE_CLOSE_PATTERN = re.compile(r'\\\]:')
+
+    LINT_MODES = ("full", "fast")
+    # Line kinds used by the fast mode detector.
+    LINE_KIND_PATTERNS = [
+        ("heading", re.compile(r'#{1,6} \S')),
+        ("bullet", re.compile(r'- \S')),
+        ("number", re.compile(r'\d{1,9}\. \S')),
+        ("footnote", re.compile(r'\[\^(\d+)\]: ')),
+    ]
+    # List item content that starts another block (a nested list, a break).
+    LIST_CONTENT_BLOCK_PATTERN = re.compile(r'[-+=_~<>#]|\*(?:\s|$)|\d{1,9}[.)]')
+    # Anything mdformat would rewrite or escape within a line.
+    UNSAFE_LINE_PATTERN = re.compile(
+        r'^\s|\s$|\t'                                  # indentation, trailing whitespace, tabs
+        r'|[\\`]|&#?\w+;'                               # escapes, code spans, entities
+        r'|^(?:[+>=<_~]|\*[\s*]*$|\* |-(?! )|#+(?![ #])|#{7}|\d+\)|\d+\.(?! ))'  # block markers mdformat rewrites
+        r'|(?<![^\W_])_|_(?![^\W_])'                      # underscores not between letters or digits
+        r'|#\s*$'                                        # closing hashes on a heading
+    )
+    # Emphasis mdformat leaves as it is: *text* or **text** that opens before
+    # a word character outside a word (or after a space before any other
+    # character) and closes likewise. Any other * is unpaired, nested or
+    # intraword, and mdformat may escape it.
+    EMPHASIS_SPAN_PATTERN = re.compile(
+        r'(?:(?<![\w*])(?=\*\*?\w)|(?<!\S))(\*\*?)(?=[^\s*])'
+        r'[^*]*?'
+        r'(?:(?<=\w)\1(?![\w*])|(?<=[^\s*])\1(?!\S))'
+    )
+    SPACE_RUN_PATTERN = re.compile(r'\S {2,}\S')
+    FOOTNOTE_REF_PATTERN = re.compile(r'\[\^(\d+)\](?!:)')
 
-    def __init__(self, markdown_text: str):
+    def __init__(self, markdown_text: str, mode: str = "full", stats=None):
         """
         Initialize the linter with the Markdown text.
+
+        mode: "full" always runs mdformat first. "fast" runs it only if
+            formatting_needed() finds something to normalise; otherwise the
+            rules below are applied to the text as given. After lint(), path
+            is "mdformat" or "fast" and path_reason says why mdformat ran.
+        stats: optional stats.PipelineStats recording the lint.scan,
+            lint.mdformat and lint.rules stages.
         """
+        if mode not in self.LINT_MODES:
+            raise ValueError(f"Unknown lint mode '{mode}', expected one of {self.LINT_MODES}")
         self.original_text = markdown_text
+        self.mode = mode
         self.open_issues = []  # List of tuples: (line number, description) for unresolved issues
         self.resolved_issues = []  # List of tuples: (line number, description) for issues fixed automatically
         self.fixed_text = None
+        self.path = None
+        self.path_reason = None
+        self.stats = stats
 
     def lint(self) -> (list, list, str):
         """
@@ -42,9 +94,55 @@ class MarkdownLinter:
             - resolved_issues: a list of (line number, description) for issues fixed automatically.
             - fixed_text: the resulting Markdown as a single string.
         """
-        # Use mdformat to reformat the original Markdown.
-        formatted_text = mdformat.text(self.original_text)
-        lines = formatted_text.splitlines()
+        self.fixed_text = "\n".join(self.lint_lines())
+        return self.open_issues, self.resolved_issues, self.fixed_text
+
+    def lint_lines(self) -> list:
+        """
+        Same as lint(), but returns the fixed Markdown as a list of lines,
+        ready for MarkdownToPapermill.convert_lines(). The issues are left in
+        open_issues and resolved_issues.
+        """
+        stats = self.stats
+        if stats is not None:
+            from .stats import text_bytes
+            size = text_bytes(self.original_text)
+            start = time.perf_counter()
+
+        lines = None
+        if self.mode == "fast":
+            lines = self.original_text.splitlines()
+            self.path_reason = self.formatting_needed(lines)
+            if stats is not None:
+                stats.record("lint.scan", time.perf_counter() - start, size)
+        else:
+            self.path_reason = "full mode"
+
+        if self.path_reason is None:
+            self.path = "fast"
+        else:
+            # Use mdformat to reformat the original Markdown.
+            import mdformat
+            self.path = "mdformat"
+            if stats is not None:
+                start = time.perf_counter()
+            formatted_text = mdformat.text(self.original_text)
+            if stats is not None:
+                stats.record("lint.mdformat", time.perf_counter() - start, size)
+            lines = formatted_text.splitlines()
+        if stats is None:
+            return self._apply_rules(lines, self.open_issues, self.resolved_issues)
+        start = time.perf_counter()
+        fixed_lines = self._apply_rules(lines, self.open_issues, self.resolved_issues)
+        stats.record("lint.rules", time.perf_counter() - start, sum(text_bytes(line) + 1 for line in lines))
+        return fixed_lines
+
+    @classmethod
+    def _apply_rules(cls, lines: List[str], open_issues: list, resolved_issues: list) -> List[str]:
+        """
+        Apply the custom rules to formatted lines, appending to the issue
+        lists, and return the fixed lines.
+        """
         fixed_lines = []
         i = 0
 
@@ -65,9 +163,9 @@ class MarkdownLinter:
                 # Skip blank lines.
                 while j < len(lines) and lines[j].strip() == "":
                     j += 1
-                if j < len(lines) and self.TABLE_CAPTION_PATTERN.match(lines[j].strip()):
+                if j < len(lines) and cls.TABLE_CAPTION_PATTERN.match(lines[j].strip()):
                     # Found a caption below the table; record a resolved issue.
-                    self.resolved_issues.append((j + 1, "Table caption moved from below to above the table."))
+                    resolved_issues.append((j + 1, "Table caption moved from below to above the table."))
                     caption_line = lines[j]
                     # Insert the caption above the table.
                     fixed_lines.append(caption_line)
@@ -84,20 +182,342 @@ class MarkdownLinter:
             fixed_lines.append(line)
             i += 1
 
-        # Join the fixed lines back into text.
-        self.fixed_text = "\n".join(fixed_lines)
+        for idx, line in enumerate(fixed_lines):
+            # Check for unmatched inline math delimiters: count unescaped $ signs.
+            if "$" in line and len(cls.DOLLAR_PATTERN.findall(line)) % 2 != 0:
+                open_issues.append((idx + 1, "Unmatched inline math delimiter ($) found."))
+
+            # mdformat may escape footnote markers (e.g., "\[^1\]:"), so we remove those extra backslashes.
+            # Both patterns stay within a line, so this matches unescaping the joined text.
+            if "\\" in line:
+                fixed_lines[idx] = cls.ESCAPED_FOOTNOTE_CLOSE_PATTERN.sub(
+                    ']:', cls.ESCAPED_FOOTNOTE_OPEN_PATTERN.sub('[^', line)
+                )
 
-        # --- NEW CODE: Unescape footnote definitions ---
-        # mdformat may escape footnote markers (e.g., "\[^1\]:"), so we remove those extra backslashes.
-        self.fixed_text = re.sub(r'\\\[\^', '[^', self.fixed_text)
-        self.fixed_text = re.sub(r'\\\]:', ']:', self.fixed_text)
-        # -----------------------------------------------------
+        return fixed_lines
 
-        # Check for unmatched inline math delimiters in each line.
-        for idx, line in enumerate(fixed_lines):
-            # Count unescaped $ signs.
-            dollars = re.findall(r'(?<!\\)\$', line)
-            if len(dollars) % 2 != 0:
-                self.open_issues.append((idx + 1, "Unmatched inline math delimiter ($) found."))
+    @classmethod
+    def formatting_needed(cls, lines: List[str]) -> Optional[str]:
+        """
+        Cheap check for whether mdformat would change the document in a way
+        that matters for linting or conversion. Returns a description of the
+        first such line, or None if the lines are already in the form
+        mdformat produces. It errs on the side of reporting: anything it does
+        not recognise as canonical is sent through mdformat.
+
+        Differences mdformat makes that do not change the converted document,
+        like list renumbering, are left alone.
+        """
+        refs = set()
+        footnote_ids = []
+        prev = None  # kind of the previous line, None at the start
+        in_fence = False
+        for number, line in enumerate(lines, 1):
+            if in_fence:
+                if line.startswith("```"):
+                    if line != "```":
+                        return f"line {number}: closing fence"
+                    in_fence = False
+                    prev = "fence"
+                continue
+
+            if not line:
+                if prev in (None, "blank"):
+                    return f"line {number}: extra blank line"
+                prev = "blank"
+                continue
+
+            if prev in ("heading", "fence"):
+                return f"line {number}: no blank line after {prev}"
+            if footnote_ids and not line.startswith("[^"):
+                return f"line {number}: footnote definitions not at the end"
+
+            if line.startswith("```"):
+                if prev not in (None, "blank") or "`" in line[3:]:
+                    return f"line {number}: code fence"
+                in_fence = True
+                continue
+
+            kind = "text"
+            for name, pattern in cls.LINE_KIND_PATTERNS:
+                m = pattern.match(line)
+                if m:
+                    kind = name
+                    break
+            if kind == "footnote" and " " in line[m.end():] and not any(c in line for c in "\"'("):
+                # mdformat escapes a definition of several words in place, and
+                # lint() unescapes it again; only single-word ones are moved.
+                kind = "text"
+            if kind in ("bullet", "number") and cls.LIST_CONTENT_BLOCK_PATTERN.match(line, m.end() - 1):
+                return f"line {number}: block in list item"
+            if kind == "text" and footnote_ids:
+                return f"line {number}: footnote definitions not at the end"
+            if prev in ("bullet", "number") and kind != prev:
+                return f"line {number}: no blank line after list"
+            if kind in ("heading", "bullet", "number") and prev not in (None, "blank", kind):
+                return f"line {number}: no blank line before {kind}"
+            if kind == "footnote":
+                if prev not in ("blank", "footnote"):
+                    return f"line {number}: no blank line before footnote definitions"
+                footnote_ids.append(m.group(1))
+
+            if cls.UNSAFE_LINE_PATTERN.search(line):
+                return f"line {number}: formatting to normalise"
+            if "  " in line and cls.SPACE_RUN_PATTERN.search(line):
+                return f"line {number}: repeated spaces"
+            if "*" in line and "*" in cls.EMPHASIS_SPAN_PATTERN.sub("", line):
+                return f"line {number}: emphasis to normalise"
+            if line.count("[") != line.count("]"):
+                return f"line {number}: unpaired brackets"
+            if "[^" in line:
+                refs.update(cls.FOOTNOTE_REF_PATTERN.findall(line))
+            prev = kind
+
+        if in_fence:
+            return "unclosed code fence"
+        if prev == "blank":
+            return "trailing blank line"
+        if footnote_ids and (footnote_ids != sorted(set(footnote_ids)) or not refs.issuperset(footnote_ids)):
+            return "footnote definitions out of order or unused"
+        return None
+
+
+class _LintBlock:
+    """A run of source lines that mdformat can format on its own."""
+
+    __slots__ = ("text", "size", "references", "formatted", "group")
+
+    def __init__(self, text: str, size: int, references: bool, formatted: Optional[List[str]] = None):
+        self.text = text  # source up to the blank lines that follow it, or to the end
+        self.size = size  # number of source lines, including those blank lines
+        self.references = references  # defines link references, which mdformat resolves document-wide
+        self.formatted = formatted
+        self.group = None  # (blocks, formatted length, fixed lines, open issues, resolved issues)
+
+
+class IncrementalLinter:
+    """
+    A linter for a document that is edited a little at a time, e.g. in an
+    editor. The document is kept as blocks that mdformat formats the same way
+    on their own as within the whole text, and an edit only reformats and
+    rechecks the blocks it touches. In "full" mode lint() returns the same
+    issues and text as MarkdownLinter(text).lint() on the current text; in
+    "fast" mode each block is checked for formatting on its own.
+    """
+
+    # Starts of lines that may continue a list or indented code block after a blank line.
+    CONTINUATION_PATTERN = re.compile(r'[ \t]|(?:[-+*]|\d{1,9}[.)])(?:[ \t]|$)')
+    FENCE_OPEN_PATTERN = re.compile(r' {0,3}(?:(`{3,})[^`]*|(~{3,}).*)$')
+    FENCE_CLOSE_PATTERN = re.compile(r' {0,3}(`{3,}|~{3,})[ \t]*$')
+
+    def __init__(self, markdown_text: str, mode: str = "full"):
+        """
+        mode: as for MarkdownLinter, applied to each block that is reformatted.
 
+        After lint(), report holds the number of blocks, how many were
+        reformatted and how many reused. path is "incremental", or "full"
+        when the document defines link references (e.g. "[^1]: source"):
+        mdformat moves and resolves those across the whole text, so it is
+        then linted as a whole, and path_reason says so.
+        """
+        if mode not in MarkdownLinter.LINT_MODES:
+            raise ValueError(f"Unknown lint mode '{mode}', expected one of {MarkdownLinter.LINT_MODES}")
+        self.mode = mode
+        self.open_issues = []
+        self.resolved_issues = []
+        self.fixed_text = None
+        self.path = None
+        self.path_reason = None
+        self.report = None
+        self._parser = None  # created by the first _parse(), to import markdown-it-py only when needed
+        self._lines = self._split(markdown_text)
+        self._blocks = list(self._iter_blocks(0))
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self._lines)
+
+    def edit(self, first_line: int, last_line: int, text: str) -> None:
+        """
+        Replace source lines first_line to last_line (1-based, inclusive)
+        with the lines of text, split as by str.splitlines(). Use
+        last_line = first_line - 1 to insert before first_line, and text=""
+        to delete the lines.
+
+        Only the blocks around the edit are re-split; they are reformatted by
+        the next lint().
+        """
+        start, stop = first_line - 1, last_line
+        if not 0 <= start <= stop <= len(self._lines):
+            raise ValueError(f"Line range {first_line}-{last_line} is outside the document "
+                             f"({len(self._lines)} lines)")
+        new_lines = self._split(text)
+        if new_lines and new_lines[-1] == "":
+            new_lines.pop()
+
+        starts = []
+        position = 0
+        for block in self._blocks:
+            starts.append(position)
+            position += block.size
+        # Re-split from the block before the edit, since a changed first line
+        # can join a block to the one before it.
+        first = max(bisect.bisect_right(starts, start) - 2, 0)
+        self._lines[start:stop] = new_lines
+        shift = len(new_lines) - (stop - start)
+        edit_end = start + len(new_lines)
+
+        old = {block.text: block for block in self._blocks[first:bisect.bisect_right(starts, stop) + 1]}
+        blocks = self._blocks[:first]
+        position = starts[first] if starts else 0
+        tail = []
+        for block in self._iter_blocks(position):
+            reused = old.get(block.text)
+            if reused is not None:
+                if reused.size == block.size:
+                    block = reused
+                else:
+                    block.formatted = reused.formatted
+            blocks.append(block)
+            position += block.size
+            if position >= edit_end and position < len(self._lines):
+                # Blocks after a boundary both splits share are unchanged.
+                i = bisect.bisect_left(starts, position - shift)
+                if i < len(starts) and starts[i] == position - shift:
+                    tail = self._blocks[i:]
+                    break
+        self._blocks = blocks + tail
+
+    def lint(self) -> (list, list, str):
+        """
+        Same as MarkdownLinter.lint() for the current text.
+        """
+        self.fixed_text = "\n".join(self.lint_lines())
         return self.open_issues, self.resolved_issues, self.fixed_text
+
+    def lint_lines(self) -> list:
+        """
+        Same as MarkdownLinter.lint_lines() for the current text.
+        """
+        self.open_issues = []
+        self.resolved_issues = []
+        if any(block.references for block in self._blocks):
+            linter = MarkdownLinter(self.text, self.mode)
+            fixed_lines = linter.lint_lines()
+            self.open_issues, self.resolved_issues = linter.open_issues, linter.resolved_issues
+            self.path = "full"
+            self.path_reason = "link reference definitions"
+            self.report = {"blocks": len(self._blocks), "reused": 0, "rebuilt": len(self._blocks)}
+            return fixed_lines
+
+        rebuilt = 0
+        for block in self._blocks:
+            if block.formatted is None:
+                block.formatted = self._format(block.text)
+                rebuilt += 1
+
+        fixed_lines = []
+        offset = 0  # line offset in the formatted text, which resolved issues refer to
+        for group in self._groups():
+            if fixed_lines:
+                fixed_lines.append("")
+                offset += 1
+            first = group[0]
+            if first.group is None or first.group[0] != group:
+                formatted = first.formatted
+                for block in group[1:]:
+                    formatted = formatted + [""] + block.formatted
+                open_issues, resolved_issues = [], []
+                fixed = MarkdownLinter._apply_rules(formatted, open_issues, resolved_issues)
+                first.group = (group, len(formatted), fixed, open_issues, resolved_issues)
+            _, length, fixed, open_issues, resolved_issues = first.group
+            self.open_issues.extend((len(fixed_lines) + line, issue) for line, issue in open_issues)
+            self.resolved_issues.extend((offset + line, issue) for line, issue in resolved_issues)
+            fixed_lines.extend(fixed)
+            offset += length
+
+        self.path = "incremental"
+        self.path_reason = None
+        self.report = {"blocks": len(self._blocks), "reused": len(self._blocks) - rebuilt, "rebuilt": rebuilt}
+        return fixed_lines
+
+    def _groups(self) -> Iterator[tuple]:
+        # A table at the end of a block may take its caption from the next one,
+        # so the rules run over both together.
+        group = []
+        for block in self._blocks:
+            if not block.formatted:
+                continue
+            group.append(block)
+            last = next((line for line in reversed(block.formatted) if line.strip()), "")
+            if not last.strip().startswith("|"):
+                yield tuple(group)
+                group = []
+        if group:
+            yield tuple(group)
+
+    def _format(self, text: str) -> List[str]:
+        if self.mode == "fast":
+            lines = text.splitlines()
+            if MarkdownLinter.formatting_needed(lines) is None:
+                return lines
+        import mdformat
+        return mdformat.text(text).splitlines()
+
+    def _iter_blocks(self, i: int) -> Iterator[_LintBlock]:
+        """
+        Split the source from line i, which starts a block, into blocks. A
+        block ends before a blank line if the next line cannot continue a
+        list or indented code and nothing in the block is left open (a fence
+        or an HTML block that runs until its closing tag).
+        """
+        lines = self._lines
+        n = len(lines)
+        while i < n:
+            start = i
+            end = i  # index after the last non-blank line
+            fence = None
+            while i < n:
+                line = lines[i]
+                if not line.strip(" \t"):
+                    i += 1
+                    continue
+                if end > start and i > end and fence is None and not self.CONTINUATION_PATTERN.match(line):
+                    text = "\n".join(lines[start:end])
+                    closed, references = self._parse(text, end - start)
+                    if closed:
+                        text += "\n"
+                        break
+                if fence is not None:
+                    m = self.FENCE_CLOSE_PATTERN.match(line)
+                    if m and m.group(1)[0] == fence[0] and len(m.group(1)) >= len(fence):
+                        fence = None
+                else:
+                    m = self.FENCE_OPEN_PATTERN.match(line)
+                    if m:
+                        fence = m.group(1) or m.group(2)
+                end = i + 1
+                i += 1
+            else:
+                # An unclosed fence keeps the blank lines at the end.
+                text = "\n".join(lines[start:])
+                references = end > start and self._parse(text, n - start)[1]
+            yield _LintBlock(text, i - start, references)
+
+    def _parse(self, text: str, length: int) -> Tuple[bool, bool]:
+        """
+        Whether a block of length lines is closed, i.e. a paragraph after a
+        blank line starts a new top-level block, and whether it defines link
+        references.
+        """
+        if self._parser is None:
+            from markdown_it import MarkdownIt
+            self._parser = MarkdownIt()
+        env = {}
+        tokens = self._parser.parse(text + "\n\nx", env)
+        last = next(token for token in reversed(tokens) if token.level == 0 and token.map)
+        return last.map[0] == length + 1, bool(env.get("references"))
+
+    @staticmethod
+    def _split(text: str) -> List[str]:
+        return text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
@@ -0,0 +1,33 @@
+# src/papermill_markdown/pipeline.py
+
+"""
+Lint and convert a document in one pass: the lines MarkdownLinter produces
+are handed straight to the converter instead of being joined into text and
+normalised and split again.
+"""
+
+from typing import List, Dict, Optional, Tuple
+
+from .converter import MarkdownToPapermill
+from .linter import MarkdownLinter
+from .stats import PipelineStats
+
+
+def lint_and_convert(markdown_text: str,
+                     converter: Optional[MarkdownToPapermill] = None,
+                     lint_mode: str = "full",
+                     stats: Optional[PipelineStats] = None) -> Tuple[List, List, List[Dict]]:
+    """
+    Equivalent to
+
+        open_issues, resolved_issues, fixed_text = MarkdownLinter(markdown_text, lint_mode).lint()
+        document = converter.convert(fixed_text)
+
+    Returns (open_issues, resolved_issues, document).
+
+    stats: PipelineStats for the linter stages; defaults to converter.stats.
+    """
+    converter = converter or MarkdownToPapermill()
+    linter = MarkdownLinter(markdown_text, mode=lint_mode, stats=stats if stats is not None else converter.stats)
+    lines = linter.lint_lines()
+    return linter.open_issues, linter.resolved_issues, converter.convert_lines(lines)
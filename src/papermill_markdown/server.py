@@ -0,0 +1,542 @@
+# src/papermill_markdown/server.py
+
+"""
+Long-running local conversion service. The converter, linter, compiled
+validators and image cache are built once and stay warm, so a request pays
+for the conversion only, not for starting Python and importing pydantic and
+mdformat. Concurrent requests are collected into batches, which are
+converted and validated together (in this process, or on a pool of worker
+processes with workers > 1).
+
+    papermill-markdown-server --port 8765 -j 4
+    papermill-markdown-server --socket /tmp/papermill.sock
+
+    POST /convert              Markdown (or JSON {"markdown": ...}) -> {"documentContent": [...]}
+    GET  /metrics              request, batch, latency and throughput counters, as JSON
+    GET  /metrics/prometheus   the same, and the stage timings, for Prometheus
+    GET  /health               {"status": "ok"}
+
+Everything runs offline; the service never calls the Papermill API.
+"""
+
+import argparse
+import collections
+import json
+import os
+import queue
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer, ThreadingHTTPServer
+from socketserver import TCPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .converter import MarkdownToPapermill
+from .images import ImageCache
+from .linter import MarkdownLinter
+from .pipeline import lint_and_convert
+from .stats import PipelineStats
+
+# Per-process batch converter, set up once by _init_worker.
+_WORKER = None
+
+
+class ServiceBusy(Exception):
+    """Raised by ConversionService.submit when the request queue is full."""
+
+
+class _BatchConverter:
+    """
+    The warm pipeline of one process: lint -> convert -> bulk validate for a
+    batch of documents.
+    """
+
+    def __init__(self, options: Dict, stats: Optional[PipelineStats] = None):
+        self.options = options
+        # In a worker process, the stats of each batch are sent back and reset.
+        self.stats = stats if stats is not None or not options["stats"] else PipelineStats()
+        image_cache = None
+        if options["image_cache_bytes"] or options["image_cache_dir"]:
+            image_cache = ImageCache(max_bytes=options["image_cache_bytes"], directory=options["image_cache_dir"])
+        self.converter = MarkdownToPapermill(numbered=options["numbered"], inline_engine=options["inline_engine"],
+                                             image_cache=image_cache, schema_output=True, stats=self.stats,
+                                             local_images=options["image_root"] is not None,
+                                             image_root=options["image_root"])
+        if options["validate"]:
+            # Compile the validator now rather than on the first request.
+            from .validator import validate_documents
+            validate_documents([[]])
+
+    def run(self, texts: List[str]) -> List[Tuple[Optional[List], int, Optional[str]]]:
+        """
+        Returns one (content, open_issues, error) per text. A document that
+        fails does not affect the rest of its batch.
+        """
+        results = []
+        for text in texts:
+            try:
+                if self.options["lint"]:
+                    open_issues, _, content = lint_and_convert(text, self.converter, self.options["lint_mode"])
+                    results.append((content, len(open_issues), None))
+                else:
+                    results.append((self.converter.convert(text), 0, None))
+            except Exception as e:
+                results.append((None, 0, f"{type(e).__name__}: {e}"))
+
+        if self.options["validate"]:
+            from .validator import validate_documents
+            converted = [i for i, (content, _, _) in enumerate(results) if content is not None]
+            checked = validate_documents((results[i][0] for i in converted), stats=self.stats)
+            for i, result in zip(converted, checked):
+                if result.errors:
+                    results[i] = (None, results[i][1], f"ValidationError: {json.dumps(result.errors, default=str)}")
+        return results
+
+
+def _init_worker(options: Dict) -> None:
+    global _WORKER
+    _WORKER = _BatchConverter(options)
+
+
+def _run_batch(texts: List[str]) -> Tuple[List[Tuple[Optional[List], int, Optional[str]]], Optional[Dict]]:
+    results = _WORKER.run(texts)
+    if _WORKER.stats is None:
+        return results, None
+    stats = _WORKER.stats.to_dict()
+    _WORKER.stats.reset()
+    return results, stats
+
+
+class ConversionService:
+    """
+    Converts Markdown into validated Papermill documentContent, batching
+    concurrent requests. Thread safe: any number of threads may call
+    submit() or convert().
+
+    numbered, inline_engine: as for MarkdownToPapermill.
+    lint, lint_mode: run MarkdownLinter first, as the CLI does.
+    validate: check every document against DocumentContent.
+    image_root: directory local images are read from. Paths resolving
+        outside it are refused, and with None (the default) every local
+        image is, so a client cannot have arbitrary files embedded in the
+        response. http(s) and data: image URLs are always passed through.
+    image_cache_bytes, image_cache_dir: size and optional directory of the
+        ImageCache kept by each worker. 0 and None disable it.
+    workers: 1 converts in a background thread of this process; more runs
+        batches on a pool of that many processes.
+    max_batch: largest number of documents converted together.
+    batch_wait: seconds to wait for more requests once one has arrived;
+        0 takes only what is already queued.
+    max_queue: requests waiting beyond this are refused with ServiceBusy.
+    stats: if True, per-stage and per-block-type timings of every worker
+        are collected in the stats attribute (a PipelineStats) and
+        reported by snapshot() and prometheus().
+    """
+
+    def __init__(self, numbered: bool = True, inline_engine: str = "scanner", lint: bool = False,
+                 lint_mode: str = "full", validate: bool = True, image_root: Optional[str] = None,
+                 image_cache_bytes: int = 64 * 1024 * 1024,
+                 image_cache_dir: Optional[str] = None, workers: int = 1, max_batch: int = 32,
+                 batch_wait: float = 0.002, max_queue: int = 1024, stats: bool = False):
+        if inline_engine not in MarkdownToPapermill.INLINE_ENGINES:
+            raise ValueError(
+                f"Unknown inline engine '{inline_engine}', expected one of {MarkdownToPapermill.INLINE_ENGINES}"
+            )
+        if lint_mode not in MarkdownLinter.LINT_MODES:
+            raise ValueError(f"Unknown lint mode '{lint_mode}', expected one of {MarkdownLinter.LINT_MODES}")
+        if workers < 1 or max_batch < 1:
+            raise ValueError("workers and max_batch must be at least 1")
+        self.options = {
+            "numbered": numbered,
+            "inline_engine": inline_engine,
+            "lint": lint,
+            "lint_mode": lint_mode,
+            "validate": validate,
+            "image_root": image_root,
+            "image_cache_bytes": image_cache_bytes,
+            "image_cache_dir": image_cache_dir,
+            "stats": stats,
+        }
+        self.workers = workers
+        self.max_batch = max_batch
+        self.batch_wait = batch_wait
+        self.metrics = ServiceMetrics()
+        self.stats = PipelineStats() if stats else None
+        self._queue = queue.Queue(maxsize=max_queue)
+        # At most one batch per worker is in flight; the rest wait in the
+        # queue, where they can still be batched together.
+        self._slots = threading.Semaphore(workers)
+        if workers == 1:
+            self._pool = None
+            self._local = _BatchConverter(self.options, self.stats)
+        else:
+            self._pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                             initargs=(self.options,))
+            # Start the workers and warm them up before the first request.
+            list(self._pool.map(_run_batch, [["# warm-up"]] * workers))
+        self._closed = False
+        self._batcher = threading.Thread(target=self._batch_loop, name="papermill-batcher", daemon=True)
+        self._batcher.start()
+
+    def submit(self, markdown_text: str) -> Future:
+        """
+        Queues a document. The Future resolves to its documentContent, or
+        raises ValueError if it could not be converted or is invalid.
+        """
+        if self._closed:
+            raise RuntimeError("ConversionService is closed")
+        future = Future()
+        try:
+            self._queue.put_nowait((markdown_text, future, time.perf_counter()))
+        except queue.Full:
+            self.metrics.record_rejected()
+            raise ServiceBusy(f"{self._queue.maxsize} requests already queued") from None
+        return future
+
+    def convert(self, markdown_text: str, timeout: Optional[float] = None) -> List[Dict]:
+        return self.submit(markdown_text).result(timeout)
+
+    def close(self) -> None:
+        """
+        Finishes the queued requests and stops the batcher and workers.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._batcher.join()
+        if self._pool is not None:
+            self._pool.shutdown()
+
+    def __enter__(self) -> "ConversionService":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def snapshot(self) -> Dict:
+        """
+        The metrics, with the queue depth and configuration added.
+        """
+        out = self.metrics.snapshot()
+        out["queued"] = self._queue.qsize()
+        out["workers"] = self.workers
+        out["max_batch"] = self.max_batch
+        if self._pool is None and self._local.converter.image_cache is not None:
+            out["image_cache"] = self._local.converter.image_cache.stats()
+        if self.stats is not None:
+            out["stages"] = self.stats.to_dict()
+        return out
+
+    def prometheus(self, prefix: str = "papermill_markdown") -> str:
+        """
+        snapshot() in the Prometheus text exposition format: the numeric
+        service metrics as gauges, followed by the stage timings.
+        """
+        lines = []
+        for name, value in self.metrics.snapshot().items():
+            lines.append(f"# TYPE {prefix}_service_{name} gauge")
+            lines.append(f"{prefix}_service_{name} {value}")
+        lines.append(f"# TYPE {prefix}_service_queued gauge")
+        lines.append(f"{prefix}_service_queued {self._queue.qsize()}")
+        text = "\n".join(lines) + "\n"
+        if self.stats is not None:
+            text += self.stats.to_prometheus(prefix)
+        return text
+
+    def _batch_loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            stop = self._fill_batch(batch)
+            self._slots.acquire()
+            self._dispatch(batch)
+            if stop:
+                break
+        # Wait for the batches still running.
+        for _ in range(self.workers):
+            self._slots.acquire()
+
+    def _fill_batch(self, batch: List) -> bool:
+        deadline = time.perf_counter() + self.batch_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                return False
+            if item is None:
+                return True
+            batch.append(item)
+        return False
+
+    def _dispatch(self, batch: List) -> None:
+        texts = [text for text, _, _ in batch]
+        started = time.perf_counter()
+        if self._pool is None:
+            try:
+                results = self._local.run(texts)
+            except Exception as e:
+                results = e
+            self._finish(batch, results, started)
+        else:
+            try:
+                pending = self._pool.submit(_run_batch, texts)
+            except Exception as e:
+                self._finish(batch, e, started)
+                return
+            pending.add_done_callback(lambda done: self._finish_remote(batch, done, started))
+
+    def _finish_remote(self, batch: List, done: Future, started: float) -> None:
+        if done.exception() is not None:
+            self._finish(batch, done.exception(), started)
+            return
+        results, stats = done.result()
+        if stats is not None:
+            self.stats.merge(stats)
+        self._finish(batch, results, started)
+
+    def _finish(self, batch: List, results, started: float) -> None:
+        try:
+            now = time.perf_counter()
+            failed = 0
+            for i, (_, future, queued) in enumerate(batch):
+                # Every request gets a latency sample, whatever its outcome.
+                self.metrics.record_latency(now - queued)
+                if isinstance(results, BaseException):
+                    future.set_exception(results)
+                    failed += 1
+                    continue
+                content, open_issues, error = results[i]
+                if error:
+                    future.set_exception(ValueError(error))
+                    failed += 1
+                else:
+                    future.set_result(content)
+            self.metrics.record_batch(len(batch), failed, now - started)
+        finally:
+            self._slots.release()
+
+
+class ServiceMetrics:
+    """
+    Counters and latency samples of a ConversionService. Latencies are
+    measured from submit() to the result, queueing included, over the last
+    `window` requests.
+    """
+
+    def __init__(self, window: int = 10000):
+        self.started = time.time()
+        self.requests = 0
+        self.failed = 0
+        self.rejected = 0
+        self.batches = 0
+        self.batch_seconds = 0.0
+        self.bytes_in = 0
+        self._latencies = collections.deque(maxlen=window)
+        self._completed = collections.deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record_latency(self, seconds: float) -> None:
+        with self._lock:
+            self._latencies.append(seconds)
+            self._completed.append(time.time())
+
+    def record_batch(self, size: int, failed: int, seconds: float) -> None:
+        with self._lock:
+            self.requests += size
+            self.failed += failed
+            self.batches += 1
+            self.batch_seconds += seconds
+
+    def record_rejected(self) -> None:
+        with self._lock:
+            self.rejected += 1
+
+    def record_bytes(self, count: int) -> None:
+        with self._lock:
+            self.bytes_in += count
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            completed = list(self._completed)
+            now = time.time()
+            uptime = now - self.started
+            out = {
+                "uptime_s": round(uptime, 3),
+                "requests": self.requests,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "batches": self.batches,
+                "mean_batch_size": round(self.requests / self.batches, 2) if self.batches else 0,
+                "mean_batch_ms": round(1000 * self.batch_seconds / self.batches, 3) if self.batches else 0,
+                "bytes_in": self.bytes_in,
+                "throughput_rps": round(self.requests / uptime, 2) if uptime > 0 else 0,
+            }
+        # Throughput over the last ten seconds, for a service that has been idle.
+        recent = [t for t in completed if now - t <= 10]
+        out["recent_rps"] = round(len(recent) / 10, 2)
+        for name, q in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99)):
+            out[f"latency_{name}_ms"] = round(1000 * latencies[min(len(latencies) - 1, int(q * len(latencies)))], 3) \
+                if latencies else 0
+        out["latency_max_ms"] = round(1000 * latencies[-1], 3) if latencies else 0
+        return out
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "papermill-markdown"
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        if self.path == "/health":
+            self._reply(200, {"status": "ok"})
+        elif self.path == "/metrics":
+            self._reply(200, self.server.service.snapshot())
+        elif self.path == "/metrics/prometheus":
+            self._reply_text(200, self.server.service.prometheus(), "text/plain; version=0.0.4")
+        else:
+            self._reply(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self) -> None:
+        if self.path != "/convert":
+            self._reply(404, {"error": f"Unknown path {self.path}"})
+            return
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        service = self.server.service
+        service.metrics.record_bytes(len(body))
+        try:
+            text = body.decode("utf-8")
+            if (self.headers.get("Content-Type") or "").startswith("application/json"):
+                text = json.loads(text)["markdown"]
+                if not isinstance(text, str):
+                    raise TypeError(f"markdown must be a string, not {type(text).__name__}")
+        except (UnicodeDecodeError, ValueError, KeyError, TypeError) as e:
+            self._reply(400, {"error": f"Expected UTF-8 Markdown or JSON {{\"markdown\": ...}}: {e}"})
+            return
+        try:
+            content = service.convert(text)
+        except ServiceBusy as e:
+            self._reply(503, {"error": str(e)})
+        except ValueError as e:
+            self._reply(422, {"error": str(e)})
+        except Exception as e:
+            self._reply(500, {"error": f"{type(e).__name__}: {e}"})
+        else:
+            self._reply(200, {"documentContent": content})
+
+    def _reply(self, status: int, payload: Dict) -> None:
+        self._reply_text(status, json.dumps(payload), "application/json")
+
+    def _reply_text(self, status: int, text: str, content_type: str) -> None:
+        body = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self) -> str:
+        # Unix socket clients have no address.
+        return self.client_address[0] if self.client_address else self.server.server_address
+
+    def log_message(self, format: str, *args) -> None:
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 resets connections under a load test.
+    request_queue_size = 128
+
+
+class _UnixHTTPServer(_HTTPServer):
+    address_family = socket.AF_UNIX
+
+    def server_bind(self) -> None:
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+        TCPServer.server_bind(self)
+        self.server_name = "localhost"
+        self.server_port = 0
+
+
+def make_server(service: ConversionService, host: str = "127.0.0.1", port: int = 8765,
+                unix_socket: Optional[str] = None, quiet: bool = False) -> HTTPServer:
+    """
+    An HTTP server for service on host:port, or on unix_socket if given.
+    Call serve_forever() on it; port 0 picks a free port (see server_port).
+    """
+    if unix_socket:
+        server = _UnixHTTPServer(unix_socket, _Handler)
+    else:
+        server = _HTTPServer((host, port), _Handler)
+    server.service = service
+    server.quiet = quiet
+    return server
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = _parse_args(argv)
+    service = ConversionService(
+        numbered=args.numbered, inline_engine=args.inline_engine, lint=args.lint, lint_mode=args.lint_mode,
+        validate=args.validate, image_root=args.image_root, image_cache_bytes=args.image_cache_mb * 1024 * 1024,
+        image_cache_dir=args.image_cache_dir, workers=args.workers, max_batch=args.max_batch,
+        batch_wait=args.batch_wait_ms / 1000, max_queue=args.max_queue, stats=args.stats,
+    )
+    server = make_server(service, args.host, args.port, args.socket, args.quiet)
+    where = args.socket or f"http://{args.host}:{server.server_port}"
+    print(f"Serving on {where} with {args.workers} worker(s)", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        if args.socket and os.path.exists(args.socket):
+            os.unlink(args.socket)
+    return 0
+
+
+def _parse_args(argv: Optional[Sequence[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="papermill-markdown-server",
+        description="Serve Markdown to Papermill conversion over local HTTP with warm caches."
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1).")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on (default: 8765, 0 for any).")
+    parser.add_argument("--socket", help="Listen on this Unix socket instead of TCP.")
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="Worker processes converting batches (default: 1, in-process).")
+    parser.add_argument("--max-batch", type=int, default=32, help="Largest batch of documents (default: 32).")
+    parser.add_argument("--batch-wait-ms", type=float, default=2.0,
+                        help="Time to wait for a batch to fill once a request arrives (default: 2).")
+    parser.add_argument("--max-queue", type=int, default=1024,
+                        help="Queued requests beyond this get 503 (default: 1024).")
+    parser.add_argument("--lint", action="store_true", help="Run MarkdownLinter before conversion.")
+    parser.add_argument("--lint-mode", choices=MarkdownLinter.LINT_MODES, default="full",
+                        help="'fast' skips mdformat for documents that are already well formed (default: full).")
+    parser.add_argument("--no-validate", dest="validate", action="store_false",
+                        help="Skip DocumentContent validation of the output.")
+    parser.add_argument("--no-numbered", dest="numbered", action="store_false", help="Do not number headings.")
+    parser.add_argument("--inline-engine", choices=MarkdownToPapermill.INLINE_ENGINES, default="scanner",
+                        help="Inline formatting engine (default: scanner).")
+    parser.add_argument("--image-root",
+                        help="Directory local images may be read from (default: local images are refused).")
+    parser.add_argument("--image-cache-mb", type=int, default=64,
+                        help="In-memory image cache per worker in MiB (default: 64, 0 disables).")
+    parser.add_argument("--image-cache-dir", help="Directory persisting the image cache between restarts.")
+    parser.add_argument("--stats", action="store_true",
+                        help="Collect per-stage timings, reported under /metrics and /metrics/prometheus.")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Do not log requests.")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+# src/papermill_markdown/stats.py
+
+"""
+Opt-in instrumentation of the pipeline. Pass a PipelineStats as stats= to
+MarkdownToPapermill, MarkdownLinter, lint_and_convert or validate_documents
+and it collects wall time, calls and bytes per stage and per block type.
+Without one, the only cost is an `is None` check per block and per inline
+run.
+
+    stats = PipelineStats()
+    converter = MarkdownToPapermill(stats=stats)
+    lint_and_convert(text, converter)
+    json.dump(stats.to_dict(), f)        # per document
+    print(stats.to_prometheus())         # or scraped, e.g. by the service
+
+Stages:
+    normalize      NFC normalisation and mojibake replacement in convert()
+    footnotes      footnote extraction (with normalisation in convert_lines())
+    convert        the whole conversion, block scanning included
+    inline         inline maths and formatting (nested in the block times)
+    image_encode   reading and encoding local images (cache lookups included)
+    compact        compaction of each element, with compact=True
+    schema_dump    dump_element, with schema_output=True
+    sections       the process pool of section_workers; blocks built there
+                   are not timed one by one
+    lint.scan      the fast-mode check for formatting mdformat would change
+    lint.mdformat  mdformat.text
+    lint.rules     the linter's own rules
+    validate       validation, per document, by validate_documents and the CLI
+    read, write    reading the Markdown and writing the JSON, in the CLI
+
+Blocks are recorded by their raw type (paragraph, heading, list, table,
+image, equation, code, break); a block's time covers building the element,
+inline formatting included. Bytes are UTF-8 bytes of the input processed by
+the stage (or of the encoded image for image_encode).
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, Union
+
+
+def text_bytes(text: str) -> int:
+    return len(text) if text.isascii() else len(text.encode("utf-8"))
+
+
+class PipelineStats:
+    """
+    Thread-safe accumulator of per-stage and per-block-type timings.
+
+    callback: optional callable(kind, name, seconds, nbytes) invoked on
+        every record, with kind "stage" or "block", e.g. to feed a tracing
+        or metrics library. It runs in the recording thread.
+    """
+
+    def __init__(self, callback: Optional[Callable[[str, str, float, int], None]] = None):
+        self.callback = callback
+        self.stages = {}  # name -> [calls, seconds, bytes]
+        self.blocks = {}  # type -> [count, seconds, bytes]
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float, nbytes: int = 0) -> None:
+        with self._lock:
+            entry = self.stages.get(stage)
+            if entry is None:
+                self.stages[stage] = [1, seconds, nbytes]
+            else:
+                entry[0] += 1
+                entry[1] += seconds
+                entry[2] += nbytes
+        if self.callback is not None:
+            self.callback("stage", stage, seconds, nbytes)
+
+    def record_block(self, kind: str, seconds: float, nbytes: int = 0) -> None:
+        with self._lock:
+            entry = self.blocks.get(kind)
+            if entry is None:
+                self.blocks[kind] = [1, seconds, nbytes]
+            else:
+                entry[0] += 1
+                entry[1] += seconds
+                entry[2] += nbytes
+        if self.callback is not None:
+            self.callback("block", kind, seconds, nbytes)
+
+    @contextmanager
+    def stage(self, name: str, nbytes: int = 0) -> Iterator[None]:
+        """
+        Times the body of a with statement as one call of stage name, e.g.
+        for steps of your own around the pipeline.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, nbytes)
+
+    def merge(self, other: Union["PipelineStats", Dict]) -> None:
+        """
+        Adds the counts of another PipelineStats, or of its to_dict(), e.g.
+        one collected in a worker process.
+        """
+        data = other.to_dict() if isinstance(other, PipelineStats) else other
+        with self._lock:
+            for target, values in ((self.stages, data.get("stages", {})), (self.blocks, data.get("blocks", {}))):
+                for name, value in values.items():
+                    entry = target.setdefault(name, [0, 0.0, 0])
+                    entry[0] += value["calls"] if "calls" in value else value["count"]
+                    entry[1] += value["seconds"]
+                    entry[2] += value["bytes"]
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stages = {}
+            self.blocks = {}
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                "stages": {name: {"calls": calls, "seconds": seconds, "bytes": nbytes}
+                           for name, (calls, seconds, nbytes) in self.stages.items()},
+                "blocks": {kind: {"count": count, "seconds": seconds, "bytes": nbytes}
+                           for kind, (count, seconds, nbytes) in self.blocks.items()},
+            }
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def to_prometheus(self, prefix: str = "papermill_markdown") -> str:
+        """
+        The counters in the Prometheus text exposition format.
+        """
+        data = self.to_dict()
+        lines = []
+        for name, label, values, key, help_text in (
+            ("stage_calls_total", "stage", data["stages"], "calls", "Calls per pipeline stage."),
+            ("stage_seconds_total", "stage", data["stages"], "seconds", "Wall time per pipeline stage."),
+            ("stage_bytes_total", "stage", data["stages"], "bytes", "Bytes processed per pipeline stage."),
+            ("blocks_total", "type", data["blocks"], "count", "Blocks converted per type."),
+            ("block_seconds_total", "type", data["blocks"], "seconds", "Wall time per block type."),
+            ("block_bytes_total", "type", data["blocks"], "bytes", "Source bytes per block type."),
+        ):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            for item, value in sorted(values.items()):
+                lines.append(f'{prefix}_{name}{{{label}="{item}"}} {value[key]}')
+        return "\n".join(lines) + "\n"
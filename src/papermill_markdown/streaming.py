@@ -0,0 +1,226 @@
+# src/papermill_markdown/streaming.py
+
+"""
+Incremental conversion of Markdown that arrives in chunks, e.g. streamed from
+an LLM. Finished block elements are returned as soon as their boundaries are
+known, so validation and payload assembly can start before the document ends.
+"""
+
+import os
+import re
+from collections import deque
+from typing import List, Dict, Optional, Iterable, Iterator, Union
+
+from .converter import MarkdownToPapermill, _FootnoteExtractor, _NEED_LINE, _END_OF_INPUT
+
+CHUNK_SIZE = 1 << 16
+# Encoded images kept for deduplication by a stream (see ImageDeduplicator).
+DEDUPE_BYTES = 4 * 1024 * 1024
+
+
+class StreamingConverter:
+    FOOTNOTE_ID_PATTERN = re.compile(r'\d+')
+
+    def __init__(self, converter: Optional[MarkdownToPapermill] = None, footnotes: Optional[Dict[str, str]] = None,
+                 dedupe_bytes: Optional[int] = DEDUPE_BYTES):
+        """
+        Initialize the stream. Inline processing uses the given converter's
+        options; a default MarkdownToPapermill is used if none is given.
+
+        If the document's footnote definitions are already known (see
+        collect_footnotes), pass them as footnotes: paragraphs are then never
+        held back waiting for a definition.
+
+        With the converter's dedupe_images, the encoded images kept to share
+        between repeated occurrences are limited to dedupe_bytes, least
+        recently used first out, so a long stream of images is not held in
+        memory after its blocks are emitted. None keeps them all, as
+        convert() does.
+        """
+        self.converter = converter or MarkdownToPapermill()
+        self.footnotes = footnotes if footnotes is not None else {}
+        self.closed = False
+        self._footnotes_known = footnotes is not None
+        self._partial = ""  # text after the last newline seen
+        self._extractor = _FootnoteExtractor(self.converter)
+        self._held = deque()  # raw blocks waiting for footnote definitions
+        self._image_dedup = self.converter._new_image_deduplicator(dedupe_bytes)
+        self._scanner = self.converter._scan_blocks()
+        self._request = next(self._scanner)
+
+    def feed(self, chunk: str) -> List[Dict]:
+        """
+        Add a chunk of Markdown and return the block elements it completed.
+
+        Blocks are returned in document order. A block is held back while it
+        needs more input: an open ``` or $$ fence, a paragraph until its
+        closing line, a table until the two lines after it have been checked
+        for a caption, and a paragraph referencing a footnote that has not
+        been defined yet (along with every block after it). A footnote that
+        is defined twice resolves to the definition seen when the paragraph
+        is released, whereas convert() uses the last one in the document.
+        """
+        if self.closed:
+            raise ValueError("Cannot feed a closed stream.")
+        lines = (self._partial + chunk).split('\n')
+        self._partial = lines.pop()
+        out = []
+        for line in lines:
+            self._push_line(line, out)
+        return out
+
+    def close(self) -> List[Dict]:
+        """
+        Signal the end of the input and return the remaining block elements.
+        The concatenation of every feed() and close() result equals
+        MarkdownToPapermill.convert() on the whole text.
+        """
+        if self.closed:
+            return []
+        out = []
+        self._push_line(self._partial, out)
+        self._partial = ""
+        self._flush_carry(out)
+        self._send(_END_OF_INPUT, out)
+        self.closed = True
+        self._release(out)
+        if self._image_dedup is not None:
+            self.converter.image_report = self._image_dedup.report()
+        return out
+
+    def _push_line(self, line: str, out: List[Dict]) -> None:
+        self._send_lines(self._extractor.push(line), out)
+
+    def _flush_carry(self, out: List[Dict]) -> None:
+        self._send_lines(self._extractor.flush(), out)
+
+    def _send_lines(self, lines: List[str], out: List[Dict]) -> None:
+        if not lines:
+            return
+        if not self._footnotes_known:
+            self.footnotes.update(self._extractor.footnotes)
+        for line in lines:
+            self._send(line, out)
+        self._release(out)
+
+    def _send(self, line, out: List[Dict]) -> None:
+        """
+        Hands one line (or _END_OF_INPUT) to the scanner and collects the raw
+        blocks it completes.
+        """
+        try:
+            self._request = self._scanner.send(line)
+            while self._request is not _NEED_LINE:
+                self._held.append(self._request)
+                self._request = next(self._scanner)
+        except StopIteration:
+            self._request = None
+
+    def _release(self, out: List[Dict]) -> None:
+        while self._held:
+            block = self._held[0]
+            if (not self.closed and not self._footnotes_known
+                    and block[0] == "paragraph" and not self._footnotes_ready(block[1])):
+                break
+            self._held.popleft()
+            self.converter.footnotes = self.footnotes
+            self.converter._image_dedup = self._image_dedup
+            try:
+                out.append(self.converter._build_block(block))
+            finally:
+                self.converter._image_dedup = None
+
+    def _footnotes_ready(self, text: str) -> bool:
+        # Mirrors the footnote lookup in MarkdownToPapermill._process_paragraph.
+        for part in text.split("__FOOTNOTE__"):
+            if "__" in part:
+                fid = part.split("__", 1)[0]
+                if self.FOOTNOTE_ID_PATTERN.fullmatch(fid) and fid not in self.footnotes:
+                    return False
+        return True
+
+
+def collect_footnotes(chunks: Iterable[str], converter: Optional[MarkdownToPapermill] = None) -> Dict[str, str]:
+    """
+    Returns the footnote definitions of a document given as text chunks,
+    exactly as MarkdownToPapermill.convert() would collect them, without
+    holding the document in memory.
+    """
+    extractor = _FootnoteExtractor(converter or MarkdownToPapermill())
+    for line in _split_lines(chunks):
+        extractor.push(line)
+    extractor.flush()
+    return extractor.footnotes
+
+
+def iter_convert(source: Union[str, os.PathLike, Iterable[str]],
+                 converter: Optional[MarkdownToPapermill] = None,
+                 chunk_size: int = CHUNK_SIZE, dedupe_bytes: Optional[int] = DEDUPE_BYTES) -> Iterator[Dict]:
+    """
+    Generator version of MarkdownToPapermill.convert() that yields one block
+    element at a time instead of building the whole result.
+
+    source may be:
+      - a file path, read in chunks of chunk_size characters;
+      - a text stream (anything with read()), read the same way;
+      - an iterable of lines, with or without trailing newlines, treated as
+        the lines of "\\n".join(lines).
+
+    Files and seekable streams are read twice: a first pass collects the
+    footnote definitions so that no paragraph has to wait for them, keeping
+    memory to roughly one block at a time. Other sources are read once, and
+    a paragraph referencing a footnote defined later is held (with the
+    blocks after it) until the definition is seen. dedupe_bytes bounds the
+    images kept for deduplication, as for StreamingConverter.
+    """
+    converter = converter or MarkdownToPapermill()
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'r', encoding='utf-8') as f:
+            yield from _iter_convert_stream(f, converter, chunk_size, dedupe_bytes)
+    elif hasattr(source, 'read'):
+        yield from _iter_convert_stream(source, converter, chunk_size, dedupe_bytes)
+    else:
+        yield from _iter_convert_chunks(_join_lines(source), StreamingConverter(converter, dedupe_bytes=dedupe_bytes))
+
+
+def _iter_convert_stream(f, converter: MarkdownToPapermill, chunk_size: int,
+                         dedupe_bytes: Optional[int]) -> Iterator[Dict]:
+    footnotes = None
+    seekable = getattr(f, 'seekable', None)
+    if seekable is not None and seekable():
+        start = f.tell()
+        footnotes = collect_footnotes(_read_chunks(f, chunk_size), converter)
+        f.seek(start)
+    yield from _iter_convert_chunks(_read_chunks(f, chunk_size), StreamingConverter(converter, footnotes, dedupe_bytes))
+
+
+def _iter_convert_chunks(chunks: Iterable[str], stream: StreamingConverter) -> Iterator[Dict]:
+    for chunk in chunks:
+        yield from stream.feed(chunk)
+    yield from stream.close()
+
+
+def _read_chunks(f, chunk_size: int) -> Iterator[str]:
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def _join_lines(lines: Iterable[str]) -> Iterator[str]:
+    # Yields the chunks of "\n".join(lines), dropping one trailing newline per line.
+    for i, line in enumerate(lines):
+        if line.endswith('\n'):
+            line = line[:-1]
+        yield line if i == 0 else '\n' + line
+
+
+def _split_lines(chunks: Iterable[str]) -> Iterator[str]:
+    # Yields the lines of "".join(chunks).split("\n").
+    partial = ""
+    for chunk in chunks:
+        lines = (partial + chunk).split('\n')
+        partial = lines.pop()
+        yield from lines
+    yield partial
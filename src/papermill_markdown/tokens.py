@@ -0,0 +1,141 @@
+# src/papermill_markdown/tokens.py
+
+"""
+Slotted inline tokens used by MarkdownToPapermill(token_objects=True) in place
+of one dict per token. Formatting is held as a tuple of flag names, interned
+so every token with the same combination shares one tuple. Tokens become
+Papermill dicts only when serialised: writer.write_json and to_dicts() give
+the same JSON, key order included, as the dict output.
+"""
+
+from typing import Any, Dict, Tuple
+
+_FLAG_CACHE = {(): ()}
+_COMBINED_CACHE = {}
+
+
+def flags(*names: str) -> Tuple[str, ...]:
+    """
+    The interned tuple for the given flag names, in order.
+    """
+    try:
+        return _FLAG_CACHE[names]
+    except KeyError:
+        return _FLAG_CACHE.setdefault(names, names)
+
+
+def combine_flags(outer: Tuple[str, ...], inner: Tuple[str, ...]) -> Tuple[str, ...]:
+    """
+    Flags of a token formatted by inner nested inside outer. The order follows
+    the keys of dict(outer) updated with the inner token: outer first.
+    """
+    if not inner or inner is outer:
+        return outer
+    if not outer:
+        return inner
+    key = (outer, inner)
+    try:
+        return _COMBINED_CACHE[key]
+    except KeyError:
+        combined = flags(*outer, *(name for name in inner if name not in outer))
+        return _COMBINED_CACHE.setdefault(key, combined)
+
+
+class InlineToken:
+    __slots__ = ("flags",)
+    type = None
+    FIELDS = ()
+
+    def with_flags(self, outer: Tuple[str, ...]) -> "InlineToken":
+        token = object.__new__(type(self))
+        for name in self.FIELDS:
+            setattr(token, name, getattr(self, name))
+        token.flags = combine_flags(outer, self.flags)
+        return token
+
+    def to_dict(self) -> Dict[str, Any]:
+        out = dict.fromkeys(self.flags, True)
+        if self.type is not None:
+            out["type"] = self.type
+        for name in self.FIELDS:
+            value = getattr(self, name)
+            if value is not None:
+                out[name] = value
+        return out
+
+    def __eq__(self, other: Any) -> bool:
+        return type(other) is type(self) and self.flags == other.flags and all(
+            getattr(self, name) == getattr(other, name) for name in self.FIELDS
+        )
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class Text(InlineToken):
+    """FormattedText: text with formatting flags and an optional link."""
+    __slots__ = ("text", "url")
+    FIELDS = ("text", "url")
+
+    def __init__(self, text: str, flags: Tuple[str, ...] = (), url: str = None):
+        self.text = text
+        self.url = url
+        self.flags = flags
+
+
+class Equation(InlineToken):
+    __slots__ = ("equation",)
+    type = "equation"
+    FIELDS = ("equation",)
+
+    def __init__(self, equation: str, flags: Tuple[str, ...] = ()):
+        self.equation = equation
+        self.flags = flags
+
+
+class CrossReference(InlineToken):
+    __slots__ = ("ref", "label")
+    type = "crossReference"
+    FIELDS = ("ref", "label")
+
+    def __init__(self, ref: str, label: str, flags: Tuple[str, ...] = ()):
+        self.ref = ref
+        self.label = label
+        self.flags = flags
+
+
+class Reference(InlineToken):
+    __slots__ = ("ref",)
+    type = "reference"
+    FIELDS = ("ref",)
+
+    def __init__(self, ref: str, flags: Tuple[str, ...] = ()):
+        self.ref = ref
+        self.flags = flags
+
+
+class Footnote(InlineToken):
+    __slots__ = ("text",)
+    type = "footnote"
+    FIELDS = ("text",)
+
+    def __init__(self, text: str, flags: Tuple[str, ...] = ()):
+        self.text = text
+        self.flags = flags
+
+
+def to_dicts(value: Any) -> Any:
+    """
+    Converts tokens anywhere in a document, element or token list into
+    Papermill dicts, e.g. before validating with DocumentContent. Lists and
+    dicts are copied; other values are returned as they are.
+    """
+    if isinstance(value, InlineToken):
+        return value.to_dict()
+    if isinstance(value, list):
+        return [to_dicts(item) for item in value]
+    if isinstance(value, dict):
+        return {key: to_dicts(item) for key, item in value.items()}
+    return value
@@ -1,7 +1,9 @@
 # src/papermill_markdown/validator.py
 
-from pydantic import RootModel, BaseModel, Field, model_validator
-from typing import List, Union, Literal, Optional, Dict
+import time
+from functools import lru_cache
+from pydantic import RootModel, BaseModel, Discriminator, Field, Tag, TypeAdapter, ValidationError, model_validator
+from typing import Annotated, Any, Iterable, List, NamedTuple, Union, Literal, Optional, Dict
 
 # ==================
 # 1) Add a new ReferenceObject and top-level references property
@@ -58,14 +60,59 @@ class ReferenceInline(BaseModel):
     type: Literal["reference"]
     ref: str
 
+# ==================
+# Unions dispatch on the shape of the value and its "type", so each node is
+# validated against one model rather than every member in turn.
+# ==================
+def _content_tag(value: Any) -> Optional[str]:
+    if isinstance(value, str):
+        return "str"
+    if isinstance(value, list):
+        return "list"
+    if isinstance(value, dict):
+        return value.get("type", "text")
+    if isinstance(value, FormattedText):
+        return "text"
+    return getattr(value, "type", None)
+
+
 # Union for inline text content
-TextContent = Union[str, FormattedText, CrossReference, Footnote, Code, Equation, ReferenceInline]
+TextContent = Annotated[
+    Union[
+        Annotated[str, Tag("str")],
+        Annotated[FormattedText, Tag("text")],
+        Annotated[CrossReference, Tag("crossReference")],
+        Annotated[Footnote, Tag("footnote")],
+        Annotated[Code, Tag("code")],
+        Annotated[Equation, Tag("equation")],
+        Annotated[ReferenceInline, Tag("reference")],
+    ],
+    Discriminator(_content_tag),
+]
+
+# Plain text, or a list of inline elements
+RichText = Annotated[
+    Union[Annotated[str, Tag("str")], Annotated[List[TextContent], Tag("list")]],
+    Discriminator(_content_tag),
+]
 
 # A cell in the table can be:
 # - a simple string,
 # - a single inline element (Equation, Footnote, FormattedText, etc.),
 # - or a list of inline elements
-CellContent = Union[str, TextContent, List[TextContent]]
+CellContent = Annotated[
+    Union[
+        Annotated[str, Tag("str")],
+        Annotated[List[TextContent], Tag("list")],
+        Annotated[FormattedText, Tag("text")],
+        Annotated[CrossReference, Tag("crossReference")],
+        Annotated[Footnote, Tag("footnote")],
+        Annotated[Code, Tag("code")],
+        Annotated[Equation, Tag("equation")],
+        Annotated[ReferenceInline, Tag("reference")],
+    ],
+    Discriminator(_content_tag),
+]
 
 # Block element models
 class Heading(BaseModel):
@@ -77,7 +124,7 @@ class Heading(BaseModel):
 
 class Paragraph(BaseModel):
     type: Literal["paragraph"]
-    text: Union[str, List[TextContent]]
+    text: RichText
     style: Optional[str] = None  # e.g. "preview"
 
 class Image(BaseModel):
@@ -91,24 +138,27 @@ class Table(BaseModel):
     type: Literal["table"]
     header: List[CellContent]
     body: List[List[CellContent]]
-    caption: Optional[Union[str, List[TextContent]]] = None
+    caption: Optional[RichText] = None
     transpose: Optional[bool] = None
 
 class DocumentList(BaseModel):
     type: Literal["list"]
     style: Literal["bullet", "number"]
-    items: List[Union[str, List[TextContent]]]
-
-# Union of all document elements
-DocumentElement = Union[
-    Heading,
-    Paragraph,
-    Image,
-    Table,
-    DocumentList,
-    Equation,
-    Code,
-    Break
+    items: List[RichText]
+
+# Union of all document elements, selected by their "type"
+DocumentElement = Annotated[
+    Union[
+        Heading,
+        Paragraph,
+        Image,
+        Table,
+        DocumentList,
+        Equation,
+        Code,
+        Break
+    ],
+    Field(discriminator="type"),
 ]
 
 # ==================
@@ -118,7 +168,7 @@ DocumentElement = Union[
 # ==================
 class DocumentContent(RootModel[List[DocumentElement]]):
     def get_elements(self) -> List[DocumentElement]:
-        return self.__root__
+        return self.root
 
 
 # NEW/UPDATED: an optional top-level model if desired:
@@ -127,3 +177,134 @@ class DocumentModel(BaseModel):
     references: Optional[Dict[str, ReferenceObject]] = None
     # The main content
     documentContent: DocumentContent
+
+
+# ==================
+# Bulk validation, e.g. for batch jobs over many payloads
+# ==================
+class ValidationResult(NamedTuple):
+    value: Any  # the validated model (or its dump), None if invalid
+    errors: Optional[List[Dict]]  # pydantic error dicts, None if valid
+
+
+@lru_cache(maxsize=None)
+def _adapter(model) -> TypeAdapter:
+    return TypeAdapter(model)
+
+
+def validate_documents(documents: Iterable[Union[str, bytes, List, Dict]],
+                       model=DocumentContent, dump: bool = False, stats=None) -> List[ValidationResult]:
+    """
+    Validates many payloads against model (DocumentContent, DocumentModel or
+    any other model here), reusing one TypeAdapter per model. A str or bytes
+    document is parsed as JSON by pydantic directly, anything else is taken
+    as already-parsed data.
+
+    Returns one ValidationResult per document, in order. Invalid documents,
+    including malformed JSON, get their errors instead of raising, so one bad
+    payload does not stop the batch. With dump=True the values are
+    model_dump()-ed into plain data.
+
+    stats: optional stats.PipelineStats recording a "validate" stage per
+        document (with its size in bytes for str and bytes input).
+    """
+    adapter = _adapter(model)
+    results = []
+    for document in documents:
+        if stats is None:
+            results.append(_validate_one(adapter, document, dump))
+            continue
+        start = time.perf_counter()
+        results.append(_validate_one(adapter, document, dump))
+        if isinstance(document, str):
+            size = len(document.encode("utf-8"))
+        else:
+            size = len(document) if isinstance(document, (bytes, bytearray)) else 0
+        stats.record("validate", time.perf_counter() - start, size)
+    return results
+
+
+def _validate_one(adapter: TypeAdapter, document: Union[str, bytes, List, Dict], dump: bool) -> ValidationResult:
+    try:
+        if isinstance(document, (str, bytes, bytearray)):
+            value = adapter.validate_json(document)
+        else:
+            value = adapter.validate_python(document)
+    except ValidationError as e:
+        return ValidationResult(None, e.errors(include_url=False))
+    return ValidationResult(adapter.dump_python(value) if dump else value, None)
+
+
+# ==================
+# 4) Trusted output: MarkdownToPapermill(schema_output=True) builds each
+#    element in the form DocumentContent.model_validate(...).model_dump()
+#    gives, without going through the models. Field names, order and
+#    defaults are taken from the models above.
+# ==================
+_REQUIRED = object()
+
+
+def _field_defaults(model) -> List[tuple]:
+    return [
+        (name, _REQUIRED if field.is_required() else field.default)
+        for name, field in model.model_fields.items()
+    ]
+
+
+_INLINE_FIELDS = {
+    tag: _field_defaults(model)
+    for tag, model in [
+        ("text", FormattedText), ("crossReference", CrossReference), ("footnote", Footnote),
+        ("code", Code), ("equation", Equation), ("reference", ReferenceInline),
+    ]
+}
+_ELEMENT_FIELDS = {
+    model.model_fields["type"].annotation.__args__[0]: _field_defaults(model)
+    for model in [Heading, Paragraph, Image, Table, DocumentList, Equation, Code, Break]
+}
+
+
+def _dump_fields(value: Dict, fields: List[tuple]) -> Dict:
+    out = {}
+    for name, default in fields:
+        if name in value:
+            out[name] = value[name]
+        elif default is _REQUIRED:
+            raise ValueError(f"{value.get('type', 'text')} element is missing required field '{name}': {value}")
+        else:
+            out[name] = default
+    return out
+
+
+def _dump_inline(value: Any) -> Any:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, list):
+        return [_dump_inline(item) for item in value]
+    return _dump_fields(value, _INLINE_FIELDS[_content_tag(value)])
+
+
+def dump_element(element: Dict) -> Dict:
+    """
+    The dict DocumentContent.model_validate([element]).model_dump() holds for
+    an element produced by MarkdownToPapermill: unset optional fields are
+    filled with their defaults and keys the model does not define are
+    dropped. Values are not checked, so this is only for trusted input; a
+    missing required field raises ValueError.
+    """
+    kind = element.get("type")
+    if kind not in _ELEMENT_FIELDS:
+        raise ValueError(f"Unknown element type {kind!r}: {element}")
+    out = _dump_fields(element, _ELEMENT_FIELDS[kind])
+    if kind == "paragraph":
+        out["text"] = _dump_inline(out["text"])
+    elif kind == "list":
+        out["items"] = [_dump_inline(item) for item in out["items"]]
+    elif kind == "table":
+        out["header"] = [_dump_inline(cell) for cell in out["header"]]
+        out["body"] = [[_dump_inline(cell) for cell in row] for row in out["body"]]
+        if out["caption"] is not None:
+            out["caption"] = _dump_inline(out["caption"])
+    elif kind == "image" and out["caption"] is not None:
+        out["caption"] = _dump_inline(out["caption"])
+    return out
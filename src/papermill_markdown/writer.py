@@ -0,0 +1,70 @@
+# src/papermill_markdown/writer.py
+
+"""
+Serialisation of converted documents to JSON without first building the
+whole document, or the encoded images in it, in memory.
+"""
+
+import json
+import re
+import uuid
+from typing import Dict, Iterable, TextIO
+
+from .images import ImageReference
+from .tokens import InlineToken
+
+
+def write_json(elements: Iterable[Dict], fp: TextIO, **kwargs) -> int:
+    """
+    Write block elements to fp as a JSON array, one element at a time, so a
+    generator such as MarkdownToPapermill.iter_convert() is consumed lazily.
+    Keyword arguments are passed to json.dumps for each element; without
+    them the output is identical to json.dump(list(elements), fp).
+
+    ImageReference values (from MarkdownToPapermill(lazy_images=True)) are
+    written as their data: URI, base64-encoding the file in chunks straight
+    into fp. Inline token objects (from token_objects=True) are written as
+    their Papermill dicts.
+
+    Returns the number of elements written.
+    """
+    count = 0
+    fp.write("[")
+    for element in elements:
+        if count:
+            fp.write(", ")
+        _write_element(element, fp, kwargs)
+        count += 1
+    fp.write("]")
+    return count
+
+
+def _write_element(element: Dict, fp: TextIO, kwargs: Dict) -> None:
+    images = []
+    marker = f"papermill-image-{uuid.uuid4().hex}-"
+    user_default = kwargs.get("default")
+
+    def default(obj):
+        if isinstance(obj, InlineToken):
+            return obj.to_dict()
+        if isinstance(obj, ImageReference):
+            images.append(obj)
+            return f"{marker}{len(images) - 1}"
+        if user_default is not None:
+            return user_default(obj)
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+    text = json.dumps(element, **{**kwargs, "default": default})
+    if not images:
+        fp.write(text)
+        return
+
+    # Data URIs need no JSON escaping, so each image is streamed between quotes.
+    pos = 0
+    for m in re.finditer(f'"{marker}(\\d+)"', text):
+        fp.write(text[pos:m.start()])
+        fp.write('"')
+        images[int(m.group(1))].write_data_uri(fp)
+        fp.write('"')
+        pos = m.end()
+    fp.write(text[pos:])
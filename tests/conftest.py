@@ -0,0 +1,44 @@
+# tests/conftest.py
+
+import os
+import random
+import sys
+
+# Run against the source tree without installing the package.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+
+def sample_document() -> str:
+    with open(os.path.join(DATA_DIR, "test.md"), encoding="utf-8") as f:
+        return f.read()
+
+
+INLINE = ["plain", "**bold**", "*italic*", "***both***", "__under__", "^sup^", "~sub~", "<sup>s</sup>",
+          "<sub>s</sub>", "$x^2$", "[link](http://a.b)", "[ref:fig1]", "[ref:tab1 label=Table]", "[^1]", "[^2]",
+          "*", "$", "[", " ", "é"]
+
+BLOCKS = [
+    lambda line: f"# {line}",
+    lambda line: f"### {line} [ref:sec]",
+    lambda line: line,
+    lambda line: f"- {line}\n- {line}",
+    lambda line: f"1. {line}\n2. {line}",
+    lambda line: f"Table 1: {line}\n| a | b |\n|---|---|\n| {line} | x |",
+    lambda line: f"| {line} |\n|---|\n| {line} |\n\nTable 2 - {line}",
+    lambda line: "$$\nx = 1\n$$",
+    lambda line: f"```\n{line}\n```",
+    lambda line: f'![{line}](http://a.b/c.png "caption=C, ref=fig1, width=50")',
+    lambda line: "---",
+]
+
+
+def random_document(rng: random.Random) -> str:
+    """A document mixing every block type with inline formatting, references and footnotes."""
+    blocks = []
+    for _ in range(rng.randint(1, 12)):
+        line = "".join(rng.choice(INLINE) for _ in range(rng.randint(0, 8)))
+        blocks.append(rng.choice(BLOCKS)(line))
+    blocks.append("[^1]: First note.\n[^2]: Second **note**.")
+    return "\n\n".join(blocks)
@@ -0,0 +1,64 @@
+# tests/test_cli.py
+
+"""
+The papermill-markdown command: where outputs go, and how failures are reported.
+"""
+
+import json
+import os
+
+import pytest
+
+from papermill_markdown import cli
+
+
+def write(path, text="# Title\n\nSome **bold** text.\n"):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+
+
+def test_glob_keeps_relative_paths(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write(tmp_path / "reports" / "a" / "index.md")
+    write(tmp_path / "reports" / "b" / "index.md", "# Other\n")
+    assert cli.main(["reports/**/*.md", "-o", "build", "-j", "1", "-q"]) == 0
+    assert json.loads((tmp_path / "build" / "a" / "index.json").read_text())[0]["text"] == "Title"
+    assert json.loads((tmp_path / "build" / "b" / "index.json").read_text())[0]["text"] == "Other"
+
+
+def test_same_file_twice_is_converted_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write(tmp_path / "docs" / "a.md")
+    tasks = cli._collect_tasks(["docs", "./docs/a.md", "docs/*.md"], "build")
+    assert tasks == [(os.path.join("docs", "a.md"), os.path.join("build", "a.json"))]
+
+
+def test_colliding_destinations_fail(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    write(tmp_path / "x" / "index.md")
+    write(tmp_path / "y" / "index.md")
+    with pytest.raises(ValueError):
+        cli._collect_tasks(["x", "y"], "build")
+    assert cli.main(["x", "y", "-o", "build", "-j", "1"]) == 2
+    assert "would both be written" in capsys.readouterr().err
+    assert not (tmp_path / "build").exists()
+
+
+def test_failures_are_isolated(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write(tmp_path / "docs" / "good.md")
+    write(tmp_path / "docs" / "bad.md", "![missing](missing.png)\n")
+    assert cli.main(["docs", "-o", "build", "-j", "2", "-q"]) == 1
+    assert (tmp_path / "build" / "good.json").exists()
+    assert not (tmp_path / "build" / "bad.json").exists()
+
+
+def test_broken_pool_reports_remaining_files():
+    def results():
+        yield cli._new_result("a.md")
+        raise cli.BrokenProcessPool("worker died")
+
+    tasks = [("a.md", "a.json"), ("b.md", "b.json"), ("c.md", "c.json")]
+    summary = cli._summarise(cli._survive_broken_pool(results(), tasks), quiet=True)
+    assert summary["converted"] == 1
+    assert [src for src, _ in summary["failures"]] == ["b.md", "c.md"]
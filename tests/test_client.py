@@ -0,0 +1,155 @@
+# tests/test_client.py
+
+"""
+PapermillClient against a local stub of the API: payloads, retries and
+backoff, the bound on requests in flight, and slots given back when an
+async submission is cancelled.
+"""
+
+import asyncio
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from papermill_markdown import MarkdownToPapermill, PapermillClient
+from papermill_markdown.client import build_payload
+
+DOCUMENT = MarkdownToPapermill().convert("# Title\n\nSome **bold** text.")
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.responses = []  # (status, headers) for the next requests; 200 after
+        self.requests = []  # (headers, payload)
+        self.delay = 0.0
+        self.gate = threading.Event()
+        self.gate.set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}/documents"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self) -> None:
+        server = self.server
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with server.lock:
+            server.requests.append((dict(self.headers), payload))
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            status, headers = server.responses.pop(0) if server.responses else (200, {})
+        time.sleep(server.delay)
+        server.gate.wait()
+        with server.lock:
+            server.in_flight -= 1
+        body = json.dumps({"layoutId": payload["layoutId"]}).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def stub():
+    server = StubServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.gate.set()
+    server.shutdown()
+    server.server_close()
+
+
+def test_submit(stub):
+    with PapermillClient(stub.url, "secret") as client:
+        result = client.submit(DOCUMENT, "layout", {"title": "T"}, key="doc").result()
+    assert (result.key, result.status, result.body, result.error, result.attempts) == \
+        ("doc", 200, {"layoutId": "layout"}, None, 1)
+    headers, payload = stub.requests[0]
+    assert headers["Authorization"] == "Bearer secret"
+    assert payload == build_payload(DOCUMENT, "layout", {"title": "T"})
+    assert result.timings["bytes"] == int(headers["Content-Length"])
+
+
+def test_retries_with_retry_after(stub):
+    stub.responses = [(503, {"Retry-After": "0.2"}), (429, {"Retry-After": "0"})]
+    with PapermillClient(stub.url, "secret", backoff=5) as client:
+        result = client.submit(DOCUMENT, "layout").result()
+    assert (result.status, result.error, result.attempts) == (200, None, 3)
+    assert 0.2 <= result.timings["backoff"] < 1
+    assert [payload for _, payload in stub.requests] == [stub.requests[0][1]] * 3
+
+
+def test_gives_up(stub):
+    stub.responses = [(503, {})] * 3 + [(400, {})]
+    with PapermillClient(stub.url, "secret", retries=2, backoff=0.01) as client:
+        result = client.submit(DOCUMENT, "layout").result()
+        assert (result.status, result.error, result.attempts) == (503, "HTTP 503: Service Unavailable", 3)
+        result = client.submit(DOCUMENT, "layout").result()
+        assert (result.status, result.attempts) == (400, 1)
+        invalid = client.submit([{"type": "nope"}], "layout").result()
+        assert invalid.attempts == 0 and invalid.error.startswith("ValidationError")
+
+
+def test_connection_errors_are_retried():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    with PapermillClient(f"http://127.0.0.1:{port}/", "secret", retries=2, backoff=0.01) as client:
+        result = client.submit(DOCUMENT, "layout").result()
+    assert result.status is None and result.attempts == 3 and result.error.startswith("ConnectionError")
+
+
+def test_max_in_flight(stub):
+    stub.delay = 0.05
+    jobs = ({"document_content": DOCUMENT, "layout_id": f"layout{i}"} for i in range(20))
+    with PapermillClient(stub.url, "secret", max_in_flight=3) as client:
+        results = list(client.submit_many(jobs))
+    assert [result.key for result in results] == list(range(20))
+    assert [result.body["layoutId"] for result in results] == [f"layout{i}" for i in range(20)]
+    assert stub.max_in_flight == 3
+
+
+def test_cancelled_submit_async_releases_its_slot(stub):
+    stub.gate.clear()
+    with PapermillClient(stub.url, "secret", max_in_flight=1) as client:
+        async def run():
+            held = asyncio.ensure_future(client.submit_async(DOCUMENT, "held"))
+            while not stub.requests:
+                await asyncio.sleep(0.01)
+            waiting = asyncio.ensure_future(client.submit_async(DOCUMENT, "cancelled"))
+            await asyncio.sleep(0.05)
+            waiting.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiting
+            stub.gate.set()
+            assert (await held).status == 200
+            # The cancelled task's acquire takes the freed slot and gives it back.
+            try:
+                return await asyncio.wait_for(client.submit_async(DOCUMENT, "after"), 5)
+            except asyncio.TimeoutError:
+                client._slots.release()  # unblock the waiting thread so the loop can close
+                raise
+
+        assert asyncio.run(run()).body == {"layoutId": "after"}
+        assert client._slots.acquire(timeout=1)
+        client._slots.release()
+    assert [payload["layoutId"] for _, payload in stub.requests] == ["held", "after"]
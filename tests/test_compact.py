@@ -0,0 +1,98 @@
+# tests/test_compact.py
+
+"""
+Compaction must keep the rendered text and formatting, still validate,
+and report node counts and bytes for what it rewrote.
+"""
+
+import copy
+import random
+
+from conftest import random_document, sample_document
+from papermill_markdown import DocumentContent, MarkdownToPapermill
+from papermill_markdown.compact import COMPACTED_TYPES, compact_document, new_report
+
+
+def documents():
+    yield sample_document()
+    rng = random.Random(19)
+    for _ in range(200):
+        yield random_document(rng)
+
+
+def runs(value):
+    """Rich text as a list of (formatting, text) runs, merging equal neighbours."""
+    if isinstance(value, (str, dict)):
+        value = [value]
+    out = []
+    for token in value:
+        if isinstance(token, str):
+            token = {"text": token}
+        if "type" in token:
+            out.append((None, repr(sorted(token.items()))))
+            continue
+        flags = tuple(sorted((k, v) for k, v in token.items() if k != "text" and v))
+        if out and out[-1][0] == flags:
+            out[-1] = (flags, out[-1][1] + token["text"])
+        elif token["text"]:
+            out.append((flags, token["text"]))
+    return out
+
+
+def rendered(element):
+    kind = element["type"]
+    if kind == "paragraph":
+        return {**element, "text": runs(element["text"])}
+    if kind == "list":
+        return {**element, "items": [runs(item) for item in element["items"]]}
+    if kind == "table":
+        out = {**element, "header": [runs(cell) for cell in element["header"]],
+               "body": [[runs(cell) for cell in row] for row in element["body"]]}
+        if isinstance(element.get("caption"), list):
+            out["caption"] = runs(element["caption"])
+        return out
+    return element
+
+
+def test_renders_the_same():
+    plain = MarkdownToPapermill()
+    compact = MarkdownToPapermill(compact=True)
+    for text in documents():
+        expected = plain.convert(text)
+        document = compact.convert(text)
+        assert [rendered(e) for e in document] == [rendered(e) for e in expected]
+        DocumentContent.model_validate(document)
+
+
+def test_matches_compact_document():
+    plain = MarkdownToPapermill()
+    compact = MarkdownToPapermill(compact=True)
+    for text in documents():
+        document = plain.convert(text)
+        original = copy.deepcopy(document)
+        compacted, report = compact_document(document)
+        assert document == original
+        assert compact.convert(text) == compacted
+        assert compact.compact_report == report
+
+
+def test_report():
+    plain = MarkdownToPapermill()
+    compact = MarkdownToPapermill(compact=True)
+    total = new_report()
+    for text in documents():
+        compact.convert(text)
+        for key, value in compact.compact_report.items():
+            total[key] += value
+        unchanged = [e for e in plain.convert(text) if e["type"] not in COMPACTED_TYPES]
+        assert [e for e in compact.convert(text) if e["type"] not in COMPACTED_TYPES] == unchanged
+    assert 0 < total["nodes_after"] < total["nodes_before"]
+    assert 0 < total["bytes_after"] < total["bytes_before"]
+
+
+def test_merges_tokens():
+    converter = MarkdownToPapermill(compact=True)
+    [element] = converter.convert("Plain **bold****more** text")
+    assert element["text"] == ["Plain ", {"bold": True, "text": "boldmore"}, " text"]
+    [element] = converter.convert("Just text")
+    assert element["text"] == "Just text"
@@ -0,0 +1,92 @@
+# tests/test_concurrency.py
+
+"""
+One MarkdownToPapermill shared by many threads and asyncio tasks must give
+every document the result, footnotes and reports of a serial conversion on
+a fresh converter.
+"""
+
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from papermill_markdown import MarkdownToPapermill
+
+OPTIONS = {"compact": True, "image_workers": 2}
+
+
+def make_documents(count: int, image_dir: str):
+    documents = []
+    for i in range(count):
+        image = os.path.join(image_dir, f"image{i % 7}.png")
+        notes = 1 + i % 5
+        lines = [f"# Document {i}", ""]
+        for j in range(notes):
+            lines += [f"Paragraph {j} of {i} with **bold {i}** and $x_{i}$ and a note[^{j + 1}].", ""]
+        lines += [f"![Figure {i}]({image})", "", f"![Again]({image})", ""]
+        lines += ["| A | B |", "|---|---|", f"| {i} | *{i}* |", ""]
+        lines += [f"[^{j + 1}]: Footnote {j + 1} of document {i}." for j in range(notes)]
+        documents.append("\n".join(lines))
+    return documents
+
+
+def convert_with_reports(converter: MarkdownToPapermill, text: str):
+    return converter.convert(text), dict(converter.footnotes), converter.image_report, converter.compact_report
+
+
+@pytest.fixture(scope="module")
+def documents(tmp_path_factory):
+    image_dir = tmp_path_factory.mktemp("images")
+    for k in range(7):
+        (image_dir / f"image{k}.png").write_bytes(bytes([k]) * (100 + k))
+    documents = make_documents(60, str(image_dir))
+    expected = [convert_with_reports(MarkdownToPapermill(**OPTIONS), text) for text in documents]
+    return documents, expected
+
+
+@pytest.fixture
+def fast_switching():
+    # Switch threads as often as possible to provoke interleaving.
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def test_threads_share_a_converter(documents, fast_switching):
+    documents, expected = documents
+    shared = MarkdownToPapermill(**OPTIONS)
+    work = documents * 3
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(lambda text: convert_with_reports(shared, text), work))
+    for i, result in enumerate(results):
+        assert result == expected[i % len(documents)]
+
+
+def test_convert_async(documents, fast_switching):
+    documents, expected = documents
+    shared = MarkdownToPapermill(**OPTIONS)
+
+    async def run():
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            return await asyncio.gather(*(shared.convert_async(text, pool) for text in documents))
+
+    assert asyncio.run(run()) == [content for content, _, _, _ in expected]
+
+
+def test_convert_async_reports(documents, fast_switching):
+    documents, expected = documents
+    shared = MarkdownToPapermill(**OPTIONS)
+
+    async def convert(text, pool):
+        content = await shared.convert_async(text, pool)
+        return content, dict(shared.footnotes), shared.image_report, shared.compact_report
+
+    async def run():
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            return await asyncio.gather(*(convert(text, pool) for text in documents))
+
+    assert asyncio.run(run()) == expected
@@ -0,0 +1,95 @@
+# tests/test_fast_lint.py
+
+"""
+lint(mode="fast") must report the same issues as mode="full", and its
+fixed text must convert to the same document, whether or not it skips
+mdformat.
+"""
+
+import random
+
+import mdformat
+import pytest
+
+from conftest import random_document, sample_document
+from papermill_markdown import MarkdownToPapermill
+from papermill_markdown.linter import MarkdownLinter
+
+# Lines mdformat escapes or restructures.
+HOSTILE = [
+    "- li__under__1)",
+    "a__b__c",
+    "a___b___c",
+    "__a",
+    "a_",
+    ")_. (",
+    "a***b***c",
+    "***a***",
+    "a**b",
+    "**x",
+    "x**",
+    "a ** b",
+    "*a**b*",
+    "(*__***bc",
+    "- **",
+    "# ****x,x.x",
+    "- 1)",
+    "- --",
+    "1. --",
+    "- - -",
+    "1. 1) )",
+]
+# Lines mdformat leaves alone, which fast mode must not send through it.
+CANONICAL = [
+    "Some *emphasis* and **strong** text, (*quoted*) too.",
+    "A snake_case_name and a_b_c.",
+    "- *Item* one",
+    "1. **Bold** item",
+    "# Heading with *emphasis*",
+    "## **Super^script^** **Sub~script~**",
+]
+TOKENS = ["^", "~", "$", "a", "bc", "1", ")", ".", ",", "(", "-", "*", "**", "***", "_", "__", "___", " ", " "]
+
+
+def random_line(rng: random.Random) -> str:
+    prefix = rng.choice(["", "- ", "1. ", "# "])
+    return prefix + "".join(rng.choice(TOKENS) for _ in range(rng.randint(1, 8)))
+
+
+def documents():
+    rng = random.Random(14)
+    docs = [sample_document()] + [random_document(rng) for _ in range(60)]
+    docs += [mdformat.text(doc) for doc in docs]
+    docs += HOSTILE + CANONICAL + [random_line(rng) for _ in range(1000)]
+    docs += [f"Intro paragraph.\n\n{line}\n\nClosing paragraph." for line in HOSTILE]
+    return docs
+
+
+def test_fast_matches_full():
+    converter = MarkdownToPapermill()
+    for text in documents():
+        fast = MarkdownLinter(text, mode="fast").lint()
+        full = MarkdownLinter(text).lint()
+        assert fast[:2] == full[:2], text
+        assert converter.convert(fast[2]) == converter.convert(full[2]), text
+
+
+@pytest.mark.parametrize("line", HOSTILE)
+def test_hostile_lines_are_formatted(line):
+    linter = MarkdownLinter(line, mode="fast")
+    assert linter.lint() == MarkdownLinter(line).lint()
+    assert linter.path == "mdformat"
+
+
+@pytest.mark.parametrize("line", CANONICAL)
+def test_canonical_lines_skip_mdformat(line):
+    linter = MarkdownLinter(line, mode="fast")
+    assert linter.lint() == MarkdownLinter(line).lint()
+    assert linter.path == "fast"
+
+
+def test_formatted_document_skips_mdformat():
+    text = MarkdownLinter(sample_document()).lint()[2]
+    linter = MarkdownLinter(text, mode="fast")
+    assert linter.lint() == MarkdownLinter(text).lint()
+    assert linter.path == "fast", linter.path_reason
@@ -0,0 +1,107 @@
+# tests/test_image_cache.py
+
+"""
+ImageCache must return what encode_image_file does, evict least recently
+used entries beyond max_bytes, and persist entries in its directory.
+"""
+
+import os
+
+import pytest
+
+from papermill_markdown import ImageCache, MarkdownToPapermill
+from papermill_markdown.images import encode_image_file
+
+
+@pytest.fixture
+def images(tmp_path):
+    paths = []
+    for i in range(4):
+        path = tmp_path / f"image{i}.png"
+        path.write_bytes(bytes([i]) * 300)
+        paths.append(str(path))
+    return paths
+
+
+def uri_size(path: str) -> int:
+    return len(encode_image_file(path))
+
+
+def test_hits_and_misses(images):
+    cache = ImageCache()
+    assert cache.data_uri(images[0]) == encode_image_file(images[0])
+    assert cache.data_uri(images[0]) == encode_image_file(images[0])
+    assert cache.stats() == {"hits": 1, "disk_hits": 0, "misses": 1, "evictions": 0, "entries": 1,
+                             "bytes": uri_size(images[0])}
+
+
+def test_lru_eviction(images):
+    cache = ImageCache(max_bytes=2 * uri_size(images[0]))
+    cache.data_uri(images[0])
+    cache.data_uri(images[1])
+    cache.data_uri(images[0])  # images[1] is now the least recently used
+    cache.data_uri(images[2])
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["entries"] == 2 and stats["bytes"] <= cache.max_bytes
+    cache.data_uri(images[0])
+    assert cache.stats()["hits"] == 2
+    cache.data_uri(images[1])
+    assert cache.stats()["misses"] == 4
+
+
+def test_oversized_entries_are_not_kept(images):
+    cache = ImageCache(max_bytes=10)
+    assert cache.data_uri(images[0]) == encode_image_file(images[0])
+    assert cache.stats()["entries"] == 0
+
+
+def test_stat_key_sees_changes(images):
+    cache = ImageCache()
+    cache.data_uri(images[0])
+    with open(images[0], "ab") as f:
+        f.write(b"more")
+    assert cache.data_uri(images[0]) == encode_image_file(images[0])
+    assert cache.stats()["misses"] == 2
+
+
+def test_content_key_shares_copies(images, tmp_path):
+    copy = tmp_path / "copy.png"
+    copy.write_bytes(open(images[0], "rb").read())
+    cache = ImageCache(key="content")
+    cache.data_uri(images[0])
+    assert cache.data_uri(str(copy)) == encode_image_file(images[0])
+    assert cache.stats()["hits"] == 1
+    with pytest.raises(ValueError):
+        ImageCache(key="name")
+
+
+def test_variants_are_separate(images):
+    cache = ImageCache()
+    cache.data_uri(images[0], "small", lambda path, data: "data:image/png;base64,c21hbGw=")
+    assert cache.data_uri(images[0]) == encode_image_file(images[0])
+    assert cache.data_uri(images[0], "small") == "data:image/png;base64,c21hbGw="
+    assert cache.stats()["entries"] == 2
+
+
+def test_disk_layer(images, tmp_path):
+    directory = tmp_path / "cache"
+    ImageCache(directory=str(directory)).data_uri(images[0])
+    assert len(os.listdir(directory)) == 1
+    cache = ImageCache(directory=str(directory))
+    assert cache.data_uri(images[0]) == encode_image_file(images[0])
+    assert cache.stats()["disk_hits"] == 1
+    cache.clear()
+    assert cache.stats()["entries"] == 0
+    cache.data_uri(images[0])
+    assert cache.stats()["disk_hits"] == 2
+    # No temporary files are left behind.
+    assert all(name.endswith(".uri") for name in os.listdir(directory))
+
+
+def test_converter_output_unchanged(images):
+    text = "\n\n".join(f"![Figure]({path})" for path in images + images)
+    expected = MarkdownToPapermill().convert(text)
+    cache = ImageCache()
+    for _ in range(2):
+        assert MarkdownToPapermill(image_cache=cache, dedupe_images=None).convert(text) == expected
+    assert cache.stats()["misses"] == len(images)
@@ -0,0 +1,81 @@
+# tests/test_image_dedup.py
+
+"""
+Deduplicating repeated images must not change the output, and
+ImageDeduplicator must count and forget entries as documented.
+"""
+
+import io
+import json
+import os
+
+import pytest
+
+from papermill_markdown import MarkdownToPapermill, write_json
+from papermill_markdown.images import ImageDeduplicator, encode_image_file
+
+
+@pytest.fixture
+def images(tmp_path):
+    logo = tmp_path / "logo.png"
+    logo.write_bytes(b"logo" * 100)
+    copy = tmp_path / "copy.png"
+    copy.write_bytes(b"logo" * 100)
+    other = tmp_path / "other.png"
+    other.write_bytes(b"other" * 100)
+    os.symlink(logo, tmp_path / "link.png")
+    return {name: str(tmp_path / f"{name}.png") for name in ("logo", "copy", "other", "link")}
+
+
+def test_path_mode(images):
+    dedup = ImageDeduplicator("path")
+    calls = []
+    encode = lambda path: calls.append(path) or encode_image_file(path)  # noqa: E731
+    for name in ("logo", "link", "copy", "logo", "other"):
+        assert dedup.get(images[name], encode) == encode_image_file(images[name])
+    assert calls == [images["logo"], images["copy"], images["other"]]
+    size = len(encode_image_file(images["logo"]))
+    assert dedup.report() == {"images": 5, "unique": 3, "duplicates": 2, "bytes_saved": 2 * size}
+
+
+def test_content_mode(images):
+    dedup = ImageDeduplicator("content")
+    calls = []
+    encode = lambda path: calls.append(path) or encode_image_file(path)  # noqa: E731
+    for name in ("logo", "copy", "other"):
+        dedup.get(images[name], encode)
+    assert calls == [images["logo"], images["other"]]
+    assert dedup.report()["duplicates"] == 1
+
+
+def test_variants(images):
+    dedup = ImageDeduplicator()
+    dedup.get(images["logo"], encode_image_file)
+    assert dedup.get(images["logo"], lambda path: "small", variant="small") == "small"
+    assert dedup.report()["unique"] == 2
+    with pytest.raises(ValueError):
+        ImageDeduplicator("name")
+
+
+def test_max_bytes_forgets_oldest(images):
+    size = len(encode_image_file(images["logo"]))
+    dedup = ImageDeduplicator(max_bytes=size)
+    calls = []
+    encode = lambda path: calls.append(path) or encode_image_file(path)  # noqa: E731
+    for name in ("logo", "logo", "other", "logo"):
+        dedup.get(images[name], encode)
+    assert calls == [images["logo"], images["other"], images["logo"]]
+    assert dedup.bytes <= size
+    assert dedup.report() == {"images": 4, "unique": 3, "duplicates": 1, "bytes_saved": size}
+
+
+@pytest.mark.parametrize("mode", ["path", "content"])
+def test_output_unchanged(images, mode):
+    text = "\n\n".join(f"![{name}]({path})" for name, path in list(images.items()) * 3)
+    converter = MarkdownToPapermill(dedupe_images=mode)
+    assert converter.convert(text) == MarkdownToPapermill(dedupe_images=None).convert(text)
+    assert converter.image_report["images"] == 12
+    assert converter.image_report["unique"] == (3 if mode == "path" else 2)
+    out = io.StringIO()
+    write_json(MarkdownToPapermill(dedupe_images=mode, lazy_images=True).convert(text), out)
+    assert out.getvalue() == json.dumps(MarkdownToPapermill(dedupe_images=None).convert(text))
@@ -0,0 +1,122 @@
+# tests/test_image_optimizer.py
+
+"""
+ImageOptimizer must downscale, turn images upright, keep transparency,
+write every source mode in the output format, and keep the source bytes
+whenever recompressing does not make them smaller.
+"""
+
+import base64
+import io
+import random
+
+import pytest
+
+from papermill_markdown import MarkdownToPapermill
+from papermill_markdown.images import ImageOptimizer, encode_image_file
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def noise(mode, size, seed=0):
+    rng = random.Random(seed)
+    bands = len(Image.new(mode, (1, 1)).getbands())
+    return Image.frombytes(mode, size, rng.randbytes(size[0] * size[1] * bands))
+
+
+def photo(size=(400, 300)):
+    """A smooth RGB gradient with some noise, which JPEG compresses well."""
+    img = Image.linear_gradient("L").resize(size).convert("RGB")
+    return Image.blend(img, noise("RGB", size), 0.1)
+
+
+def save(tmp_path, img, name, **options):
+    path = tmp_path / name
+    img.save(path, **options)
+    return str(path)
+
+
+def decode(uri):
+    header, b64 = uri.split(",", 1)
+    return header, Image.open(io.BytesIO(base64.b64decode(b64)))
+
+
+def test_downscales(tmp_path):
+    path = save(tmp_path, photo((1200, 900)), "photo.jpg", quality=95)
+    header, img = decode(ImageOptimizer(max_size=600).encode(path))
+    assert header == "data:image/jpeg;base64" and img.size == (600, 450)
+    _, img = decode(ImageOptimizer(max_size=600, content_width=1000).encode(path, width="20"))
+    assert img.size == (200, 150)
+
+
+def test_exif_orientation(tmp_path):
+    exif = Image.Exif()
+    exif[0x0112] = 6  # rotate 90 degrees clockwise to display
+    path = save(tmp_path, photo((400, 200)), "rotated.jpg", quality=95, exif=exif)
+    _, img = decode(ImageOptimizer(max_size=200).encode(path))
+    assert img.size == (100, 200)
+
+
+def test_alpha_is_not_converted_to_jpeg(tmp_path):
+    img = photo((800, 600)).convert("RGBA")
+    img.putalpha(128)
+    path = save(tmp_path, img, "alpha.png")
+    header, out = decode(ImageOptimizer(max_size=400, format="JPEG").encode(path))
+    assert header == "data:image/png;base64" and out.mode == "RGBA"
+    header, out = decode(ImageOptimizer(max_size=400, format="WEBP").encode(path))
+    assert header == "data:image/webp;base64" and out.mode == "RGBA"
+
+
+@pytest.mark.parametrize("fmt", [None, "JPEG", "PNG", "WEBP"])
+def test_cmyk_source(tmp_path, fmt):
+    path = save(tmp_path, photo((800, 600)).convert("CMYK"), "cmyk.jpg", quality=95)
+    header, img = decode(ImageOptimizer(max_size=400, format=fmt).encode(path))
+    assert header == f"data:image/{(fmt or 'JPEG').lower()};base64"
+    assert img.size == (400, 300) and img.mode in ("RGB", "L")
+
+
+@pytest.mark.parametrize("mode", ["1", "P", "L", "I;16"])
+def test_png_modes(tmp_path, mode):
+    source = noise("L", (800, 600)).point(lambda v: v // 64 * 64)
+    source = source.convert(mode) if mode != "I;16" else source.convert("I").convert("I;16")
+    path = save(tmp_path, source, "modes.png")
+    header, img = decode(ImageOptimizer(max_size=400, format="PNG").encode(path))
+    assert header == "data:image/png;base64" and img.size == (400, 300)
+
+
+def test_bilevel_is_not_converted_to_jpeg(tmp_path):
+    scan = noise("L", (1600, 1200)).point(lambda v: 255 if v > 30 else 0).convert("1")
+    path = save(tmp_path, scan, "scan.png", optimize=True)
+    uri = ImageOptimizer(max_size=800, format="JPEG").encode(path)
+    header, img = decode(uri)
+    assert header == "data:image/png;base64" and img.mode == "1" and img.size == (800, 600)
+    assert len(uri) < len(encode_image_file(path))
+
+
+def test_keeps_source_when_not_smaller(tmp_path):
+    path = save(tmp_path, noise("RGB", (64, 64)), "small.png", optimize=True)
+    assert ImageOptimizer(format="PNG").encode(path) == encode_image_file(path)
+    path = save(tmp_path, noise("RGB", (64, 64)), "small.jpg", quality=20)
+    assert ImageOptimizer(quality=95).encode(path) == encode_image_file(path)
+
+
+def test_animated_source_is_kept(tmp_path):
+    frames = [noise("P", (300, 300), seed) for seed in range(3)]
+    path = tmp_path / "anim.gif"
+    frames[0].save(path, save_all=True, append_images=frames[1:])
+    assert ImageOptimizer(max_size=100).encode(str(path)) == encode_image_file(str(path))
+
+
+def test_rejects_unknown_format():
+    with pytest.raises(ValueError):
+        ImageOptimizer(format="TIFF")
+
+
+def test_converter_embeds_optimized_image(tmp_path):
+    path = save(tmp_path, photo((1200, 900)), "photo.jpg", quality=95)
+    optimizer = ImageOptimizer(max_size=600, content_width=1000)
+    converter = MarkdownToPapermill(image_optimizer=optimizer)
+    plain = MarkdownToPapermill().convert(f'![Photo]({path} "width=50%")')
+    [block] = converter.convert(f'![Photo]({path} "width=50%")')
+    assert block["url"] == optimizer.encode(path, width="50%")
+    assert {k: v for k, v in block.items() if k != "url"} == {k: v for k, v in plain[0].items() if k != "url"}
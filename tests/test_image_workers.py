@@ -0,0 +1,60 @@
+# tests/test_image_workers.py
+
+"""
+Encoding local images on a thread pool must give the same blocks, in the
+same order, as the sequential conversion, and still raise for missing files.
+"""
+
+import random
+
+import pytest
+
+from conftest import random_document
+from papermill_markdown import ImageCache, MarkdownToPapermill
+
+
+@pytest.fixture
+def document(tmp_path):
+    rng = random.Random(6)
+    paths = []
+    for i in range(12):
+        path = tmp_path / f"figure{i}.png"
+        path.write_bytes(rng.randbytes(rng.randint(100, 5000)))
+        paths.append(str(path))
+    parts = []
+    for i in range(60):
+        parts.append(random_document(rng) if i % 3 else f'![Figure {i}]({rng.choice(paths)} "width=50%")')
+    return "\n\n".join(parts)
+
+
+@pytest.mark.parametrize("options", [{}, {"dedupe_images": None}, {"dedupe_images": "content"},
+                                     {"schema_output": True}, {"compact": True}])
+def test_matches_sequential(document, options):
+    expected = MarkdownToPapermill(**options).convert(document)
+    for workers in (1, 4):
+        assert MarkdownToPapermill(image_workers=workers, **options).convert(document) == expected
+
+
+def test_with_cache(document):
+    expected = MarkdownToPapermill().convert(document)
+    cache = ImageCache()
+    converter = MarkdownToPapermill(image_workers=4, image_cache=cache)
+    assert converter.convert(document) == expected
+    assert converter.convert(document) == expected
+    assert cache.stats()["hits"] > 0
+
+
+def test_report_matches_sequential(document):
+    sequential = MarkdownToPapermill()
+    sequential.convert(document)
+    parallel = MarkdownToPapermill(image_workers=4)
+    parallel.convert(document)
+    assert parallel.image_report == sequential.image_report
+
+
+def test_missing_image_raises(document, tmp_path):
+    converter = MarkdownToPapermill(image_workers=4)
+    with pytest.raises(FileNotFoundError):
+        converter.convert(document + f"\n\n![Missing]({tmp_path / 'missing.png'})")
+    # The pool is shut down, and the converter keeps working.
+    assert converter.convert(document) == MarkdownToPapermill().convert(document)
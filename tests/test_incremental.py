@@ -0,0 +1,57 @@
+# tests/test_incremental.py
+
+"""
+IncrementalConverter must give convert()'s result while reusing unchanged
+blocks, and keep the converter's reports and stats per conversion.
+"""
+
+import os
+
+from conftest import DATA_DIR
+from papermill_markdown import IncrementalConverter, MarkdownToPapermill, PipelineStats
+
+
+def sample():
+    with open(os.path.join(DATA_DIR, "test.md"), encoding="utf-8") as f:
+        return f.read()
+
+
+def test_matches_convert_after_edits():
+    text = sample()
+    incremental = IncrementalConverter(MarkdownToPapermill(compact=True))
+    for edited in (text, text.replace("Introduction", "Preface", 1), text + "\n\nOne more paragraph.\n", text):
+        assert incremental.convert(edited) == MarkdownToPapermill(compact=True).convert(edited)
+
+
+def test_reuses_unchanged_blocks():
+    text = sample()
+    incremental = IncrementalConverter()
+    first = incremental.convert(text)
+    assert incremental.report["reused"] == 0
+    incremental.convert(text.replace("First numbered item", "First edited item"))
+    # Only the edited list is parsed again, and the image, which is never memoised.
+    assert incremental.report["rebuilt"] == 2
+    assert incremental.report["blocks"] == len(first)
+
+
+def test_lru_bound():
+    incremental = IncrementalConverter(max_blocks=3)
+    incremental.convert("\n\n".join(f"Paragraph {i}" for i in range(10)))
+    assert incremental.stats()["blocks"] == 3
+
+
+def test_reports_and_stats_per_conversion():
+    stats = PipelineStats()
+    converter = MarkdownToPapermill(compact=True, stats=stats)
+    incremental = IncrementalConverter(converter)
+    incremental.convert("# A\n\nSome **bold** text.")
+    incremental.convert("# A\n\nSome **bold** text.\n\nMore *text*.")
+    # Only the new paragraph was compacted in the second conversion.
+    assert converter.compact_report == _compact_report("More *text*.")
+    assert {"normalize", "footnotes", "convert", "compact"} <= set(stats.to_dict()["stages"])
+
+
+def _compact_report(text):
+    converter = MarkdownToPapermill(compact=True)
+    converter.convert(text)
+    return converter.compact_report
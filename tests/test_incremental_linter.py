@@ -0,0 +1,79 @@
+# tests/test_incremental_linter.py
+
+"""
+After any sequence of edits, IncrementalLinter in full mode must return
+what MarkdownLinter(text).lint() returns for the current text, while
+reformatting only the blocks around each edit.
+"""
+
+import random
+
+import pytest
+
+from conftest import BLOCKS, INLINE, random_document, sample_document
+from papermill_markdown import IncrementalLinter, MarkdownLinter, MarkdownToPapermill
+
+EDITS = [
+    "Table 1: caption below",
+    "- li__under__1)",
+    "```\ncode\n```",
+    "  indented continuation",
+    "",
+]
+
+
+def random_edit(linter: IncrementalLinter, rng: random.Random) -> None:
+    n = len(linter.text.split("\n"))
+    first = rng.randint(1, n)
+    last = min(n, first + rng.choice([-1, 0, 0, 1, 3]))
+    if rng.random() < 0.5:
+        text = rng.choice(EDITS)
+    else:
+        text = rng.choice(BLOCKS)("".join(rng.choice(INLINE) for _ in range(rng.randint(1, 6))))
+    linter.edit(first, last, text)
+
+
+def test_matches_full_lint_after_edits():
+    rng = random.Random(24)
+    for _ in range(15):
+        linter = IncrementalLinter(sample_document())
+        for _ in range(8):
+            random_edit(linter, rng)
+            assert linter.lint() == MarkdownLinter(linter.text).lint(), linter.text
+
+
+def test_fast_mode_converts_the_same():
+    rng = random.Random(124)
+    converter = MarkdownToPapermill()
+    text = "\n\n".join(random_document(rng).split("\n\n[^1]")[0] for _ in range(5))
+    linter = IncrementalLinter(text, mode="fast")
+    for _ in range(20):
+        random_edit(linter, rng)
+        open_issues, _, fixed_text = linter.lint()
+        full = MarkdownLinter(linter.text).lint()
+        assert open_issues == full[0]
+        assert converter.convert(fixed_text) == converter.convert(full[2])
+
+
+def test_reformats_only_edited_blocks():
+    text = "\n\n".join(f"Paragraph {i} with *emphasis*." for i in range(50))
+    linter = IncrementalLinter(text)
+    linter.lint()
+    assert linter.report == {"blocks": 50, "reused": 0, "rebuilt": 50}
+    linter.edit(41, 41, "Paragraph 20, **edited**.")
+    assert linter.lint() == MarkdownLinter(linter.text).lint()
+    assert linter.path == "incremental" and linter.report["rebuilt"] == 1
+
+
+def test_reference_definitions_lint_whole_text():
+    linter = IncrementalLinter("See [link][a].\n\n[a]: http://a.b\n")
+    assert linter.lint() == MarkdownLinter(linter.text).lint()
+    assert linter.path == "full"
+
+
+def test_edit_range_is_checked():
+    linter = IncrementalLinter("One line")
+    with pytest.raises(ValueError):
+        linter.edit(3, 3, "x")
+    with pytest.raises(ValueError):
+        IncrementalLinter("x", mode="slow")
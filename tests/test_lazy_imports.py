@@ -0,0 +1,54 @@
+# tests/test_lazy_imports.py
+
+"""
+Each entry point must load only the heavy dependencies it uses. Every
+scenario runs in a fresh interpreter.
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import DATA_DIR
+
+SRC = os.path.join(os.path.dirname(DATA_DIR), "src")
+HEAVY = ("pydantic", "mdformat", "markdown_it", "requests", "asyncio", "concurrent.futures.process")
+DOCUMENT = "# Title\\n\\nSome **bold** text and $x$ with a note[^1].\\n\\n- a\\n- b\\n\\n[^1]: A note.\\n"
+
+
+def loaded(code: str) -> set:
+    code += f"\nimport sys\nprint(' '.join(name for name in {HEAVY!r} if name in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", code], env=dict(os.environ, PYTHONPATH=SRC),
+                            capture_output=True, text=True, check=True)
+    return set(result.stdout.split())
+
+
+@pytest.mark.parametrize("code, allowed", [
+    ("import papermill_markdown", ()),
+    ("from papermill_markdown import MarkdownToPapermill\n"
+     f"MarkdownToPapermill().convert('{DOCUMENT}')", ()),
+    ("from papermill_markdown import MarkdownToPapermill, lint_and_convert\n"
+     f"lint_and_convert('{DOCUMENT}', MarkdownToPapermill(), 'fast')", ()),
+    ("from papermill_markdown import IncrementalLinter\n"
+     "IncrementalLinter('')", ()),
+    ("from papermill_markdown import IncrementalLinter\n"
+     f"IncrementalLinter('{DOCUMENT}', 'fast').lint()", ("markdown_it",)),
+    ("from papermill_markdown import MarkdownToPapermill, lint_and_convert\n"
+     f"lint_and_convert('{DOCUMENT}', MarkdownToPapermill())", ("mdformat", "markdown_it")),
+    ("from papermill_markdown import MarkdownToPapermill, validate_documents\n"
+     f"validate_documents([MarkdownToPapermill().convert('{DOCUMENT}')])", ("pydantic",)),
+    ("from papermill_markdown import PapermillClient", ("requests", "asyncio")),
+])
+def test_heavy_imports(code, allowed):
+    assert loaded(code) <= set(allowed)
+
+
+def test_exports_resolve():
+    import papermill_markdown
+    for name in papermill_markdown.__all__:
+        assert getattr(papermill_markdown, name).__name__ == name
+        assert name in dir(papermill_markdown)
+    with pytest.raises(AttributeError):
+        papermill_markdown.missing
@@ -0,0 +1,48 @@
+# tests/test_pipeline.py
+
+"""
+lint_and_convert must equal linting, joining the fixed text and converting
+it, in both lint modes.
+"""
+
+import random
+
+import mdformat
+import pytest
+
+from conftest import random_document, sample_document
+from papermill_markdown import MarkdownToPapermill, lint_and_convert
+from papermill_markdown.linter import MarkdownLinter
+from papermill_markdown.stats import PipelineStats
+
+
+def documents():
+    yield sample_document()
+    rng = random.Random(13)
+    for _ in range(40):
+        text = random_document(rng)
+        yield text
+        yield mdformat.text(text)
+    yield "Table 1: caption below\n\n| a |\n|---|\n| b |\n\nTable 2: moved\n"
+    yield "Unmatched $ sign"
+    yield ""
+
+
+@pytest.mark.parametrize("lint_mode", MarkdownLinter.LINT_MODES)
+@pytest.mark.parametrize("options", [{}, {"schema_output": True}])
+def test_matches_lint_then_convert(lint_mode, options):
+    converter = MarkdownToPapermill(**options)
+    for text in documents():
+        open_issues, resolved_issues, fixed_text = MarkdownLinter(text, mode=lint_mode).lint()
+        expected = (open_issues, resolved_issues, converter.convert(fixed_text))
+        assert lint_and_convert(text, converter, lint_mode=lint_mode) == expected
+
+
+def test_stats():
+    stats = PipelineStats()
+    lint_and_convert(sample_document(), MarkdownToPapermill(stats=stats), lint_mode="fast")
+    assert {"lint.scan", "convert"} <= set(stats.stages)
+    converter_stats, own = PipelineStats(), PipelineStats()
+    lint_and_convert(sample_document(), MarkdownToPapermill(stats=converter_stats), stats=own)
+    assert "lint.mdformat" in own.stages and "convert" not in own.stages
+    assert "convert" in converter_stats.stages and "lint.mdformat" not in converter_stats.stages
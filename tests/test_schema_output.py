@@ -0,0 +1,31 @@
+# tests/test_schema_output.py
+
+"""
+schema_output=True must emit exactly what validating the plain output
+against DocumentContent and dumping it would, with and without compact.
+"""
+
+import os
+import random
+
+import pytest
+
+from conftest import DATA_DIR, random_document
+from papermill_markdown import DocumentContent, MarkdownToPapermill
+
+
+def documents():
+    with open(os.path.join(DATA_DIR, "test.md"), encoding="utf-8") as f:
+        yield f.read()
+    rng = random.Random(0)
+    for _ in range(300):
+        yield random_document(rng)
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_schema_output_matches_validated_dump(compact):
+    plain = MarkdownToPapermill(compact=compact)
+    dumped = MarkdownToPapermill(compact=compact, schema_output=True)
+    for text in documents():
+        expected = DocumentContent.model_validate(plain.convert(text)).model_dump()
+        assert dumped.convert(text) == expected, text
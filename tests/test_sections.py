@@ -0,0 +1,58 @@
+# tests/test_sections.py
+
+"""
+Building sections on a process pool must give the same document, reports
+and footnotes as the sequential conversion.
+"""
+
+import random
+
+import pytest
+
+from conftest import random_document, sample_document
+from papermill_markdown import MarkdownToPapermill
+from papermill_markdown.stats import PipelineStats
+
+
+@pytest.fixture(scope="module")
+def document():
+    rng = random.Random(11)
+    text = "\n\n".join([sample_document()] + [random_document(rng) for _ in range(40)])
+    assert len(MarkdownToPapermill().convert(text)) >= 4 * MarkdownToPapermill.SECTION_MIN_BLOCKS
+    return text
+
+
+@pytest.mark.parametrize("options", [{}, {"numbered": False}, {"inline_engine": "linear"},
+                                     {"schema_output": True}, {"compact": True}])
+def test_matches_sequential(document, options):
+    sequential = MarkdownToPapermill(**options)
+    parallel = MarkdownToPapermill(section_workers=2, **options)
+    assert parallel.convert(document) == sequential.convert(document)
+    assert parallel.footnotes == sequential.footnotes
+    assert parallel.compact_report == sequential.compact_report
+
+
+def test_sections(document):
+    converter = MarkdownToPapermill(section_workers=2)
+    blocks = list(converter._iter_raw_blocks(document.splitlines()))
+    sections = converter._split_sections(blocks)
+    assert len(sections) > 2
+    assert [block for section in sections for block in section] == blocks
+    assert all(section[0][0] in converter.SECTION_SPLIT_KINDS for section in sections[1:])
+
+
+def test_images_and_stats(document, tmp_path):
+    path = tmp_path / "figure.png"
+    path.write_bytes(b"figure" * 50)
+    text = document + f"\n\n![Figure]({path})\n\nAfter the figure."
+    stats = PipelineStats()
+    converter = MarkdownToPapermill(section_workers=2, image_workers=2, stats=stats)
+    assert converter.convert(text) == MarkdownToPapermill().convert(text)
+    assert converter.image_report["images"] == 1
+    assert "sections" in stats.stages
+
+
+def test_small_document_stays_sequential():
+    text = sample_document()
+    converter = MarkdownToPapermill(section_workers=2)
+    assert converter.convert(text) == MarkdownToPapermill().convert(text)
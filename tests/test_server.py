@@ -0,0 +1,124 @@
+# tests/test_server.py
+
+"""
+The conversion service over HTTP: request validation, that local images
+can only be read from the image root, and latency metrics for every outcome.
+"""
+
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from papermill_markdown import ConversionService, MarkdownToPapermill
+from papermill_markdown.server import make_server
+
+
+@pytest.fixture
+def image_root(tmp_path):
+    root = tmp_path / "images"
+    root.mkdir()
+    (root / "pic.png").write_bytes(b"\x89PNG not really")
+    (tmp_path / "secret.txt").write_text("secret")
+    os.symlink(tmp_path / "secret.txt", root / "link.png")
+    return root
+
+
+def serve(service):
+    server = make_server(service, port=0, quiet=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def post(server, body: bytes, content_type: str = "text/markdown"):
+    request = urllib.request.Request(f"http://127.0.0.1:{server.server_port}/convert", data=body,
+                                     headers={"Content-Type": content_type})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+@pytest.fixture
+def server(image_root):
+    with ConversionService(image_root=str(image_root)) as service:
+        server = serve(service)
+        yield server
+        server.shutdown()
+        server.server_close()
+
+
+def test_images_inside_root(server):
+    status, body = post(server, b"![a](pic.png)")
+    assert status == 200
+    assert body["documentContent"][0]["url"].startswith("data:image/png;base64,")
+    status, body = post(server, b"![a](http://example.com/a.png)")
+    assert status == 200 and body["documentContent"][0]["url"] == "http://example.com/a.png"
+
+
+@pytest.mark.parametrize("path", ["/etc/hostname", "../secret.txt", "link.png"])
+def test_images_outside_root_are_refused(server, path):
+    status, body = post(server, f"![a]({path})".encode())
+    assert status == 422
+    assert "outside the image root" in body["error"]
+
+
+def test_local_images_disabled_by_default():
+    with ConversionService() as service:
+        server = serve(service)
+        status, body = post(server, f"![a]({os.path.abspath(__file__)})".encode())
+        server.shutdown()
+        server.server_close()
+    assert status == 422
+    assert "local images are disabled" in body["error"]
+
+
+@pytest.mark.parametrize("payload", [{"markdown": 3}, {"text": "# A"}, ["# A"]])
+def test_malformed_json(server, payload):
+    status, body = post(server, json.dumps(payload).encode(), "application/json")
+    assert status == 400
+
+
+def test_converter_image_root(image_root):
+    converter = MarkdownToPapermill(image_root=str(image_root))
+    assert converter.convert("![a](pic.png)")[0]["url"].startswith("data:image/png;base64,")
+    with pytest.raises(PermissionError):
+        converter.convert(f"![a]({image_root.parent / 'secret.txt'})")
+    with pytest.raises(PermissionError):
+        MarkdownToPapermill(local_images=False).convert("![a](pic.png)")
+
+
+def submit_batch(service, texts):
+    futures = [service.submit(text) for text in texts]
+    outcomes = []
+    for future in futures:
+        try:
+            outcomes.append(future.result(5))
+        except Exception as e:
+            outcomes.append(e)
+    return outcomes
+
+
+def test_latency_recorded_for_failed_requests():
+    with ConversionService(batch_wait=0.05) as service:
+        outcomes = submit_batch(service, ["# A", "![a](pic.png)", "# B"])
+        assert [isinstance(outcome, ValueError) for outcome in outcomes] == [False, True, False]
+        snapshot = service.snapshot()
+        assert (snapshot["requests"], snapshot["failed"]) == (3, 1)
+        assert len(service.metrics._latencies) == 3
+
+
+def test_latency_recorded_when_the_batch_raises(monkeypatch):
+    with ConversionService(batch_wait=0.05) as service:
+        def fail(texts):
+            raise RuntimeError("worker crashed")
+        monkeypatch.setattr(service._local, "run", fail)
+        outcomes = submit_batch(service, ["# A", "# B", "# C"])
+        assert all(isinstance(outcome, RuntimeError) for outcome in outcomes)
+        snapshot = service.snapshot()
+        assert (snapshot["requests"], snapshot["failed"]) == (3, 3)
+        assert len(service.metrics._latencies) == 3 and snapshot["latency_max_ms"] > 0
@@ -0,0 +1,94 @@
+# tests/test_stats.py
+
+"""
+Collecting stats must not change the output, and PipelineStats must count,
+merge and export what the converter records.
+"""
+
+import json
+import random
+import threading
+
+import pytest
+
+from conftest import random_document, sample_document
+from papermill_markdown import MarkdownToPapermill
+from papermill_markdown.stats import PipelineStats, text_bytes
+
+
+def documents():
+    yield sample_document()
+    rng = random.Random(25)
+    for _ in range(100):
+        yield random_document(rng)
+
+
+@pytest.mark.parametrize("options", [{}, {"compact": True}, {"schema_output": True}, {"token_objects": True}])
+def test_output_unchanged(options):
+    plain = MarkdownToPapermill(**options)
+    timed = MarkdownToPapermill(stats=PipelineStats(), **options)
+    for text in documents():
+        assert timed.convert(text) == plain.convert(text)
+        assert list(timed.iter_convert(text.splitlines())) == plain.convert(text)
+
+
+def test_stages_and_blocks(tmp_path):
+    image = tmp_path / "figure.png"
+    image.write_bytes(b"figure" * 10)
+    text = sample_document() + f"\n\n![Figure]({image})\n"
+    stats = PipelineStats()
+    document = MarkdownToPapermill(stats=stats, compact=True).convert(text)
+    assert {"normalize", "footnotes", "convert", "inline", "image_encode", "compact"} <= set(stats.stages)
+    assert stats.stages["convert"][0] == 1 and 0 < stats.stages["convert"][2] <= text_bytes(text)
+    blocks = stats.to_dict()["blocks"]
+    assert sum(value["count"] for value in blocks.values()) == len(document)
+    assert blocks["image"]["count"] == sum(1 for element in document if element["type"] == "image")
+    stats.reset()
+    text = "# Tïtle\n\nSome *text*."
+    MarkdownToPapermill(stats=stats).convert(text)
+    assert stats.stages["convert"][2] == text_bytes(text) == len(text.encode("utf-8"))
+
+
+def test_callback_and_stage():
+    seen = []
+    stats = PipelineStats(callback=lambda kind, name, seconds, nbytes: seen.append((kind, name, nbytes)))
+    MarkdownToPapermill(stats=stats).convert("# Title\n\nText.")
+    with stats.stage("upload", 10):
+        pass
+    assert ("stage", "upload", 10) in seen
+    assert ("block", "heading", len("# Title")) in seen
+    assert sum(1 for kind, _, _ in seen if kind == "stage") == sum(calls for calls, _, _ in stats.stages.values())
+
+
+def test_merge_and_reset():
+    first, second, total = PipelineStats(), PipelineStats(), PipelineStats()
+    MarkdownToPapermill(stats=first).convert(sample_document())
+    MarkdownToPapermill(stats=second).convert("Text.")
+    total.merge(first)
+    total.merge(second.to_dict())
+    assert total.stages["convert"][0] == 2
+    assert total.stages["convert"][2] == first.stages["convert"][2] + second.stages["convert"][2]
+    assert total.blocks["paragraph"][0] == first.blocks["paragraph"][0] + 1
+    total.reset()
+    assert total.to_dict() == {"stages": {}, "blocks": {}}
+
+
+def test_exports():
+    stats = PipelineStats()
+    MarkdownToPapermill(stats=stats).convert(sample_document())
+    assert json.loads(stats.to_json()) == stats.to_dict()
+    text = stats.to_prometheus(prefix="pm")
+    assert f'pm_stage_calls_total{{stage="convert"}} 1' in text
+    assert f'pm_blocks_total{{type="paragraph"}} {stats.blocks["paragraph"][0]}' in text
+    assert text.count("# TYPE") == 6
+
+
+def test_threads():
+    stats = PipelineStats()
+    converter = MarkdownToPapermill(stats=stats)
+    threads = [threading.Thread(target=lambda: [converter.convert("Text.") for _ in range(50)]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert stats.stages["convert"][0] == 200 and stats.blocks["paragraph"][0] == 200
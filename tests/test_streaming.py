@@ -0,0 +1,112 @@
+# tests/test_streaming.py
+
+"""
+StreamingConverter and iter_convert must give convert()'s result however the
+input is chunked, except for the documented handling of a footnote defined
+twice.
+"""
+
+import io
+import random
+
+import pytest
+
+from conftest import random_document, sample_document
+from papermill_markdown import MarkdownToPapermill, StreamingConverter
+from papermill_markdown.streaming import collect_footnotes, iter_convert
+
+DUPLICATE_FOOTNOTES = "Note[^1].\n\n[^1]: First.\n\nMore[^1].\n\n[^1]: Second.\n"
+
+
+def documents():
+    yield sample_document()
+    rng = random.Random(1)
+    for _ in range(150):
+        yield random_document(rng)
+
+
+def random_chunks(text: str, rng: random.Random):
+    pos = 0
+    while pos < len(text):
+        size = rng.choice([1, 2, 3, 7, 64, 1000])
+        yield text[pos:pos + size]
+        pos += size
+
+
+def stream(chunks, **kwargs):
+    converter = StreamingConverter(**kwargs)
+    out = []
+    for chunk in chunks:
+        out.extend(converter.feed(chunk))
+    return out + converter.close()
+
+
+def test_random_chunking():
+    rng = random.Random(2)
+    converter = MarkdownToPapermill()
+    for text in documents():
+        expected = converter.convert(text)
+        assert stream(random_chunks(text, rng)) == expected, text
+        assert stream([text]) == expected, text
+
+
+def test_known_footnotes():
+    rng = random.Random(3)
+    converter = MarkdownToPapermill()
+    for text in documents():
+        footnotes = collect_footnotes(random_chunks(text, rng))
+        assert stream(random_chunks(text, rng), footnotes=footnotes) == converter.convert(text), text
+
+
+def test_elements_are_released_early():
+    converter = StreamingConverter()
+    assert converter.feed("# Title\n\nA paragraph\n") == [
+        {"type": "heading", "text": "Title", "level": 1, "numbered": True},
+    ]
+    # A paragraph is complete at the blank line after it.
+    assert converter.feed("\n") == [{"type": "paragraph", "text": ["A paragraph"]}]
+    # A table is held until the two lines after its end have been checked for a caption.
+    assert converter.feed("| a |\n|---|\n| b |\n\nx\n") == []
+    assert converter.feed("y\n") == [{"type": "table", "header": ["a"], "body": [["b"]], "caption": ""}]
+    assert converter.close() == [{"type": "paragraph", "text": ["x y"]}]
+    with pytest.raises(ValueError):
+        converter.feed("more")
+
+
+def test_iter_convert_sources(tmp_path):
+    converter = MarkdownToPapermill()
+    for text in documents():
+        expected = converter.convert(text)
+        path = tmp_path / "doc.md"
+        path.write_text(text, encoding="utf-8")
+        assert list(iter_convert(str(path), chunk_size=7)) == expected
+        assert list(iter_convert(io.StringIO(text), chunk_size=5)) == expected
+        assert list(converter.iter_convert(text.split("\n"))) == expected
+        assert list(iter_convert(line + "\n" for line in text.split("\n"))) == expected
+
+
+def test_duplicate_footnotes():
+    converter = MarkdownToPapermill()
+    expected = converter.convert(DUPLICATE_FOOTNOTES)
+    assert [e["text"][1]["text"] for e in expected if e["type"] == "paragraph"] == ["Second.", "Second."]
+    # Seekable sources collect the footnotes first, so they match convert().
+    assert list(iter_convert(io.StringIO(DUPLICATE_FOOTNOTES))) == expected
+    # A stream releases each paragraph with the definition seen by then.
+    streamed = stream(DUPLICATE_FOOTNOTES)
+    assert [e["text"][1]["text"] for e in streamed if e["type"] == "paragraph"] == ["First.", "First."]
+    assert list(iter_convert(DUPLICATE_FOOTNOTES.split("\n"))) == streamed
+
+
+def test_iter_convert_is_lazy():
+    consumed = []
+
+    def lines():
+        for i in range(1000):
+            consumed.append(i)
+            yield f"Paragraph {i}"
+            yield ""
+
+    elements = iter_convert(lines())
+    assert next(elements) == {"type": "paragraph", "text": ["Paragraph 0"]}
+    # Only the lines needed to finish the first paragraph have been read.
+    assert len(consumed) <= 2
@@ -0,0 +1,86 @@
+# tests/test_tokens.py
+
+"""
+token_objects=True must hold the same document as the dict output: equal
+after to_dicts(), and written by write_json as the same JSON, key order
+included.
+"""
+
+import io
+import json
+import random
+
+import pytest
+
+from conftest import random_document, sample_document
+from papermill_markdown import DocumentContent, IncrementalConverter, MarkdownToPapermill, write_json
+from papermill_markdown import tokens
+from papermill_markdown.tokens import InlineToken, to_dicts
+
+
+def documents():
+    yield sample_document()
+    rng = random.Random(20)
+    for _ in range(200):
+        yield random_document(rng)
+
+
+def contains_tokens(value) -> bool:
+    if isinstance(value, InlineToken):
+        return True
+    if isinstance(value, list):
+        return any(contains_tokens(item) for item in value)
+    if isinstance(value, dict):
+        return any(contains_tokens(item) for item in value.values())
+    return False
+
+
+@pytest.mark.parametrize("options", [{}, {"inline_engine": "linear"}, {"numbered": False}])
+def test_matches_dict_output(options):
+    plain = MarkdownToPapermill(**options)
+    objects = MarkdownToPapermill(token_objects=True, **options)
+    with_tokens = 0
+    for text in documents():
+        expected = plain.convert(text)
+        document = objects.convert(text)
+        with_tokens += contains_tokens(document)
+        converted = to_dicts(document)
+        assert converted == expected
+        assert json.dumps(converted) == json.dumps(expected)
+        out = io.StringIO()
+        write_json(document, out)
+        assert out.getvalue() == json.dumps(expected)
+    assert with_tokens > 100
+
+
+def test_streaming_and_incremental():
+    text = sample_document()
+    expected = MarkdownToPapermill().convert(text)
+    converter = MarkdownToPapermill(token_objects=True)
+    assert to_dicts(list(converter.iter_convert(text.splitlines()))) == expected
+    incremental = IncrementalConverter(converter)
+    incremental.convert(text)
+    edited = text.replace("\n\n", "\n\nAn *inserted* paragraph.\n\n", 1)
+    assert to_dicts(incremental.convert(edited)) == MarkdownToPapermill().convert(edited)
+
+
+def test_validates_after_to_dicts():
+    converter = MarkdownToPapermill(token_objects=True)
+    for text in documents():
+        DocumentContent.model_validate(to_dicts(converter.convert(text)))
+
+
+def test_flags_are_interned():
+    assert tokens.flags("bold", "italic") is tokens.flags(*["bold", "italic"])
+    combined = tokens.combine_flags(tokens.flags("bold"), tokens.flags("italic", "bold"))
+    assert combined == ("bold", "italic")
+    assert combined is tokens.combine_flags(tokens.flags("bold"), tokens.flags("italic", "bold"))
+    token = tokens.Text("a", tokens.flags("italic"), url="http://a.b")
+    assert token.with_flags(tokens.flags("bold")).to_dict() == {"bold": True, "italic": True,
+                                                               "text": "a", "url": "http://a.b"}
+
+
+def test_rejects_dict_only_options():
+    for option in ("schema_output", "compact"):
+        with pytest.raises(ValueError):
+            MarkdownToPapermill(token_objects=True, **{option: True})
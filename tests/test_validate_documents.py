@@ -0,0 +1,76 @@
+# tests/test_validate_documents.py
+
+"""
+validate_documents must return, in order, what model_validate would for
+each payload, and collect errors instead of raising.
+"""
+
+import json
+import random
+
+from pydantic import ValidationError
+
+from conftest import random_document, sample_document
+from papermill_markdown import DocumentContent, DocumentModel, MarkdownToPapermill, validate_documents
+from papermill_markdown.stats import PipelineStats
+
+
+def payloads():
+    converter = MarkdownToPapermill()
+    rng = random.Random(18)
+    documents = [converter.convert(sample_document())]
+    documents += [converter.convert(random_document(rng)) for _ in range(100)]
+    return documents
+
+
+def errors_of(document):
+    try:
+        if isinstance(document, (str, bytes)):
+            DocumentContent.model_validate_json(document)
+        else:
+            DocumentContent.model_validate(document)
+    except ValidationError as e:
+        return e.errors(include_url=False)
+    return None
+
+
+def test_matches_model_validate():
+    documents = payloads()
+    inputs = documents + [json.dumps(d) for d in documents] + [json.dumps(d).encode("utf-8") for d in documents]
+    results = validate_documents(inputs)
+    assert len(results) == len(inputs)
+    for document, result in zip(inputs, results):
+        assert result.errors is None
+        assert result.value == DocumentContent.model_validate(json.loads(document) if isinstance(document, (str, bytes))
+                                                              else document)
+    dumped = validate_documents(documents, dump=True)
+    assert [result.value for result in dumped] == [DocumentContent.model_validate(d).model_dump() for d in documents]
+
+
+def test_invalid_documents_do_not_stop_the_batch():
+    valid = payloads()[0]
+    inputs = [valid, [{"type": "nope"}], "[{", b"not json", [{"type": "heading", "text": "h", "level": 9}], valid]
+    results = validate_documents(inputs)
+    assert [result.value is None for result in results] == [False, True, True, True, True, False]
+    for document, result in zip(inputs, results):
+        assert result.errors == errors_of(document)
+
+
+def test_document_model_and_stats():
+    content = payloads()[0]
+    payload = {"references": {"ref1": {"doi": "10.1000/182"}}, "documentContent": content}
+    invalid = {"references": {"ref1": {}}, "documentContent": content}
+    stats = PipelineStats()
+    text = json.dumps(payload)
+    valid, missing = validate_documents([text, invalid], model=DocumentModel, stats=stats)
+    assert valid.errors is None and valid.value == DocumentModel.model_validate(payload)
+    assert [error["loc"] for error in missing.errors] == [("references", "ref1")]
+    calls, _, nbytes = stats.stages["validate"]
+    assert (calls, nbytes) == (2, len(text.encode("utf-8")))
+
+
+def test_get_elements():
+    document = payloads()[0]
+    content = DocumentContent.model_validate(document)
+    assert content.get_elements() is content.root
+    assert len(content.get_elements()) == len(document)
@@ -0,0 +1,103 @@
+# tests/test_validator.py
+
+"""
+The discriminated unions must accept and dump converted documents exactly
+as the original plain unions did, and report one error at the failing
+member instead of one per union member.
+"""
+
+import random
+from typing import List, Literal, Optional, Union
+
+import pytest
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
+
+from conftest import random_document, sample_document
+from papermill_markdown import DocumentContent, MarkdownToPapermill
+from papermill_markdown.validator import (Break, Code, CrossReference, Equation, Footnote, FormattedText,
+                                          ReferenceInline)
+
+# The models as they were before the unions were discriminated.
+TextContent = Union[str, FormattedText, CrossReference, Footnote, Code, Equation, ReferenceInline]
+CellContent = Union[str, TextContent, List[TextContent]]
+
+
+class Heading(BaseModel):
+    type: Literal["heading"]
+    text: str
+    level: int = Field(..., ge=1, le=5)
+    ref: Optional[str] = None
+    numbered: Optional[bool] = None
+
+
+class Paragraph(BaseModel):
+    type: Literal["paragraph"]
+    text: Union[str, List[TextContent]]
+    style: Optional[str] = None
+
+
+class Image(BaseModel):
+    type: Literal["image"]
+    url: str
+    caption: Optional[Union[str, List[Union[str, FormattedText]]]] = None
+    width: Optional[str] = None
+    ref: Optional[str] = None
+
+
+class Table(BaseModel):
+    type: Literal["table"]
+    header: List[CellContent]
+    body: List[List[CellContent]]
+    caption: Optional[Union[str, List[TextContent]]] = None
+    transpose: Optional[bool] = None
+
+
+class DocumentList(BaseModel):
+    type: Literal["list"]
+    style: Literal["bullet", "number"]
+    items: List[Union[str, List[TextContent]]]
+
+
+BASELINE = TypeAdapter(List[Union[Heading, Paragraph, Image, Table, DocumentList, Equation, Code, Break]])
+
+
+def documents():
+    yield sample_document()
+    rng = random.Random(16)
+    for _ in range(200):
+        yield random_document(rng)
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_matches_plain_unions(compact):
+    converter = MarkdownToPapermill(compact=compact)
+    for text in documents():
+        document = converter.convert(text)
+        expected = BASELINE.dump_python(BASELINE.validate_python(document))
+        assert DocumentContent.model_validate(document).model_dump() == expected
+
+
+def test_members_are_selected_by_type():
+    content = DocumentContent.model_validate([
+        {"type": "paragraph", "text": ["a", {"text": "b", "bold": True}, {"type": "reference", "ref": "r"},
+                                       {"type": "equation", "equation": "x"}, {"type": "footnote", "text": "n"}]},
+        {"type": "table", "header": [{"text": "h", "italic": True}, "plain"],
+         "body": [[["c", {"type": "code", "text": "x"}], "d"]]},
+    ])
+    paragraph, table = content.get_elements()
+    assert [type(item) for item in paragraph.text] == [str, FormattedText, ReferenceInline, Equation, Footnote]
+    assert isinstance(table.header[0], FormattedText) and table.header[1] == "plain"
+    assert [type(item) for item in table.body[0][0]] == [str, Code]
+
+
+@pytest.mark.parametrize("document, loc", [
+    ([{"type": "paragraph", "text": [{"type": "equation"}]}],
+     (0, "paragraph", "text", "list", 0, "equation", "equation")),
+    ([{"type": "paragraph", "text": [{"type": "bogus"}]}], (0, "paragraph", "text", "list", 0)),
+    ([{"type": "table", "header": [], "body": [[5]]}], (0, "table", "body", 0, 0)),
+    ([{"type": "nope"}], (0,)),
+])
+def test_one_error_per_invalid_node(document, loc):
+    with pytest.raises(ValidationError) as info:
+        DocumentContent.model_validate(document)
+    assert [error["loc"] for error in info.value.errors()] == [loc]
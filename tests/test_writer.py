@@ -0,0 +1,70 @@
+# tests/test_writer.py
+
+"""
+write_json must write what json.dump would for the eagerly converted
+document, including lazy ImageReference values streamed from disk.
+"""
+
+import io
+import json
+import random
+
+import pytest
+
+from conftest import random_document, sample_document
+from papermill_markdown import MarkdownToPapermill, write_json
+from papermill_markdown.images import ImageReference, encode_image_file
+
+
+@pytest.fixture
+def image_dir(tmp_path):
+    # Sizes around the chunk boundary, so the last chunk is full, short or padded.
+    for name, size in (("a.png", ImageReference.CHUNK_SIZE), ("b.jpg", ImageReference.CHUNK_SIZE + 1),
+                       ("c.gif", 2 * ImageReference.CHUNK_SIZE + 2), ("d.png", 0)):
+        (tmp_path / name).write_bytes(bytes(range(256)) * (size // 256) + b"x" * (size % 256))
+    return tmp_path
+
+
+def image_document(image_dir) -> str:
+    names = ["a.png", "b.jpg", "c.gif", "d.png", "a.png"]
+    return "\n\n".join(f"![Figure {i}]({image_dir / name})\n\nText **{i}**" for i, name in enumerate(names))
+
+
+def dump(elements, **kwargs) -> str:
+    out = io.StringIO()
+    write_json(elements, out, **kwargs)
+    return out.getvalue()
+
+
+def test_matches_json_dump():
+    converter = MarkdownToPapermill()
+    for text in [sample_document(), "", *(random_document(random.Random(i)) for i in range(20))]:
+        content = converter.convert(text)
+        assert dump(content) == json.dumps(content)
+        assert dump(iter(content), indent=2) == "[" + ", ".join(json.dumps(e, indent=2) for e in content) + "]"
+
+
+def test_lazy_images(image_dir):
+    text = image_document(image_dir)
+    expected = MarkdownToPapermill().convert(text)
+    lazy = MarkdownToPapermill(lazy_images=True)
+    content = lazy.convert(text)
+    assert isinstance(content[0]["url"], ImageReference)
+    assert dump(content) == json.dumps(expected)
+    assert json.loads(dump(lazy.iter_convert(text.split("\n")))) == expected
+
+
+def test_image_reference(image_dir):
+    path = str(image_dir / "c.gif")
+    reference = ImageReference(path)
+    out = io.StringIO()
+    assert reference.write_data_uri(out, chunk_size=3 * 5) == len(out.getvalue())
+    assert out.getvalue() == reference.data_uri() == encode_image_file(path)
+    with pytest.raises(ValueError):
+        reference.write_data_uri(io.StringIO(), chunk_size=10)
+
+
+def test_unserialisable_values():
+    with pytest.raises(TypeError):
+        dump([{"type": "paragraph", "text": [object()]}])
+    assert dump([{"value": object()}], default=lambda obj: "custom") == '[{"value": "custom"}]'